@@ -1,15 +1,19 @@
 from __future__ import annotations
 
+import time
 from pathlib import Path
 from typing import Dict, Any, List
 
 from fastapi import FastAPI, HTTPException, Query
+from fastapi.responses import Response
 
+from src.metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, MODEL_LOAD_SECONDS, REGISTRY as METRICS, MetricsMiddleware
 from src.model import load_model, PoissonTeamModel
 
 MODELS_DIR = Path("data/models")
 
 app = FastAPI(title="Sports Prob Engine", version="1.0")
+app.add_middleware(MetricsMiddleware)
 
 MODELS: Dict[str, PoissonTeamModel] = {}
 
@@ -21,7 +25,9 @@ def _load_all_models() -> Dict[str, PoissonTeamModel]:
     models: Dict[str, PoissonTeamModel] = {}
     for p in MODELS_DIR.glob("*.joblib"):
         key = p.stem  # ex: "bundesliga", "premier-league"
+        t0 = time.perf_counter()
         models[key] = load_model(str(p))
+        MODEL_LOAD_SECONDS.set(time.perf_counter() - t0, model=key)
     return models
 
 
@@ -46,6 +52,11 @@ def health() -> Dict[str, Any]:
     return {"ok": True, "models_loaded": list(MODELS.keys())}
 
 
+@app.get("/metrics")
+def metrics() -> Response:
+    return Response(content=METRICS.render(), media_type=METRICS_CONTENT_TYPE)
+
+
 @app.get("/leagues")
 def leagues() -> Dict[str, Any]:
     return {"leagues": sorted(MODELS.keys()), "count": len(MODELS)}
@@ -1,8 +1,54 @@
+from __future__ import annotations
+
+import asyncio
+import base64
+import hashlib
+import json
+import math
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextvars import copy_context
+from dataclasses import dataclass
+from datetime import datetime, timedelta
 from pathlib import Path
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Optional, Set, Tuple
+
+import numpy as np
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.responses import FileResponse, JSONResponse, RedirectResponse, Response, StreamingResponse
+from pydantic import BaseModel
+from starlette.middleware.gzip import GZipMiddleware
+
+try:
+    from zoneinfo import ZoneInfo  # py3.9+
+except Exception:
+    ZoneInfo = None  # type: ignore
 
-from fastapi import FastAPI, Request
-from fastapi.responses import FileResponse, JSONResponse, RedirectResponse
-from fastapi.staticfiles import StaticFiles
+try:
+    import orjson  # opcional: encoder JSON bem mais rápido
+except Exception:
+    orjson = None  # type: ignore
+
+from src.live_fetch import (
+    UpstreamUnavailable,
+    fetch_competition_matches,
+    fetch_competition_standings,
+    upstream_deadline,
+)
+from src.pred_store import PredictionStore
+from src.metrics import (
+    CACHE_BYTES,
+    CACHE_ENTRIES,
+    CACHE_EVICTIONS,
+    CACHE_REQUESTS,
+    CONTENT_TYPE as METRICS_CONTENT_TYPE,
+    REGISTRY as METRICS,
+    MetricsMiddleware,
+    cache_namespace,
+)
+from src.static_assets import StaticAssets
+from src.timing import LATENCY, ServerTimingMiddleware, timed
 
 # =========================================================
 # App
@@ -24,49 +70,1775 @@ SW_JS = WEB_DIR / "sw.js"
 ICONS_DIR = WEB_DIR / "icons"
 DATA_DIR = WEB_DIR / "data"
 
+PREDS_LIVE_DIR = ROOT_DIR / "data" / "preds_live"   # saída do src/predict_live.py
+EXTRA_DIR = ROOT_DIR / "data" / "extra"             # shards do tools/build_extra_stats.py
+
+# =========================================================
+# Config
+# =========================================================
+TZ_NAME = "America/Sao_Paulo"
+TZ = ZoneInfo(TZ_NAME) if ZoneInfo else None
+
+DEFAULT_LIMIT = 15
+CACHE_TTL = 60
+CACHE_STALE_TTL = 900          # cópia vencida ainda serve se a API cair
+UPSTREAM_BUDGET_SECONDS = 4.0  # tempo máximo de API por request (dentro do DEFAULT_TIMEOUT)
+MAX_BATCH_CARDS = 50
+
+# Cache-Control para o cliente (max-age, stale-while-revalidate) em segundos
+HTTP_CACHE_MATCHES = (15, 60)
+HTTP_CACHE_CARD = (15, 60)
+HTTP_CACHE_LEAGUES = (3600, 86400)
+HTTP_CACHE_EXTRA = (3600, 86400)
+MAX_WINDOW_DAYS = 14
+WINDOW_PAGE_SIZE = 50
+
+LIVE_INFER_MINUTES = 130  # ~ 90 + intervalo + acréscimos
+
+LIVE_POLL_SECONDS = 30        # poll da API quando há jogo ao vivo
+LIVE_IDLE_POLL_SECONDS = 300  # poll quando não há nenhum jogo ao vivo
+LIVE_KEEPALIVE_SECONDS = 15   # comentário SSE para manter a conexão aberta
+LIVE_QUEUE_MAX = 32           # eventos pendentes por inscrito
+
+LEAGUES: List[Dict[str, str]] = [
+    {"code": "PL", "name": "Premier League"},
+    {"code": "BL1", "name": "Bundesliga"},
+    {"code": "PD", "name": "La Liga"},
+    {"code": "SA", "name": "Serie A"},
+    {"code": "FL1", "name": "Ligue 1"},
+    {"code": "DED", "name": "Eredivisie"},
+    {"code": "PPL", "name": "Primeira Liga (Portugal)"},
+    {"code": "ELC", "name": "EFL Championship"},
+    {"code": "CL", "name": "UEFA Champions League"},
+    {"code": "BSA", "name": "Brasileirão Série A"},
+]
+
+STATUS_PT = {
+    "SCHEDULED": "Agendado",
+    "TIMED": "Agendado",
+    "LIVE": "Ao vivo",
+    "IN_PLAY": "Ao vivo",
+    "PAUSED": "Intervalo",
+    "FINISHED": "Finalizado",
+    "POSTPONED": "Adiado",
+    "SUSPENDED": "Suspenso",
+    "CANCELED": "Cancelado",
+    "LIVE_EST": "Ao vivo (estimado)",
+}
+
+STATUS_FILTERS = {
+    "SCHEDULED": ["SCHEDULED", "TIMED"],
+    "LIVE": ["LIVE", "IN_PLAY", "PAUSED", "LIVE_EST"],
+    "FINISHED": ["FINISHED"],
+    "ALL": None,
+}
+
+# =========================================================
+# Estáticos em memória + compressão
+# =========================================================
+# Todo o /web é carregado uma vez (no startup) com variantes gzip/brotli
+# já prontas; /, /app.js, /sw.js, /icons/..., /data/... e o fallback
+# servem daqui sem tocar o disco.
+ASSETS = StaticAssets(WEB_DIR)
+
+GZIP_MIN_BYTES = 1024  # JSON pequeno não compensa o custo de comprimir
+GZIP_SKIP_SUFFIXES = ("/stream",)  # SSE/NDJSON: não bufferizar o stream
+
+
+class ApiCompressionMiddleware:
+    """
+    GZip nas respostas da API acima de GZIP_MIN_BYTES. Streams e
+    arquivos do web root ficam de fora (estes já saem pré-comprimidos).
+    """
+
+    def __init__(self, app, minimum_size: int = GZIP_MIN_BYTES):
+        self.app = app
+        self.gzip = GZipMiddleware(app, minimum_size=minimum_size)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http":
+            path = scope.get("path", "")
+            if not path.endswith(GZIP_SKIP_SUFFIXES) and ASSETS.get(path.lstrip("/") or "index.html") is None:
+                await self.gzip(scope, receive, send)
+                return
+        await self.app(scope, receive, send)
+
+
+class UpstreamBudgetMiddleware:
+    """
+    Cada request tem no máximo UPSTREAM_BUDGET_SECONDS de API no total;
+    esgotado o prazo, o live_fetch nem chama e a rota cai no cache vencido.
+    Streams ficam de fora (o hub do /live/stream vive além do request).
+    """
+
+    def __init__(self, app, budget: float = UPSTREAM_BUDGET_SECONDS):
+        self.app = app
+        self.budget = budget
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and not scope.get("path", "").endswith(GZIP_SKIP_SUFFIXES):
+            with upstream_deadline(self.budget):
+                await self.app(scope, receive, send)
+            return
+        await self.app(scope, receive, send)
+
+
+app.add_middleware(UpstreamBudgetMiddleware, budget=UPSTREAM_BUDGET_SECONDS)
+app.add_middleware(ApiCompressionMiddleware, minimum_size=GZIP_MIN_BYTES)
+# adicionados depois = mais externos: Server-Timing e /metrics incluem a compressão
+app.add_middleware(ServerTimingMiddleware)
+app.add_middleware(MetricsMiddleware)
+
+
+@app.on_event("startup")
+def load_static_assets():
+    ASSETS.load()
+
+
+# =========================================================
+# Cache
+# =========================================================
+@dataclass
+class CacheEntry:
+    ts: float
+    value: Any
+    version: Optional[str] = None  # hash do conteúdo (ou versão explícita)
+    body: Optional[bytes] = None    # JSON já serializado, gerado sob demanda
+
+
+_CACHE: Dict[str, CacheEntry] = {}
+
+
+def _cache_entry(key: str, max_age: float = CACHE_TTL) -> Optional[CacheEntry]:
+    ent = _CACHE.get(key)
+    if not ent:
+        return None
+    age = time.time() - ent.ts
+    if age > CACHE_STALE_TTL:
+        if _CACHE.pop(key, None) is not None:
+            CACHE_EVICTIONS.inc(namespace=cache_namespace(key))
+        return None
+    if age > max_age:
+        return None
+    return ent
+
+
+def cache_get(key: str) -> Optional[Any]:
+    ent = _cache_entry(key)
+    CACHE_REQUESTS.inc(namespace=cache_namespace(key), result="hit" if ent else "miss")
+    return ent.value if ent else None
+
+
+def cache_get_stale(key: str) -> Optional[Any]:
+    """Valor vencido (até CACHE_STALE_TTL): só para quando a API não responde."""
+    ent = _cache_entry(key, max_age=CACHE_STALE_TTL)
+    if ent is not None:
+        CACHE_REQUESTS.inc(namespace=cache_namespace(key), result="stale")
+    return ent.value if ent else None
+
+
+def cache_set(key: str, value: Any, version: Optional[str] = None) -> None:
+    _CACHE[key] = CacheEntry(ts=time.time(), value=value, version=version)
+
+
+@timed("json")
+def json_bytes(value: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(value, default=str, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"), default=str).encode("utf-8")
+
+
+def bytes_hash(raw: bytes) -> str:
+    return hashlib.sha1(raw).hexdigest()[:20]
+
+
+def entry_body(ent: CacheEntry) -> bytes:
+    """JSON serializado da entrada; gerado uma vez por entrada de cache."""
+    if ent.body is None:
+        ent.body = json_bytes(ent.value)
+    return ent.body
+
+
+def entry_version(ent: CacheEntry) -> str:
+    """Versão da entrada (hash do JSON serializado, salvo versão explícita)."""
+    if ent.version is None:
+        ent.version = bytes_hash(entry_body(ent))
+    return ent.version
+
+
+def cache_body(key: str, max_age: float = CACHE_TTL) -> Optional[bytes]:
+    ent = _cache_entry(key, max_age)
+    return entry_body(ent) if ent is not None else None
+
+
+def cache_version(key: str, max_age: float = CACHE_TTL) -> Optional[str]:
+    ent = _cache_entry(key, max_age)
+    return entry_version(ent) if ent is not None else None
+
+
+def cache_sizes() -> Tuple[Dict[Tuple[str, ...], float], Dict[Tuple[str, ...], float]]:
+    """(entradas, bytes serializados) por namespace, para o /metrics."""
+    entries: Dict[Tuple[str, ...], float] = {}
+    sizes: Dict[Tuple[str, ...], float] = {}
+    for key, ent in list(_CACHE.items()):
+        ns = (cache_namespace(key),)
+        entries[ns] = entries.get(ns, 0) + 1
+        sizes[ns] = sizes.get(ns, 0) + (len(ent.body) if ent.body is not None else 0)
+    return entries, sizes
+
+
+CACHE_ENTRIES.set_function(lambda: cache_sizes()[0])
+CACHE_BYTES.set_function(lambda: cache_sizes()[1])
+
+# =========================================================
+# HTTP cache (ETag / GET condicional)
+# =========================================================
+def parts_version(*parts: Any) -> str:
+    raw = "|".join(str(p) for p in parts)
+    return bytes_hash(raw.encode("utf-8"))
+
+
+def quote_etag(version: str) -> str:
+    return f'"{version}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    inm = request.headers.get("if-none-match")
+    if not inm:
+        return False
+    for tag in inm.split(","):
+        tag = tag.strip()
+        if tag == "*" or tag.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+def json_response(body: bytes, headers: Optional[Dict[str, str]] = None) -> Response:
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+def conditional_json(
+    request: Request, version: str, policy: Tuple[int, int], body: Callable[[], Optional[bytes]]
+) -> Response:
+    """
+    Resposta com ETag/Cache-Control. Se o cliente já tem essa versão
+    (If-None-Match), devolve 304 sem tocar no corpo; senão manda os
+    bytes prontos, sem passar pelo jsonable_encoder.
+    """
+    etag = quote_etag(version)
+    max_age, swr = policy
+    headers = {
+        "ETag": etag,
+        "Cache-Control": f"public, max-age={max_age}, stale-while-revalidate={swr}",
+    }
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    return json_response(body() or b"null", headers)
+
+
+def cached_json(request: Request, key: str, value: Any, policy: Tuple[int, int], stale: bool = False) -> Response:
+    """
+    Resposta de `value`, que o handler acabou de ler/gravar em `key`:
+    reaproveita os bytes/versão da entrada de cache quando ela ainda é a
+    mesma; se expirou (ou foi trocada) no meio do caminho, serializa `value`.
+    """
+    max_age = CACHE_STALE_TTL if stale else CACHE_TTL
+    ent = _cache_entry(key, max_age)
+    if ent is None or ent.value is not value:
+        ent = CacheEntry(ts=time.time(), value=value)  # avulsa, fora do _CACHE
+    resp = conditional_json(request, entry_version(ent), policy, lambda: entry_body(ent))
+    if stale:
+        resp.headers["X-Cache"] = "stale"
+    return resp
+
+
+# =========================================================
+# Helpers
+# =========================================================
+def now_tz() -> datetime:
+    if TZ:
+        return datetime.now(TZ)
+    return datetime.utcnow()
+
+
+def parse_utc(utc_iso: str) -> Optional[datetime]:
+    if not utc_iso:
+        return None
+    try:
+        dt = datetime.fromisoformat(utc_iso.replace("Z", "+00:00"))
+        if TZ:
+            dt = dt.astimezone(TZ)
+        return dt
+    except Exception:
+        return None
+
+
+def utc_to_br(utc_iso: str) -> str:
+    dt = parse_utc(utc_iso)
+    if not dt:
+        return "-"
+    return dt.strftime("%d/%m/%Y %H:%M")
+
+
+def normalize_team_name(s: str) -> str:
+    s = (s or "").lower().strip()
+    for token in [" fc", " cf", " sc", " ac", " afc", " cfc", ".", ",", "'", '"']:
+        s = s.replace(token, "")
+    s = " ".join(s.split())
+    return s
+
+
+def league_name(code: str) -> str:
+    for l in LEAGUES:
+        if l["code"] == code:
+            return l["name"]
+    return code
+
+
+def get_team_crest(team_obj: Dict[str, Any]) -> Optional[str]:
+    if not team_obj:
+        return None
+    for k in ("crest", "crestUrl", "logo", "image", "badge"):
+        v = team_obj.get(k)
+        if isinstance(v, str) and v.strip():
+            return v.strip()
+    return None
+
+
+def effective_status(match_status: str, utc_date: str) -> str:
+    st = (match_status or "").upper().strip()
+    dt = parse_utc(utc_date)
+
+    if st in ("LIVE", "IN_PLAY", "PAUSED"):
+        return st
+
+    if st in ("SCHEDULED", "TIMED") and dt:
+        n = now_tz()
+        if dt <= n <= (dt + timedelta(minutes=LIVE_INFER_MINUTES)):
+            return "LIVE_EST"
+
+    return st or "SCHEDULED"
+
+
+def score_pair(x: Any) -> Optional[Tuple[int, int]]:
+    if not isinstance(x, dict):
+        return None
+    h = x.get("home")
+    a = x.get("away")
+    if h is None or a is None:
+        return None
+    try:
+        return int(h), int(a)
+    except Exception:
+        return None
+
+
+def extract_live_score(score_obj: Dict[str, Any], status_eff: str) -> Optional[Dict[str, Any]]:
+    if not isinstance(score_obj, dict):
+        return None
+
+    candidates = []
+    for k in ("fullTime", "regularTime", "halfTime", "extraTime", "penalties"):
+        pair = score_pair(score_obj.get(k))
+        if pair:
+            candidates.append((k, pair))
+
+    if not candidates:
+        return None
+
+    key, (h, a) = candidates[0]
+
+    label = "Placar"
+    if status_eff in ("LIVE", "IN_PLAY", "LIVE_EST"):
+        label = "Placar (ao vivo)"
+    elif status_eff == "PAUSED":
+        label = "Placar (intervalo)"
+    elif status_eff == "FINISHED":
+        label = "Placar (final)"
+
+    return {"home": h, "away": a, "src": key, "label": label}
+
+
+def match_row(m: Dict[str, Any]) -> Dict[str, Any]:
+    """Converte um match cru da football-data.org no formato usado por /matches e /card."""
+    utc = m.get("utcDate") or ""
+    st_raw = (m.get("status") or "").upper()
+    st_eff = effective_status(st_raw, utc)
+
+    home_obj = (m.get("homeTeam") or {}) if isinstance(m.get("homeTeam"), dict) else {}
+    away_obj = (m.get("awayTeam") or {}) if isinstance(m.get("awayTeam"), dict) else {}
+
+    return {
+        "id": m.get("id"),
+        "utcDate": utc,
+        "dateBR": utc_to_br(utc),
+        "home": home_obj.get("name"),
+        "away": away_obj.get("name"),
+        "homeCrest": get_team_crest(home_obj),
+        "awayCrest": get_team_crest(away_obj),
+        "status_raw": st_raw,
+        "status_eff": st_eff,
+        "status_pt": STATUS_PT.get(st_eff, st_eff or "-"),
+        "score": m.get("score") or {},
+    }
+
+
+# =========================================================
+# Poisson
+# =========================================================
+def poisson_pmf(k: int, lam: float) -> float:
+    if lam <= 0:
+        return 1.0 if k == 0 else 0.0
+    return math.exp(-lam) * (lam ** k) / math.factorial(k)
+
+
+@timed("poisson")
+def score_matrix(lh: float, la: float, max_goals: int = 7) -> List[List[float]]:
+    mat = []
+    for i in range(max_goals + 1):
+        pi = poisson_pmf(i, lh)
+        row = []
+        for j in range(max_goals + 1):
+            row.append(pi * poisson_pmf(j, la))
+        mat.append(row)
+    return mat
+
+
+def probs_from_matrix(mat: List[List[float]]) -> Tuple[float, float, float]:
+    p_home = p_draw = p_away = 0.0
+    for i, row in enumerate(mat):
+        for j, p in enumerate(row):
+            if i > j:
+                p_home += p
+            elif i == j:
+                p_draw += p
+            else:
+                p_away += p
+    return p_home, p_draw, p_away
+
+
+def btts_from_matrix(mat: List[List[float]]) -> float:
+    p = 0.0
+    for i, row in enumerate(mat):
+        for j, v in enumerate(row):
+            if i >= 1 and j >= 1:
+                p += v
+    return p
+
+
+def over_from_matrix(mat: List[List[float]], line: float) -> float:
+    thr = int(math.floor(line + 1e-9)) + 1
+    p = 0.0
+    for i, row in enumerate(mat):
+        for j, v in enumerate(row):
+            if (i + j) >= thr:
+                p += v
+    return p
+
+
+def top_scorelines(mat: List[List[float]], top_n: int = 3) -> List[Tuple[str, float]]:
+    items = []
+    for i, row in enumerate(mat):
+        for j, p in enumerate(row):
+            items.append((f"{i}-{j}", p))
+    items.sort(key=lambda x: x[1], reverse=True)
+    return items[:top_n]
+
+
+@timed("poisson")
+def score_matrices(lh: np.ndarray, la: np.ndarray, max_goals: int = 7) -> np.ndarray:
+    """Versão em lote do score_matrix: shape (n, max_goals + 1, max_goals + 1)."""
+    k = np.arange(max_goals + 1, dtype=float)
+    fact = np.array([math.factorial(i) for i in range(max_goals + 1)], dtype=float)
+    ph = np.exp(-lh)[:, None] * lh[:, None] ** k / fact
+    pa = np.exp(-la)[:, None] * la[:, None] ** k / fact
+    return ph[:, :, None] * pa[:, None, :]
+
+
+# =========================================================
+# Baseline predictor
+# =========================================================
+@timed("teamstats")
+def build_team_stats_from_finished(code: str) -> Dict[str, Any]:
+    cache_key = f"teamstats:{code}"
+    cached = cache_get(cache_key)
+    if cached is not None:
+        return cached
+
+    today = datetime.utcnow().date()
+    date_from = (today - timedelta(days=365)).strftime("%Y-%m-%d")
+    date_to = today.strftime("%Y-%m-%d")
+
+    try:
+        data = fetch_competition_matches(code, statuses=["FINISHED"], limit=400, date_from=date_from, date_to=date_to)
+    except Exception:
+        stale = cache_get_stale(cache_key)
+        if stale is not None:
+            return stale
+        raise
+    matches = data.get("matches", []) or []
+
+    team: Dict[str, Dict[str, int]] = {}
+    tot_home_goals = 0
+    tot_away_goals = 0
+    tot_games = 0
+
+    def ensure(tn: str):
+        if tn not in team:
+            team[tn] = {
+                "home_scored": 0, "home_conceded": 0, "home_games": 0,
+                "away_scored": 0, "away_conceded": 0, "away_games": 0,
+            }
+
+    for m in matches:
+        sc = m.get("score") or {}
+        ft = sc.get("fullTime") or {}
+        hg = ft.get("home")
+        ag = ft.get("away")
+        if hg is None or ag is None:
+            continue
+
+        hname = ((m.get("homeTeam") or {}).get("name") or "").strip()
+        aname = ((m.get("awayTeam") or {}).get("name") or "").strip()
+        if not hname or not aname:
+            continue
+
+        ensure(hname)
+        ensure(aname)
+
+        team[hname]["home_scored"] += int(hg)
+        team[hname]["home_conceded"] += int(ag)
+        team[hname]["home_games"] += 1
+
+        team[aname]["away_scored"] += int(ag)
+        team[aname]["away_conceded"] += int(hg)
+        team[aname]["away_games"] += 1
+
+        tot_home_goals += int(hg)
+        tot_away_goals += int(ag)
+        tot_games += 1
+
+    league_home_avg = (tot_home_goals / tot_games) if tot_games else 1.35
+    league_away_avg = (tot_away_goals / tot_games) if tot_games else 1.10
+
+    out = {
+        "teams": team,
+        "league_home_avg": league_home_avg,
+        "league_away_avg": league_away_avg,
+        "games_used": tot_games,
+    }
+    # carimbo de versão: só muda se os números mudarem (usado pelo PRED_STORE)
+    out["version"] = hashlib.sha1(json.dumps(out, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+    cache_set(cache_key, out)
+    return out
+
+
+def baseline_expected_goals(code: str, home: str, away: str) -> Tuple[float, float]:
+    stats = build_team_stats_from_finished(code)
+    teams = stats["teams"]
+    lh_avg = stats["league_home_avg"]
+    la_avg = stats["league_away_avg"]
+
+    def safe_div(a: float, b: float) -> float:
+        return a / b if b > 1e-9 else 1.0
+
+    def team_rates(name: str) -> Tuple[float, float, float, float, int, int]:
+        row = teams.get(name)
+        if not row:
+            nn = normalize_team_name(name)
+            for k in teams.keys():
+                if normalize_team_name(k) == nn:
+                    row = teams[k]
+                    break
+        if not row:
+            return (lh_avg, la_avg, la_avg, lh_avg, 0, 0)
+
+        hg = row["home_games"]
+        ag = row["away_games"]
+        hs_avg = safe_div(row["home_scored"], hg) if hg else lh_avg
+        hc_avg = safe_div(row["home_conceded"], hg) if hg else la_avg
+        as_avg = safe_div(row["away_scored"], ag) if ag else la_avg
+        ac_avg = safe_div(row["away_conceded"], ag) if ag else lh_avg
+        return (hs_avg, hc_avg, as_avg, ac_avg, hg, ag)
+
+    hs_avg, hc_avg, _, _, home_hg, _ = team_rates(home)
+    _, _, as_avg, ac_avg, _, away_ag = team_rates(away)
+
+    home_attack = safe_div(hs_avg, lh_avg)
+    away_def = safe_div(ac_avg, lh_avg)
+
+    away_attack = safe_div(as_avg, la_avg)
+    home_def = safe_div(hc_avg, la_avg)
+
+    xh = lh_avg * home_attack * away_def
+    xa = la_avg * away_attack * home_def
+
+    min_games = min(home_hg, away_ag)
+    if min_games < 3:
+        xh = (xh + lh_avg) / 2.0
+        xa = (xa + la_avg) / 2.0
+
+    xh = max(0.2, min(3.5, xh))
+    xa = max(0.2, min(3.5, xa))
+    return xh, xa
+
+
+def compute_prediction(code: str, home: str, away: str) -> Dict[str, Any]:
+    lh, la = baseline_expected_goals(code, home, away)
+
+    mat = score_matrix(lh, la, max_goals=7)
+    p_home, p_draw, p_away = probs_from_matrix(mat)
+
+    btts = btts_from_matrix(mat)
+    over15 = over_from_matrix(mat, 1.5)
+    over25 = over_from_matrix(mat, 2.5)
+    top3 = top_scorelines(mat, 3)
+
+    return {
+        "lambda_home": lh,
+        "lambda_away": la,
+        "p_home": p_home,
+        "p_draw": p_draw,
+        "p_away": p_away,
+        "btts": btts,
+        "over_1_5": over15,
+        "over_2_5": over25,
+        "top_scores": [{"score": s, "p": p} for s, p in top3],
+        "mode": "baseline",
+    }
+
+
+def compute_predictions_batch(code: str, pairs: List[Tuple[str, str]], top_n: int = 3) -> List[Dict[str, Any]]:
+    """
+    Mesmo resultado do compute_prediction para vários jogos de uma vez:
+    um snapshot de teamstats e todas as matrizes calculadas em NumPy.
+    """
+    if not pairs:
+        return []
+
+    lams = [baseline_expected_goals(code, home, away) for home, away in pairs]
+    lh = np.array([x[0] for x in lams], dtype=float)
+    la = np.array([x[1] for x in lams], dtype=float)
+
+    mats = score_matrices(lh, la, max_goals=7)
+    i, j = np.indices(mats.shape[1:])
+    tot = i + j
+
+    p_home = (mats * (i > j)).sum(axis=(1, 2))
+    p_draw = np.trace(mats, axis1=1, axis2=2)
+    p_away = (mats * (i < j)).sum(axis=(1, 2))
+    btts = mats[:, 1:, 1:].sum(axis=(1, 2))
+    over15 = (mats * (tot >= 2)).sum(axis=(1, 2))
+    over25 = (mats * (tot >= 3)).sum(axis=(1, 2))
+
+    flat = mats.reshape(len(pairs), -1)
+    top_idx = np.argsort(-flat, axis=1, kind="stable")[:, :top_n]
+    side = mats.shape[2]
+
+    out: List[Dict[str, Any]] = []
+    for n in range(len(pairs)):
+        out.append({
+            "lambda_home": float(lh[n]),
+            "lambda_away": float(la[n]),
+            "p_home": float(p_home[n]),
+            "p_draw": float(p_draw[n]),
+            "p_away": float(p_away[n]),
+            "btts": float(btts[n]),
+            "over_1_5": float(over15[n]),
+            "over_2_5": float(over25[n]),
+            "top_scores": [
+                {"score": f"{int(t) // side}-{int(t) % side}", "p": float(flat[n, t])}
+                for t in top_idx[n]
+            ],
+            "mode": "baseline",
+        })
+    return out
+
+
+# Previsões materializadas por match_id; recalculadas em lote quando o
+# teamstats da competição muda de versão.
+PRED_STORE = PredictionStore()
+
+
+def predictions_for(code: str, rows: List[Dict[str, Any]]) -> Dict[int, Dict[str, Any]]:
+    stats = build_team_stats_from_finished(code)
+    fixtures = {
+        int(r["id"]): (r.get("home") or "", r.get("away") or "")
+        for r in rows
+        if r.get("id") is not None
+    }
+    return PRED_STORE.get_many(
+        code,
+        stats["version"],
+        fixtures,
+        lambda pairs: compute_predictions_batch(code, pairs),
+    )
+
+
+def pct(x: Optional[float]) -> Optional[float]:
+    if x is None:
+        return None
+    try:
+        return float(x) * 100.0
+    except Exception:
+        return None
+
+
+def present_prediction(pred: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "p_home": pct(pred.get("p_home")),
+        "p_draw": pct(pred.get("p_draw")),
+        "p_away": pct(pred.get("p_away")),
+        "lambda_home": pred.get("lambda_home"),
+        "lambda_away": pred.get("lambda_away"),
+        "btts": pct(pred.get("btts")),
+        "over_1_5": pct(pred.get("over_1_5")),
+        "over_2_5": pct(pred.get("over_2_5")),
+        "top_scores": pred.get("top_scores") or [],
+        "mode": pred.get("mode") or "baseline",
+    }
+
+
+# =========================================================
+# Standings
+# =========================================================
+def parse_standings(standings_json: Dict[str, Any]) -> List[Dict[str, Any]]:
+    standings = standings_json.get("standings") or []
+    table = None
+    for st in standings:
+        if (st.get("type") or "").upper() == "TOTAL":
+            table = st.get("table")
+            break
+    if table is None:
+        for st in standings:
+            t = st.get("table")
+            if t:
+                table = t
+                break
+    return table or []
+
+
+def find_team_in_table(table: List[Dict[str, Any]], team_name: str) -> Optional[Dict[str, Any]]:
+    target = normalize_team_name(team_name)
+    best = None
+    for row in table:
+        t = row.get("team", {}) or {}
+        name = t.get("name") or ""
+        if normalize_team_name(name) == target:
+            return row
+        if target and target in normalize_team_name(name):
+            best = best or row
+    return best
+
+
+@timed("standings")
+def standings_table_cached(code: str) -> Optional[List[Dict[str, Any]]]:
+    cache_key = f"standings:{code}"
+    cached = cache_get(cache_key)
+    if cached is None:
+        try:
+            cached = fetch_competition_standings(code)
+            cache_set(cache_key, cached)
+        except Exception:
+            cached = cache_get_stale(cache_key)
+            if cached is None:
+                return None
+    return parse_standings(cached)
+
+
+def pack_standing_row(row: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    if not row:
+        return None
+    team = row.get("team", {}) or {}
+    return {
+        "team": team.get("name"),
+        "crest": get_team_crest(team),
+        "pos": row.get("position"),
+        "pts": row.get("points"),
+        "pj": row.get("playedGames"),
+        "sg": row.get("goalDifference"),
+        "w": row.get("won"),
+    }
+
+
+def standings_for_teams(table: Optional[List[Dict[str, Any]]], home_team: str, away_team: str) -> Dict[str, Any]:
+    if table is None:
+        return {"home": None, "away": None}
+    return {
+        "home": pack_standing_row(find_team_in_table(table, home_team)),
+        "away": pack_standing_row(find_team_in_table(table, away_team)),
+    }
+
+
+def fetch_standings_cached(code: str, home_team: str, away_team: str) -> Dict[str, Any]:
+    return standings_for_teams(standings_table_cached(code), home_team, away_team)
+
+
+# =========================================================
+# Last5 + streak (computado)
+# =========================================================
+def compute_outcome_for_team(is_home: bool, hg: int, ag: int) -> str:
+    if hg == ag:
+        return "E"
+    if is_home:
+        return "V" if hg > ag else "D"
+    else:
+        return "V" if ag > hg else "D"
+
+
+def compute_streak(outcomes: List[str]) -> str:
+    if not outcomes:
+        return "—"
+    first = outcomes[0]
+    k = 1
+    for i in range(1, len(outcomes)):
+        if outcomes[i] == first:
+            k += 1
+        else:
+            break
+    return f"{k}{first}"
+
+
+def build_form_index(matches: List[Dict[str, Any]], n: int = 5) -> Dict[str, Dict[str, List[str]]]:
+    """
+    Uma passada sobre os jogos finalizados (mais recente primeiro) gerando,
+    por time normalizado, as últimas N linhas de placar e resultados (V/E/D).
+    """
+    idx: Dict[str, Dict[str, List[str]]] = {}
+    for m in sorted(matches, key=lambda m: (m.get("utcDate") or ""), reverse=True):
+        sc = m.get("score") or {}
+        ft = sc.get("fullTime") or {}
+        hg = ft.get("home")
+        ag = ft.get("away")
+        if hg is None or ag is None:
+            continue
+
+        h = ((m.get("homeTeam") or {}).get("name") or "")
+        a = ((m.get("awayTeam") or {}).get("name") or "")
+        if not h or not a:
+            continue
+
+        line = f"{h} {int(hg)}-{int(ag)} {a}"
+
+        for norm, is_home in ((normalize_team_name(h), True), (normalize_team_name(a), False)):
+            ent = idx.setdefault(norm, {"lines": [], "outcomes": []})
+            if len(ent["lines"]) < n:
+                ent["lines"].append(line)
+                ent["outcomes"].append(compute_outcome_for_team(is_home, int(hg), int(ag)))
+    return idx
+
+
+@timed("last5")
+def form_index_cached(code: str) -> Optional[Dict[str, Dict[str, List[str]]]]:
+    cache_key = f"form:{code}"
+    idx = cache_get(cache_key)
+    if idx is not None:
+        return idx
+
+    data = cache_get(f"last5:{code}")
+    if data is None:
+        today = datetime.utcnow().date()
+        date_from = (today - timedelta(days=180)).strftime("%Y-%m-%d")
+        date_to = today.strftime("%Y-%m-%d")
+        try:
+            data = fetch_competition_matches(code, statuses=["FINISHED"], limit=400, date_from=date_from, date_to=date_to)
+            cache_set(f"last5:{code}", data)
+        except Exception:
+            return cache_get_stale(cache_key)
+
+    idx = build_form_index(data.get("matches", []) or [])
+    cache_set(cache_key, idx)
+    return idx
+
+
+def last5_for_teams(
+    idx: Optional[Dict[str, Dict[str, List[str]]]], home_team: str, away_team: str
+) -> Tuple[List[str], List[str], str, str]:
+    if idx is None:
+        return [], [], "—", "—"
+
+    def team_form(name: str) -> Tuple[List[str], List[str]]:
+        norm = normalize_team_name(name)
+        ent = idx.get(norm) if norm else None
+        if not ent:
+            return [], []
+        return list(ent["lines"]), ent["outcomes"]
+
+    home_list, home_outcomes = team_form(home_team)
+    away_list, away_outcomes = team_form(away_team)
+    return home_list, away_list, compute_streak(home_outcomes), compute_streak(away_outcomes)
+
+
+def fetch_last5(code: str, home_team: str, away_team: str) -> Tuple[List[str], List[str], str, str]:
+    return last5_for_teams(form_index_cached(code), home_team, away_team)
+
+
+# =========================================================
+# Card (montagem por seção)
+# =========================================================
+def card_window_cached(code: str) -> Dict[str, Any]:
+    """
+    Jogos de -30/+60 dias da competição já no formato do match_row: uma ida
+    à API por código a cada CACHE_TTL, compartilhada por /card, /card/stream
+    e /cards (jogo fora dos blocos do /matches não refaz a busca).
+    """
+    cache_key = f"cardwindow:{code}"
+    hit = cache_get(cache_key)
+    if hit is not None:
+        return hit
+
+    today = datetime.utcnow().date()
+    date_from = (today - timedelta(days=30)).strftime("%Y-%m-%d")
+    date_to = (today + timedelta(days=60)).strftime("%Y-%m-%d")
+    data = fetch_competition_matches(code, statuses=None, limit=400, date_from=date_from, date_to=date_to)
+    out = {"matches": [match_row(m) for m in data.get("matches", []) or []]}
+    cache_set(cache_key, out)
+    return out
+
+
+def find_card_matches(code: str, match_ids: List[int]) -> Dict[int, Dict[str, Any]]:
+    """
+    Resolve vários jogos de uma vez: primeiro nos blocos de /matches e na
+    janela de -30/+60 dias já cacheados e, só para os que faltarem, busca
+    a janela na API (card_window_cached).
+    """
+    wanted = {int(x) for x in match_ids}
+    found: Dict[int, Dict[str, Any]] = {}
+
+    def scan_rows(rows: List[Dict[str, Any]]) -> None:
+        for m in rows:
+            mid = int(m.get("id", -1))
+            if mid in wanted and mid not in found:
+                found[mid] = {k: v for k, v in m.items() if k != "prediction"}
+
+    def scan_blocks(get: Callable[[str], Optional[Any]]) -> None:
+        keys = [f"matches:{code}:{st}:50" for st in ["SCHEDULED", "LIVE", "FINISHED", "ALL"]]
+        for key in keys + [f"cardwindow:{code}"]:
+            block = get(key)
+            if block:
+                scan_rows(block.get("matches", []) or [])
+
+    scan_blocks(cache_get)
+
+    if len(found) < len(wanted):
+        try:
+            window = card_window_cached(code)
+        except Exception:
+            # API fora: usa o que sobrou dos blocos vencidos do /matches
+            scan_blocks(cache_get_stale)
+            if found:
+                return found
+            raise
+        scan_rows(window["matches"])
+
+    return found
+
+
+def find_card_match(code: str, match_id: int) -> Dict[str, Any]:
+    found = find_card_matches(code, [match_id]).get(int(match_id))
+    if not found:
+        raise HTTPException(status_code=404, detail="Jogo não encontrado.")
+    return found
+
+
+def card_version(code: str, found: Dict[str, Any]) -> Optional[str]:
+    """
+    Versão do /card a partir das versões das entradas de cache que o compõem
+    (teamstats, standings, forma) + status/placar do jogo. None se alguma
+    parte ainda não está no cache (aí o card precisa ser montado mesmo).
+    """
+    parts = [cache_version(f"{ns}:{code}") for ns in ("teamstats", "standings", "form")]
+    if any(p is None for p in parts):
+        return None
+    score = json.dumps(found.get("score") or {}, sort_keys=True)
+    return parts_version(code, found.get("id"), found.get("status_eff"), score, *parts)
+
+
+def card_last5_section(code: str, home_team: str, away_team: str) -> Dict[str, Any]:
+    last5_home, last5_away, streak_home, streak_away = fetch_last5(code, home_team, away_team)
+    return {
+        "last5": {"home": last5_home, "away": last5_away},
+        "streak": {"home": streak_home, "away": streak_away},
+    }
+
+
+def card_standings_section(code: str, home_team: str, away_team: str) -> Dict[str, Any]:
+    return {"standings": fetch_standings_cached(code, home_team, away_team)}
+
+
+def ndjson_line(obj: Dict[str, Any]) -> bytes:
+    return json_bytes(obj) + b"\n"
+
+
+def section_error(exc: Exception) -> str:
+    if isinstance(exc, HTTPException):
+        return str(exc.detail)
+    return f"{type(exc).__name__}: {exc}"
+
+
+def iter_card_sections(code: str, found: Dict[str, Any], stream_errors: bool = False) -> Iterator[Dict[str, Any]]:
+    """
+    Gera o card em pedaços, na ordem em que ficam prontos:
+    cabeçalho + previsão primeiro (só dependem do teamstats), depois
+    live_score (já vem no match) e, por fim, standings e last5/streak,
+    que podem precisar de ida à API e rodam em paralelo.
+
+    Com `stream_errors` (NDJSON, headers já enviados) a falha de uma seção
+    vira {"section": nome, "error": ...} e as outras seguem; sem ele a
+    exceção sobe (o /card responde com o status de erro). Em ambos os
+    casos a última linha é {"section": "done"}.
+    """
+    home_team = found.get("home") or ""
+    away_team = found.get("away") or ""
+
+    def section(name: str, build: Callable[[], Dict[str, Any]]) -> Dict[str, Any]:
+        try:
+            return {"section": name, **build()}
+        except Exception as e:
+            if not stream_errors:
+                raise
+            return {"section": name, "error": section_error(e)}
+
+    def prediction() -> Dict[str, Any]:
+        pred = predictions_for(code, [found]).get(int(found.get("id") or 0))
+        if pred is None:
+            pred = compute_prediction(code, home_team, away_team)
+        return {"prediction": present_prediction(pred)}
+
+    closed = False
+    try:
+        yield {
+            "section": "match",
+            "match": found,
+            "league": {"code": code, "name": league_name(code)},
+        }
+
+        yield section("prediction", prediction)
+
+        yield section("live_score", lambda: {
+            "live_score": extract_live_score(found.get("score") or {}, found.get("status_eff") or "")
+        })
+
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            futures = {
+                pool.submit(copy_context().run, card_standings_section, code, home_team, away_team): "standings",
+                pool.submit(copy_context().run, card_last5_section, code, home_team, away_team): "last5",
+            }
+            for fut in as_completed(futures):
+                yield section(futures[fut], fut.result)
+    except GeneratorExit:
+        closed = True  # cliente desconectou: não dá pra gerar mais nada
+        raise
+    finally:
+        if not closed:
+            yield {"section": "done"}
+
+
+def build_cards(code: str, match_ids: List[int]) -> Dict[str, Any]:
+    """
+    Monta vários cards numa passada só: um lookup dos jogos, um teamstats,
+    uma tabela de classificação e um índice de forma compartilhados.
+    """
+    ids = list(dict.fromkeys(int(x) for x in match_ids))
+    found = find_card_matches(code, ids)
+    order = [mid for mid in ids if mid in found]
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        fut_table = pool.submit(copy_context().run, standings_table_cached, code)
+        fut_form = pool.submit(copy_context().run, form_index_cached, code)
+        pairs = [(found[mid].get("home") or "", found[mid].get("away") or "") for mid in order]
+        stored = predictions_for(code, [found[mid] for mid in order])
+        # sem previsão na tabela (não deveria acontecer): calcula avulsa, como o /card
+        preds = [stored.get(mid) or compute_prediction(code, *pair) for mid, pair in zip(order, pairs)]
+        table = fut_table.result()
+        form = fut_form.result()
+
+    league = {"code": code, "name": league_name(code)}
+    cards: List[Dict[str, Any]] = []
+    for mid, (home_team, away_team), pred in zip(order, pairs, preds):
+        m = found[mid]
+        last5_home, last5_away, streak_home, streak_away = last5_for_teams(form, home_team, away_team)
+        cards.append({
+            "match": m,
+            "league": league,
+            "prediction": present_prediction(pred),
+            "live_score": extract_live_score(m.get("score") or {}, m.get("status_eff") or ""),
+            "last5": {"home": last5_home, "away": last5_away},
+            "streak": {"home": streak_home, "away": streak_away},
+            "standings": standings_for_teams(table, home_team, away_team),
+        })
+
+    return {
+        "code": code,
+        "league": league,
+        "count": len(cards),
+        "cards": cards,
+        "missing": [mid for mid in ids if mid not in found],
+    }
+
+
+def parse_ids(ids: Any) -> List[int]:
+    if isinstance(ids, str):
+        ids = [x for x in ids.replace(";", ",").split(",") if x.strip()]
+    try:
+        out = [int(x) for x in (ids or [])]
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="ids inválidos (use números separados por vírgula).")
+    if not out:
+        raise HTTPException(status_code=400, detail="Informe pelo menos um id.")
+    if len(out) > MAX_BATCH_CARDS:
+        raise HTTPException(status_code=400, detail=f"Máximo de {MAX_BATCH_CARDS} jogos por chamada.")
+    return out
+
+
+class CardsRequest(BaseModel):
+    code: str
+    ids: List[int]
+
+
+# =========================================================
+# Agregação multi-competição (/today, /window)
+# =========================================================
+_PREDS_LIVE: Dict[str, Tuple[float, Dict[int, Dict[str, Any]]]] = {}
+
+
+def load_preds_live(code: str) -> Dict[int, Dict[str, Any]]:
+    """Previsões exportadas pelo predict_live, indexadas por match_id (recarrega se o arquivo mudar)."""
+    path = PREDS_LIVE_DIR / f"{code}.json"
+    try:
+        mtime = path.stat().st_mtime
+    except OSError:
+        return {}
+
+    hit = _PREDS_LIVE.get(code)
+    if hit and hit[0] == mtime:
+        return hit[1]
+
+    try:
+        data = json.loads(path.read_text(encoding="utf-8"))
+    except Exception:
+        return {}
+
+    idx: Dict[int, Dict[str, Any]] = {}
+    for p in data.get("predictions") or []:
+        mid = p.get("match_id")
+        if mid is not None:
+            idx[int(mid)] = p
+    _PREDS_LIVE[code] = (mtime, idx)
+    return idx
+
+
+def present_stored_prediction(p: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    if not p or p.get("error"):
+        return None
+    probs = p.get("probabilities_1x2") or {}
+    xg = p.get("expected_goals") or {}
+    return {
+        "p_home": pct(probs.get("home_win")),
+        "p_draw": pct(probs.get("draw")),
+        "p_away": pct(probs.get("away_win")),
+        "lambda_home": xg.get("home"),
+        "lambda_away": xg.get("away"),
+        "mode": "model",
+    }
+
+
+def in_local_window(utc_iso: str, d_from: datetime, d_to: datetime) -> bool:
+    dt = parse_utc(utc_iso)
+    return bool(dt) and d_from.date() <= dt.date() <= d_to.date()
+
+
+def league_window_rows(code: str, d_from: datetime, d_to: datetime) -> Tuple[List[Dict[str, Any]], str]:
+    """
+    Jogos de uma competição na janela (datas locais, fuso BR).
+    Ordem de fontes: cache -> API -> cache vencido -> arquivo local do predict_live.
+    """
+    key_from = d_from.strftime("%Y-%m-%d")
+    key_to = d_to.strftime("%Y-%m-%d")
+    cache_key = f"window:{code}:{key_from}:{key_to}"
+    cached = cache_get(cache_key)
+    if cached is not None:
+        return cached, "cache"
+
+    try:
+        # a API filtra por data UTC; pega um dia a mais e filtra no fuso local
+        data = fetch_competition_matches(
+            code,
+            statuses=None,
+            limit=400,
+            date_from=key_from,
+            date_to=(d_to + timedelta(days=1)).strftime("%Y-%m-%d"),
+        )
+        raw = data.get("matches", []) or []
+        source = "api"
+    except Exception:
+        stale = cache_get_stale(cache_key)
+        if stale is not None:
+            return stale, "stale"
+        raw = [
+            {
+                "id": p.get("match_id"),
+                "utcDate": p.get("utcDate"),
+                "status": p.get("status"),
+                "homeTeam": {"name": p.get("home")},
+                "awayTeam": {"name": p.get("away")},
+            }
+            for p in load_preds_live(code).values()
+        ]
+        source = "local"
+
+    rows = []
+    for m in raw:
+        if not in_local_window(m.get("utcDate") or "", d_from, d_to):
+            continue
+        r = match_row(m)
+        r["code"] = code
+        r["league"] = league_name(code)
+        rows.append(r)
+
+    if source == "api":
+        cache_set(cache_key, rows)
+    return rows, source
+
+
+def encode_cursor(row: Dict[str, Any]) -> str:
+    raw = json.dumps([row.get("utcDate") or "", row.get("code") or "", row.get("id") or 0])
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> Tuple[str, str, int]:
+    try:
+        utc, code, mid = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return str(utc), str(code), int(mid)
+    except Exception:
+        raise HTTPException(status_code=400, detail="cursor inválido.")
+
+
+def window_sort_key(row: Dict[str, Any]) -> Tuple[str, str, int]:
+    return (row.get("utcDate") or "", row.get("code") or "", int(row.get("id") or 0))
+
+
+def build_window(d_from: datetime, d_to: datetime, status: str) -> Dict[str, Any]:
+    """
+    Junta todas as competições de LEAGUES em paralelo, ordena por horário
+    e anexa as previsões já calculadas. O resultado inteiro fica numa única
+    entrada de cache; a paginação só fatia essa lista.
+    """
+    key_from = d_from.strftime("%Y-%m-%d")
+    key_to = d_to.strftime("%Y-%m-%d")
+    cache_key = f"window_all:{key_from}:{key_to}:{status}"
+    cached = cache_get(cache_key)
+    if cached is not None:
+        return cached
+
+    codes = [l["code"] for l in LEAGUES]
+    sources: Dict[str, str] = {}
+    rows: List[Dict[str, Any]] = []
+
+    with ThreadPoolExecutor(max_workers=len(codes)) as pool:
+        futures = {pool.submit(copy_context().run, league_window_rows, c, d_from, d_to): c for c in codes}
+        for fut in as_completed(futures):
+            code = futures[fut]
+            try:
+                part, sources[code] = fut.result()
+            except Exception:
+                part, sources[code] = [], "error"
+            preds = load_preds_live(code)
+            for r in part:
+                r = dict(r)
+                r["prediction"] = present_stored_prediction(preds.get(int(r.get("id") or 0)))
+                rows.append(r)
+
+    desired = STATUS_FILTERS.get(status)
+    if desired is not None:
+        desired_set = set(desired)
+        rows = [r for r in rows if r.get("status_eff") in desired_set]
+
+    rows.sort(key=window_sort_key)
+
+    out = {"from": key_from, "to": key_to, "status_filter": status, "matches": rows, "sources": sources}
+    cache_set(cache_key, out)
+    return out
+
+
+def paginate_window(view: Dict[str, Any], limit: int, cursor: Optional[str]) -> Dict[str, Any]:
+    rows = view["matches"]
+    start = 0
+    if cursor:
+        after = decode_cursor(cursor)
+        while start < len(rows) and window_sort_key(rows[start]) <= after:
+            start += 1
+
+    page = rows[start:start + limit]
+    has_more = (start + limit) < len(rows)
+    return {
+        "from": view["from"],
+        "to": view["to"],
+        "status_filter": view["status_filter"],
+        "total": len(rows),
+        "count": len(page),
+        "matches": page,
+        "next_cursor": encode_cursor(page[-1]) if (page and has_more) else None,
+        "sources": view["sources"],
+    }
+
+
+def parse_day(s: str, field: str) -> datetime:
+    try:
+        return datetime.strptime(s, "%Y-%m-%d")
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=400, detail=f"{field} inválido (use YYYY-MM-DD).")
+
+
+# =========================================================
+# Live push (SSE): um poller por competição
+# =========================================================
+def fetch_live_rows(code: str) -> List[Dict[str, Any]]:
+    today = datetime.utcnow().date()
+    date_from = (today - timedelta(days=1)).strftime("%Y-%m-%d")
+    date_to = (today + timedelta(days=1)).strftime("%Y-%m-%d")
+    data = fetch_competition_matches(code, statuses=None, limit=400, date_from=date_from, date_to=date_to)
+
+    rows: List[Dict[str, Any]] = []
+    for m in data.get("matches", []) or []:
+        r = match_row(m)
+        rows.append({
+            "id": r["id"],
+            "utcDate": r["utcDate"],
+            "home": r["home"],
+            "away": r["away"],
+            "status_eff": r["status_eff"],
+            "status_pt": r["status_pt"],
+            "live_score": extract_live_score(r["score"], r["status_eff"]),
+        })
+    return rows
+
+
+def live_row_key(row: Dict[str, Any]) -> Tuple[Any, ...]:
+    ls = row.get("live_score") or {}
+    return (row.get("status_eff"), ls.get("home"), ls.get("away"))
+
+
+def sse_event(event: str, data: Any) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+class LiveHub:
+    """
+    Mantém um único loop de polling por competição enquanto houver
+    inscritos e distribui para todos só os jogos que mudaram
+    (status_eff ou placar).
+    """
+
+    def __init__(self, code: str):
+        self.code = code
+        self.subscribers: Set[asyncio.Queue] = set()
+        self.snapshot: Dict[Any, Dict[str, Any]] = {}
+        self.task: Optional[asyncio.Task] = None
+
+    def subscribe(self) -> asyncio.Queue:
+        q: asyncio.Queue = asyncio.Queue(maxsize=LIVE_QUEUE_MAX)
+        if self.snapshot:
+            q.put_nowait(sse_event("snapshot", {"code": self.code, "matches": list(self.snapshot.values())}))
+        self.subscribers.add(q)
+        if self.task is None or self.task.done():
+            self.task = asyncio.create_task(self._run())
+        return q
+
+    def unsubscribe(self, q: asyncio.Queue) -> None:
+        # o loop encerra sozinho no próximo ciclo se não sobrar ninguém
+        self.subscribers.discard(q)
+
+    def publish(self, msg: str) -> None:
+        for q in list(self.subscribers):
+            if q.full():
+                # cliente lento: descarta o evento mais antigo
+                try:
+                    q.get_nowait()
+                except asyncio.QueueEmpty:
+                    pass
+            q.put_nowait(msg)
+
+    def diff(self, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        changed = []
+        for r in rows:
+            prev = self.snapshot.get(r["id"])
+            if prev is None or live_row_key(prev) != live_row_key(r):
+                changed.append(r)
+            self.snapshot[r["id"]] = r
+        return changed
+
+    async def _run(self) -> None:
+        live_set = set(STATUS_FILTERS["LIVE"])
+        while self.subscribers:
+            delay = LIVE_POLL_SECONDS
+            try:
+                rows = await asyncio.to_thread(fetch_live_rows, self.code)
+                changed = self.diff(rows)
+                if changed:
+                    self.publish(sse_event("update", {"code": self.code, "matches": changed}))
+                if not any(r["status_eff"] in live_set for r in rows):
+                    delay = LIVE_IDLE_POLL_SECONDS
+            except Exception as e:
+                self.publish(sse_event("error", {"code": self.code, "message": str(e)}))
+
+            # dorme em fatias curtas para encerrar logo quando todos saírem
+            waited = 0.0
+            while waited < delay and self.subscribers:
+                await asyncio.sleep(1.0)
+                waited += 1.0
+
+
+_LIVE_HUBS: Dict[str, LiveHub] = {}
+
+
+def live_hub(code: str) -> LiveHub:
+    hub = _LIVE_HUBS.get(code)
+    if hub is None:
+        hub = LiveHub(code)
+        _LIVE_HUBS[code] = hub
+    return hub
+
+
+async def iter_live_events(request: Request, code: str) -> AsyncIterator[str]:
+    hub = live_hub(code)
+    q = hub.subscribe()
+    try:
+        yield "retry: 5000\n\n"
+        while True:
+            if await request.is_disconnected():
+                break
+            try:
+                msg = await asyncio.wait_for(q.get(), timeout=LIVE_KEEPALIVE_SECONDS)
+            except asyncio.TimeoutError:
+                yield ": ping\n\n"
+                continue
+            yield msg
+    finally:
+        hub.unsubscribe(q)
+
+
 # =========================================================
-# Static mounts
+# Stats extras (football-data.co.uk) por liga/temporada
 # =========================================================
-# /icons/...
-if ICONS_DIR.exists():
-    app.mount("/icons", StaticFiles(directory=str(ICONS_DIR)), name="icons")
+EXTRA_DIV_RE = re.compile(r"^[A-Z0-9]{1,4}$")
+EXTRA_SEASON_RE = re.compile(r"^\d{4}-\d{4}$")
+# colunas que o card mostra -> stat do shard (sempre "a favor" do time, no lado em que joga)
+EXTRA_HOME_COLS = {"HS": "shots", "HST": "sot", "HC": "corners", "HF": "fouls", "HY": "yellow", "HR": "red"}
+EXTRA_AWAY_COLS = {"AS": "shots", "AST": "sot", "AC": "corners", "AF": "fouls", "AY": "yellow", "AR": "red"}
+
+_EXTRA: Dict[Tuple[str, str], Tuple[float, Dict[str, Any]]] = {}
+
+
+def load_extra_shard(div: str, season: str) -> Optional[Tuple[float, Dict[str, Any]]]:
+    """Shard liga/temporada com os times indexados pelo nome normalizado (recarrega se o arquivo mudar)."""
+    path = EXTRA_DIR / div / f"{season}.json"
+    try:
+        mtime = path.stat().st_mtime
+    except OSError:
+        return None
+
+    hit = _EXTRA.get((div, season))
+    if hit and hit[0] == mtime:
+        return hit
+
+    try:
+        doc = json.loads(path.read_text(encoding="utf-8"))
+    except Exception:
+        return None
+
+    teams = doc.get("teams") or {}
+    doc["index"] = {normalize_team_name(name): splits for name, splits in teams.items()}
+    _EXTRA[(div, season)] = (mtime, doc)
+    return _EXTRA[(div, season)]
+
+
+def latest_extra_season(div: str) -> Optional[str]:
+    seasons = sorted(p.stem for p in (EXTRA_DIR / div).glob("*.json"))
+    return seasons[-1] if seasons else None
+
+
+def extra_team_split(doc: Dict[str, Any], team: str, side: str) -> Dict[str, Any]:
+    splits = (doc.get("teams") or {}).get(team) or doc["index"].get(normalize_team_name(team)) or {}
+    return splits.get(side) or {}
+
+
+def extra_summary(div: str, season: str, doc: Optional[Dict[str, Any]], home: str, away: str) -> Dict[str, Any]:
+    """Médias do mandante em casa e do visitante fora (formato do card no web/app.js)."""
+    if not doc:
+        return {"div": div, "season": season, "found": 0}
+    h = extra_team_split(doc, home, "home")
+    a = extra_team_split(doc, away, "away")
+    return {
+        "div": div,
+        "season": season,
+        "found": doc.get("matches", 0),
+        "homeCount": h.get("n", 0),
+        "awayCount": a.get("n", 0),
+        "home": {col: h.get(f"{stat}_for") for col, stat in EXTRA_HOME_COLS.items()},
+        "away": {col: a.get(f"{stat}_for") for col, stat in EXTRA_AWAY_COLS.items()},
+    }
 
-# /data/...
-if DATA_DIR.exists():
-    app.mount("/data", StaticFiles(directory=str(DATA_DIR)), name="data")
 
 # =========================================================
 # Frontend entrypoints
 # =========================================================
+def serve_web_file(request: Request, rel: str, missing: str) -> Response:
+    resp = ASSETS.serve(request, rel)
+    if resp is not None:
+        return resp
+    return JSONResponse({"detail": missing}, status_code=404)
+
 @app.get("/")
-def home():
-    if INDEX_HTML.exists():
-        return FileResponse(str(INDEX_HTML), media_type="text/html")
-    return JSONResponse({"detail": "index.html not found in /web"}, status_code=404)
+def home(request: Request):
+    return serve_web_file(request, "index.html", "index.html not found in /web")
 
 @app.get("/app.js")
-def serve_app_js():
-    if APP_JS.exists():
-        return FileResponse(str(APP_JS), media_type="application/javascript")
-    return JSONResponse({"detail": "app.js not found in /web"}, status_code=404)
+def serve_app_js(request: Request):
+    return serve_web_file(request, "app.js", "app.js not found in /web")
 
 @app.get("/sw.js")
-def serve_sw_js():
-    if SW_JS.exists():
-        return FileResponse(str(SW_JS), media_type="application/javascript")
-    return JSONResponse({"detail": "sw.js not found in /web"}, status_code=404)
+def serve_sw_js(request: Request):
+    return serve_web_file(request, "sw.js", "sw.js not found in /web")
 
 # =========================================================
 # API endpoints
 # =========================================================
-# Observação: eu não tenho aqui o seu código completo das rotas reais
-# (/leagues, /matches, /card etc). Então:
-# - Se essas rotas já existem em outro arquivo, mantenha lá.
-# - Se elas já existiam neste mesmo api_server.py, cole elas AQUI
-#   (abaixo) e remova versões duplicadas.
-#
-# Como você mostrou que /leagues, /matches e /card respondem 200 no Render,
-# eu vou criar apenas ALIASES para parar os 404 que estão quebrando a UI.
+LEAGUES_BODY = json_bytes({"count": len(LEAGUES), "leagues": LEAGUES})
+LEAGUES_VERSION = bytes_hash(LEAGUES_BODY)
+
+
+@app.get("/leagues")
+def leagues(request: Request):
+    return conditional_json(request, LEAGUES_VERSION, HTTP_CACHE_LEAGUES, lambda: LEAGUES_BODY)
+
+
+@app.get("/extra")
+def extra(
+    request: Request,
+    div: str = Query(..., description="divisão do football-data.co.uk, ex: E0"),
+    season: Optional[str] = Query(None, description="YYYY-YYYY (padrão: a mais recente)"),
+    home: str = Query(""),
+    away: str = Query(""),
+):
+    div = (div or "").strip().upper()
+    if not EXTRA_DIV_RE.match(div):
+        raise HTTPException(status_code=400, detail="div inválida.")
+    if season and not EXTRA_SEASON_RE.match(season):
+        raise HTTPException(status_code=400, detail="season deve ser YYYY-YYYY.")
+
+    season = season or latest_extra_season(div)
+    hit = load_extra_shard(div, season) if season else None
+    mtime, doc = hit if hit else (None, None)
+    version = parts_version("extra", div, season, home, away, mtime)
+    return conditional_json(
+        request, version, HTTP_CACHE_EXTRA, lambda: json_bytes(extra_summary(div, season, doc, home, away))
+    )
+
+
+@app.get("/matches")
+def matches(
+    request: Request,
+    code: str = Query(...),
+    status: str = Query("SCHEDULED"),
+    limit: int = Query(DEFAULT_LIMIT, ge=1, le=50),
+):
+    status = (status or "SCHEDULED").upper()
+    today = datetime.utcnow().date()
+
+    if status == "FINISHED":
+        date_from = (today - timedelta(days=14)).strftime("%Y-%m-%d")
+        date_to = today.strftime("%Y-%m-%d")
+    elif status == "SCHEDULED":
+        date_from = today.strftime("%Y-%m-%d")
+        date_to = (today + timedelta(days=30)).strftime("%Y-%m-%d")
+    elif status == "LIVE":
+        date_from = (today - timedelta(days=1)).strftime("%Y-%m-%d")
+        date_to = (today + timedelta(days=1)).strftime("%Y-%m-%d")
+    else:
+        date_from = (today - timedelta(days=7)).strftime("%Y-%m-%d")
+        date_to = (today + timedelta(days=30)).strftime("%Y-%m-%d")
+
+    cache_key = f"matches:{code}:{status}:{limit}"
+    hit = cache_get(cache_key)
+    if hit is not None:
+        return cached_json(request, cache_key, hit, HTTP_CACHE_MATCHES)
+
+    statuses_query = None if status == "LIVE" else STATUS_FILTERS.get(status)
+
+    try:
+        data = fetch_competition_matches(code, statuses=statuses_query, limit=400, date_from=date_from, date_to=date_to)
+    except Exception:
+        stale_hit = cache_get_stale(cache_key)
+        if stale_hit is not None:
+            return cached_json(request, cache_key, stale_hit, HTTP_CACHE_MATCHES, stale=True)
+        raise
+    ms_raw = data.get("matches", []) or []
+
+    ms: List[Dict[str, Any]] = [match_row(m) for m in ms_raw]
+
+    desired = STATUS_FILTERS.get(status)
+    if desired is not None:
+        desired_set = set(desired)
+        ms = [x for x in ms if (x.get("status_eff") in desired_set)]
+
+    if status == "FINISHED":
+        ms.sort(key=lambda x: (x.get("utcDate") or ""), reverse=True)
+    else:
+        ms.sort(key=lambda x: (x.get("utcDate") or ""))
+
+    ms = ms[:limit]
+
+    try:
+        stored = predictions_for(code, ms)
+    except Exception:
+        stored = {}
+    for x in ms:
+        pred = stored.get(int(x.get("id") or 0))
+        x["prediction"] = present_prediction(pred) if pred else None
+
+    out = {
+        "code": code,
+        "league": league_name(code),
+        "status_filter": status,
+        "count": len(ms),
+        "matches": ms,
+    }
+
+    cache_set(cache_key, out)
+    return cached_json(request, cache_key, out, HTTP_CACHE_MATCHES)
+
+
+@app.get("/card")
+def card(
+    request: Request,
+    code: str = Query(...),
+    match_id: int = Query(...),
+):
+    card_key = f"card:{code}:{match_id}"
+    try:
+        found = find_card_match(code, match_id)
+    except HTTPException:
+        raise
+    except Exception:
+        # API fora: o último card montado ainda serve
+        stale_hit = cache_get_stale(card_key)
+        if stale_hit is not None:
+            return cached_json(request, card_key, stale_hit, HTTP_CACHE_CARD, stale=True)
+        raise
+
+    # card já montado para a mesma versão das partes: devolve os bytes prontos
+    version = card_version(code, found)
+    hit = cache_get(card_key) if version else None
+    ent = _CACHE.get(card_key)
+    if hit is not None and ent is not None and ent.value is hit and ent.version == version:
+        return cached_json(request, card_key, hit, HTTP_CACHE_CARD)
+
+    out: Dict[str, Any] = {}
+    for part in iter_card_sections(code, found):
+        part.pop("section", None)
+        out.update(part)
+
+    version = card_version(code, found)
+    if not version:
+        return json_response(json_bytes(out))
+    cache_set(card_key, out, version=version)
+    return cached_json(request, card_key, out, HTTP_CACHE_CARD)
+
+
+@app.get("/card/stream")
+def card_stream(
+    code: str = Query(...),
+    match_id: int = Query(...),
+):
+    # Variante progressiva do /card (NDJSON): uma linha JSON por seção,
+    # enviada assim que fica pronta. A última linha é {"section": "done"}.
+    found = find_card_match(code, match_id)
+    return StreamingResponse(
+        (ndjson_line(part) for part in iter_card_sections(code, found, stream_errors=True)),
+        media_type="application/x-ndjson",
+        headers={"Cache-Control": "no-store", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.get("/cards")
+def cards(
+    code: str = Query(...),
+    ids: str = Query(..., description="ids separados por vírgula, ex: 1,2,3"),
+):
+    return json_response(json_bytes(build_cards(code, parse_ids(ids))))
+
+
+@app.post("/cards")
+def cards_post(body: CardsRequest):
+    return json_response(json_bytes(build_cards(body.code, parse_ids(body.ids))))
+
+
+@app.get("/window")
+def window(
+    date_from: str = Query(..., alias="from", description="YYYY-MM-DD (fuso BR)"),
+    date_to: str = Query(..., alias="to", description="YYYY-MM-DD (fuso BR)"),
+    status: str = Query("ALL"),
+    limit: int = Query(WINDOW_PAGE_SIZE, ge=1, le=200),
+    cursor: Optional[str] = Query(None),
+):
+    d_from = parse_day(date_from, "from")
+    d_to = parse_day(date_to, "to")
+    if d_to < d_from:
+        raise HTTPException(status_code=400, detail="to deve ser >= from.")
+    if (d_to - d_from).days > MAX_WINDOW_DAYS:
+        raise HTTPException(status_code=400, detail=f"Janela máxima de {MAX_WINDOW_DAYS} dias.")
+
+    status = (status or "ALL").upper()
+    return json_response(json_bytes(paginate_window(build_window(d_from, d_to, status), limit, cursor)))
+
+
+@app.get("/today")
+def today(
+    status: str = Query("ALL"),
+    limit: int = Query(WINDOW_PAGE_SIZE, ge=1, le=200),
+    cursor: Optional[str] = Query(None),
+):
+    d = now_tz().replace(hour=0, minute=0, second=0, microsecond=0, tzinfo=None)
+    status = (status or "ALL").upper()
+    return json_response(json_bytes(paginate_window(build_window(d, d, status), limit, cursor)))
+
+
+@app.get("/live/stream")
+async def live_stream(
+    request: Request,
+    code: str = Query(...),
+):
+    # Server-Sent Events: "snapshot" ao conectar (se o hub já tiver estado)
+    # e "update" com apenas os jogos que mudaram a cada poll.
+    return StreamingResponse(
+        iter_live_events(request, code),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-store", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.exception_handler(UpstreamUnavailable)
+async def upstream_unavailable_handler(request: Request, exc: UpstreamUnavailable):
+    # API fora (circuito aberto / sem prazo) e nada em cache para servir
+    headers = {"Retry-After": str(max(1, math.ceil(exc.retry_after)))}
+    return JSONResponse({"detail": str(exc)}, status_code=503, headers=headers)
+
+
+@app.get("/metrics")
+def metrics():
+    # Formato texto do Prometheus (rotas, cache, upstream, modelos)
+    return Response(content=METRICS.render(), media_type=METRICS_CONTENT_TYPE, headers={"Cache-Control": "no-store"})
+
+
+@app.get("/debug/timings")
+def debug_timings():
+    # Percentis/buckets (ms) das últimas amostras por endpoint e etapa
+    return JSONResponse(
+        {"window": LATENCY.window, "endpoints": LATENCY.snapshot()},
+        headers={"Cache-Control": "no-store"},
+    )
+
 
 # Alias: /competitions -> /leagues
 @app.get("/competitions")
@@ -77,7 +1849,7 @@ async def competitions_alias(request: Request):
     url = "/leagues" + (f"?{qs}" if qs else "")
     return RedirectResponse(url=url, status_code=307)
 
-# Alias: /predict -> /card (porque /card aparece OK no seu log)
+# Alias: /predict -> /card
 @app.get("/predict")
 async def predict_alias(request: Request):
     qs = request.url.query
@@ -89,10 +1861,14 @@ async def predict_alias(request: Request):
 # (Se você tiver links tipo /styles.css, /translation.json etc)
 # =========================================================
 @app.get("/{path:path}")
-def web_fallback(path: str):
-    # Tenta servir qualquer arquivo direto do /web (sem precisar montar tudo)
-    target = WEB_DIR / path
-    if target.exists() and target.is_file():
-        # media_type vai no default; funciona bem para css/json/png etc
+def web_fallback(request: Request, path: str):
+    # Primeiro o que já está em memória (carregado no startup)
+    resp = ASSETS.serve(request, path)
+    if resp is not None:
+        return resp
+
+    # Arquivo criado depois do startup: serve do disco (sem sair do /web)
+    target = (WEB_DIR / path).resolve()
+    if target.is_file() and WEB_DIR.resolve() in target.parents:
         return FileResponse(str(target))
     return JSONResponse({"detail": "Not Found"}, status_code=404)
@@ -1,36 +1,150 @@
+import argparse
+import json
 import os
+import time
+from datetime import datetime, timedelta, timezone
+
 import pandas as pd
 
+from src.ingest import FootballDataOrgAdapter
+from src.match_store import from_frame, save_npz
 from src.live_fetch import fetch_competition_matches
 
-def build_comp_csv(code: str, out_path: str):
-    data = fetch_competition_matches(code)  # sem status => pega histórico disponível
-    matches = data.get("matches", [])
+# Sync incremental com a football-data.org: por competição, um cursor em
+# data/api_processed/<CODE>.sync.json = {"last_utc": utcDate do último jogo
+# finalizado, "ids": ids dos jogos já gravados}. A próxima rodada só pede
+# dateFrom=cursor (menos uma folga p/ jogos encerrados/corrigidos com atraso)
+# e faz upsert por id no CSV/NPZ. --full refaz o histórico inteiro.
+OUT_DIR = "data/api_processed"
+SYNC_VERSION = 1
+SYNC_OVERLAP_DAYS = 2
+SYNC_PAUSE_SECONDS = 6.5  # free tier: 10 requisições/minuto
 
-    rows = []
-    for m in matches:
-        # só pega jogos finalizados com placar
-        if m.get("status") != "FINISHED":
-            continue
+CODES = ["WC", "CL", "BL1", "DED", "BSA", "PD", "FL1", "ELC", "PPL", "EC", "SA", "PL"]
 
-        score = m.get("score", {}).get("fullTime", {})
-        hg = score.get("home")
-        ag = score.get("away")
-        if hg is None or ag is None:
-            continue
+STORE_COLS = ["date", "home_team", "away_team", "home_goals", "away_goals", "id", "utc_date"]
+
+def sync_state_path(out_path: str) -> str:
+    return os.path.splitext(out_path)[0] + ".sync.json"
+
+def load_sync_state(out_path: str) -> dict:
+    try:
+        with open(sync_state_path(out_path), encoding="utf-8") as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return state if state.get("version") == SYNC_VERSION else {}
+
+def save_sync_state(out_path: str, state: dict) -> None:
+    path = sync_state_path(out_path)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=1)
+    os.replace(tmp, path)
+
+def load_store(out_path: str) -> pd.DataFrame:
+    """CSV atual da competição com id/utc_date (vazio se não existir ou for do formato antigo)."""
+    try:
+        df = pd.read_csv(out_path)
+    except (OSError, ValueError):
+        return pd.DataFrame(columns=STORE_COLS)
+    if "id" not in df.columns or "utc_date" not in df.columns:
+        return pd.DataFrame(columns=STORE_COLS)
+    return df[STORE_COLS]
+
+def write_store(out_path: str, df: pd.DataFrame) -> None:
+    tmp = out_path + ".tmp"
+    df.to_csv(tmp, index=False)
+    os.replace(tmp, out_path)
+    if len(df):
+        # .npz ao lado: é o que o train_api_leagues carrega (o CSV fica pro replay_server)
+        save_npz(os.path.splitext(out_path)[0] + ".npz", from_frame(df[STORE_COLS[:5]]))
+
+def fetch_finished(code: str, date_from: str = None, date_to: str = None) -> pd.DataFrame:
+    # limit=0: o padrão (15) corta o histórico nos 15 jogos mais antigos
+    data = fetch_competition_matches(code, statuses=["FINISHED"], limit=0, date_from=date_from, date_to=date_to)
 
-        rows.append({
-            "date": (m.get("utcDate") or "")[:10],
-            "home_team": m["homeTeam"]["name"],
-            "away_team": m["awayTeam"]["name"],
-            "home_goals": hg,
-            "away_goals": ag,
-        })
+    # só jogos finalizados com placar (src/ingest.py: adapter football-data.org)
+    df = FootballDataOrgAdapter.frame(data, with_ids=True)
+    df["date"] = df["date"].dt.strftime("%Y-%m-%d")
+    return df[STORE_COLS]
 
-    df = pd.DataFrame(rows)
-    df.to_csv(out_path, index=False)
-    print(f"OK: {code} -> {out_path} | linhas={len(df)} | times={len(set(df.home_team) | set(df.away_team))}")
+def sync_competition(code: str, out_path: str, full: bool = False) -> dict:
+    """
+    Traz só os jogos finalizados desde o cursor e faz upsert por id.
+    Sem cursor (1ª vez, CSV antigo sem id) ou com full=True: histórico inteiro.
+    """
+    state = {} if full else load_sync_state(out_path)
+    store = load_store(out_path) if state else pd.DataFrame(columns=STORE_COLS)
+    incremental = bool(state.get("last_utc")) and len(store) > 0
+
+    if incremental:
+        cursor = datetime.fromisoformat(state["last_utc"].replace("Z", "+00:00"))
+        date_from = (cursor - timedelta(days=SYNC_OVERLAP_DAYS)).strftime("%Y-%m-%d")
+        date_to = (datetime.now(timezone.utc) + timedelta(days=1)).strftime("%Y-%m-%d")
+        fresh = fetch_finished(code, date_from, date_to)
+    else:
+        fresh = fetch_finished(code)  # sem filtro de data => histórico disponível
+        store = pd.DataFrame(columns=STORE_COLS)
+
+    known = set(state.get("ids") or []) if incremental else set()
+    new_ids = set(fresh["id"].tolist()) - known
+
+    # placar/data corrigidos de um jogo já gravado também contam como mudança
+    old = store.set_index("id")
+    seen = fresh[fresh["id"].isin(old.index)].set_index("id")
+    cols = [c for c in STORE_COLS if c != "id"]
+    updated = int((seen[cols].astype(str) != old.loc[seen.index, cols].astype(str)).any(axis=1).sum())
+
+    merged = pd.concat([store, fresh], ignore_index=True).drop_duplicates(subset=["id"], keep="last")
+    changed = not incremental or bool(new_ids) or updated > 0
+    if changed:
+        merged = merged.sort_values(["utc_date", "id"], kind="stable").reset_index(drop=True)
+        write_store(out_path, merged)
+
+    last_utc = max([state.get("last_utc") or ""] + fresh["utc_date"].tolist()) if incremental else (
+        max(fresh["utc_date"].tolist(), default="")
+    )
+    save_sync_state(out_path, {
+        "version": SYNC_VERSION,
+        "code": code,
+        "last_utc": last_utc or None,
+        "ids": sorted(int(i) for i in merged["id"].tolist()),
+        "synced_at": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+    })
+    return {
+        "mode": "incremental" if incremental else "full",
+        "fetched": len(fresh),
+        "new": len(new_ids),
+        "updated": updated,
+        "rows": len(merged),
+        "written": changed,
+    }
+
+def build_comp_csv(code: str, out_path: str):
+    # resync completo (comportamento antigo); o dia a dia usa sync_competition
+    r = sync_competition(code, out_path, full=True)
+    print(f"OK: {code} -> {out_path} | linhas={r['rows']}")
+
+def main():
+    ap = argparse.ArgumentParser(description="Sync incremental football-data.org -> data/api_processed/<CODE>.csv/.npz")
+    ap.add_argument("codes", nargs="*", default=CODES, help="competições (padrão: todas)")
+    ap.add_argument("--full", action="store_true", help="ignora o cursor e baixa o histórico inteiro")
+    ap.add_argument("--pause", type=float, default=SYNC_PAUSE_SECONDS, help="pausa entre competições (rate limit)")
+    args = ap.parse_args()
+
+    os.makedirs(OUT_DIR, exist_ok=True)
+    for i, code in enumerate(args.codes):
+        if i:
+            time.sleep(args.pause)
+        out_path = os.path.join(OUT_DIR, f"{code}.csv")
+        try:
+            r = sync_competition(code, out_path, full=args.full)
+        except Exception as e:
+            print(f"[ERRO] {code}: {e}")
+            continue
+        status = "gravado" if r["written"] else "sem mudanças"
+        print(f"OK: {code} ({r['mode']}) baixados={r['fetched']} novos={r['new']} atualizados={r['updated']} linhas={r['rows']} | {status}")
 
 if __name__ == "__main__":
-    os.makedirs("data/api_processed", exist_ok=True)
-    build_comp_csv("BL1", "data/api_processed/BL1.csv")
+    main()
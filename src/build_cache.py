@@ -0,0 +1,204 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor
+from functools import partial
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple, TypeVar
+
+from src.match_store import MatchArrays, PathLike, load_npz, save_npz
+
+# Cache incremental dos builders (build_dataset*.py):
+#   data/cache/normalized/<namespace>/<arquivo>.npz   resultado normalizado por arquivo raw
+#   data/cache/normalized/<namespace>/manifest.json   path -> {size, mtime_ns, sha256, artifact}
+# Um arquivo raw só é re-normalizado quando o conteúdo muda (size/mtime iguais
+# = confia sem ler; senão compara o sha256). Mudou o normalizador? Suba o
+# "version" do namespace e tudo é refeito.
+CACHE_DIR = Path(os.getenv("BUILD_CACHE_DIR", "data/cache/normalized"))
+MANIFEST_VERSION = 1
+# 0/vazio = os.cpu_count(); 1 = serial
+BUILD_WORKERS = int(os.getenv("BUILD_WORKERS", "0") or 0)
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+def worker_count(workers: Optional[int] = None) -> int:
+    return max(1, workers or BUILD_WORKERS or os.cpu_count() or 1)
+
+
+def build_pool(workers: Optional[int] = None) -> Optional[ProcessPoolExecutor]:
+    """Pool compartilhado por um build inteiro (None = serial, ex.: 1 CPU)."""
+    n = worker_count(workers)
+    return ProcessPoolExecutor(max_workers=n) if n > 1 else None
+
+
+def imap_parallel(
+    fn: Callable[[T], R],
+    items: Sequence[T],
+    workers: Optional[int] = None,
+    pool: Optional[Executor] = None,
+) -> Iterator[R]:
+    """
+    map() num pool de processos, com resultados na ordem de `items`
+    (merge determinístico) e entregues conforme ficam prontos. `fn` precisa
+    ser picklable (função de módulo ou functools.partial dela). Serial
+    quando só há 1 worker ou 1 item.
+    """
+    if pool is not None and len(items) > 1:
+        yield from pool.map(fn, items)
+        return
+    n = min(worker_count(workers), len(items))
+    if pool is not None or n <= 1:
+        for x in items:
+            yield fn(x)
+        return
+    with ProcessPoolExecutor(max_workers=n) as own:
+        yield from own.map(fn, items, chunksize=max(1, len(items) // (n * 4)))
+
+
+def map_parallel(
+    fn: Callable[[T], R],
+    items: Sequence[T],
+    workers: Optional[int] = None,
+    pool: Optional[Executor] = None,
+) -> List[R]:
+    return list(imap_parallel(fn, items, workers, pool))
+
+
+def _apply(fn: Callable[..., R], args: Tuple) -> R:
+    return fn(*args)
+
+
+def file_sha256(path: PathLike) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class BuildCache:
+    def __init__(self, namespace: str, version: int = 1, root: Optional[PathLike] = None, fresh: bool = False):
+        self.dir = Path(root or CACHE_DIR) / namespace
+        self.version = version
+        self.manifest_path = self.dir / "manifest.json"
+        self.entries: Dict[str, dict] = {}
+        self.meta: Dict[str, dict] = {}  # extras persistidos (ex.: schemas detectados)
+        self.stats = {"reused": 0, "rehashed": 0, "normalized": 0, "removed": 0}
+        self._seen: set = set()
+        if not fresh:  # fresh=True (--full): re-normaliza tudo e regrava o cache
+            self._load()
+
+    def _load(self) -> None:
+        try:
+            doc = json.loads(self.manifest_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return
+        if doc.get("manifest_version") != MANIFEST_VERSION or doc.get("version") != self.version:
+            return  # formato/normalizador mudou: começa do zero
+        self.entries = doc.get("files", {})
+        self.meta = doc.get("meta", {})
+
+    def _artifact(self, key: str) -> Path:
+        return self.dir / (key.replace("/", "__").replace("\\", "__") + ".npz")
+
+    def is_fresh(self, path: PathLike) -> bool:
+        """True se o artefato em cache ainda vale para o conteúdo atual de `path`."""
+        path = Path(path)
+        key = path.as_posix()
+        self._seen.add(key)
+        entry = self.entries.get(key)
+        if not entry or not self._artifact(key).exists():
+            return False
+
+        st = path.stat()
+        if entry["size"] == st.st_size and entry["mtime_ns"] == st.st_mtime_ns:
+            self.stats["reused"] += 1
+            return True
+        if file_sha256(path) == entry["sha256"]:
+            # só o mtime mudou (checkout, cópia...): atualiza e reaproveita
+            entry.update(size=st.st_size, mtime_ns=st.st_mtime_ns)
+            self.stats["rehashed"] += 1
+            return True
+        return False
+
+    def lookup(self, path: PathLike) -> Optional[MatchArrays]:
+        """Artefato em cache se o conteúdo de `path` não mudou; None se precisa normalizar."""
+        if self.is_fresh(path):
+            return load_npz(self._artifact(Path(path).as_posix()))
+        return None
+
+    def store(self, path: PathLike, data: MatchArrays) -> None:
+        path = Path(path)
+        key = path.as_posix()
+        self._seen.add(key)
+        st = path.stat()
+        art = self._artifact(key)
+        save_npz(art, data)
+        self.entries[key] = {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "sha256": file_sha256(path), "artifact": art.name}
+        self.stats["normalized"] += 1
+
+    def get(self, path: PathLike, normalize: Callable[[Path], MatchArrays]) -> MatchArrays:
+        """MatchArrays normalizado de `path`, do cache se o arquivo não mudou."""
+        data = self.lookup(path)
+        if data is None:
+            data = normalize(Path(path))
+            self.store(path, data)
+        return data
+
+    def iter_many(
+        self,
+        paths: Sequence[PathLike],
+        normalize: Callable[..., MatchArrays],
+        prepare: Optional[Callable[[Path], Any]] = None,
+        workers: Optional[int] = None,
+        pool: Optional[Executor] = None,
+    ) -> Iterator[MatchArrays]:
+        """
+        get() em lote, um arquivo por vez na ordem de `paths` (artefatos do
+        cache são lidos só quando chega a vez deles). Os novos/alterados vão
+        pro pool; com `prepare`, ele roda no processo principal (ex.: schema
+        cacheado) e o pool chama normalize(path, prepare(path)).
+        """
+        fresh = [self.is_fresh(p) for p in paths]
+        todo = [Path(p) for p, ok in zip(paths, fresh) if not ok]
+        jobs = [(p,) if prepare is None else (p, prepare(p)) for p in todo]
+        results = imap_parallel(partial(_apply, normalize), jobs, workers, pool)
+        for p, ok in zip(paths, fresh):
+            if ok:
+                yield load_npz(self._artifact(Path(p).as_posix()))
+            else:
+                data = next(results)
+                self.store(p, data)
+                yield data
+
+    def get_many(
+        self,
+        paths: Sequence[PathLike],
+        normalize: Callable[..., MatchArrays],
+        prepare: Optional[Callable[[Path], Any]] = None,
+        workers: Optional[int] = None,
+        pool: Optional[Executor] = None,
+    ) -> List[MatchArrays]:
+        """iter_many() materializado (lista na ordem de `paths`)."""
+        return list(self.iter_many(paths, normalize, prepare, workers, pool))
+
+    def save(self) -> None:
+        """Grava o manifest; entradas de arquivos que sumiram do raw são descartadas."""
+        for key in [k for k in self.entries if k not in self._seen]:
+            self._artifact(key).unlink(missing_ok=True)
+            del self.entries[key]
+            self.stats["removed"] += 1
+
+        self.dir.mkdir(parents=True, exist_ok=True)
+        doc = {"manifest_version": MANIFEST_VERSION, "version": self.version, "files": self.entries, "meta": self.meta}
+        tmp = self.manifest_path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(doc, indent=1, sort_keys=True), encoding="utf-8")
+        os.replace(tmp, self.manifest_path)
+
+    def summary(self) -> str:
+        s = self.stats
+        return f"cache: {s['normalized']} normalizados, {s['reused'] + s['rehashed']} reaproveitados, {s['removed']} removidos"
@@ -1,65 +1,126 @@
+import argparse
 import glob
 import os
+from pathlib import Path
+import numpy as np
 import pandas as pd
 
-OUT = "data/processed/matches_all.csv"
+from src.build_cache import BuildCache
+from src.dedup import SEEN_FILE, SeenSet, match_keys
+from src.match_store import MatchArrays, StoreWriter, concat, from_frame, iter_chunks
+from src.ingest import GenericCsvAdapter, SchemaCache, SourceSchema
 
-def normalize_eu_csv(path: str) -> pd.DataFrame:
-    df = pd.read_csv(path)
+# store em diretório (append + memmap): cresce sem precisar caber em memória
+OUT = "data/processed/matches_all.cols"
+# v2: artefatos com liga + chave do jogo (src/dedup.py)
+CACHE_VERSION = 2
 
-    col_map = {}
-    for c in df.columns:
-        c2 = c.strip().lower()
-        if c2 in ["date"]:
-            col_map[c] = "date"
-        elif c2 in ["hometeam", "home_team", "home"]:
-            col_map[c] = "home_team"
-        elif c2 in ["awayteam", "away_team", "away"]:
-            col_map[c] = "away_team"
-        elif c2 in ["fthg", "homegoals", "home_goals", "hg"]:
-            col_map[c] = "home_goals"
-        elif c2 in ["ftag", "awaygoals", "away_goals", "ag"]:
-            col_map[c] = "away_goals"
+# detecção de colunas/datas: src/ingest.py (ALIASES + SchemaCache)
+RAW_CSV = GenericCsvAdapter()
 
-    df = df.rename(columns=col_map)
-
-    needed = ["date", "home_team", "away_team", "home_goals", "away_goals"]
-    missing = [c for c in needed if c not in df.columns]
-    if missing:
-        raise ValueError(f"Arquivo {path} sem colunas necessárias: {missing}. Colunas disponíveis: {list(df.columns)}")
-
-    out = df[needed].copy()
-
-    out["date"] = pd.to_datetime(out["date"], errors="coerce", dayfirst=True).dt.date.astype(str)
-    out["home_goals"] = pd.to_numeric(out["home_goals"], errors="coerce")
-    out["away_goals"] = pd.to_numeric(out["away_goals"], errors="coerce")
+def normalize_eu_csv(path: str, schema: SourceSchema = None) -> pd.DataFrame:
+    if schema is None:
+        schema = RAW_CSV.schema(path)
+    out = RAW_CSV.read_schema(path, schema)
+    out["date"] = out["date"].dt.date.astype(str)
+    return out
 
-    out = out.dropna(subset=["date", "home_team", "away_team", "home_goals", "away_goals"])
-    out["home_goals"] = out["home_goals"].astype(int)
-    out["away_goals"] = out["away_goals"].astype(int)
+def normalize_file(path: Path, schema: SourceSchema) -> MatchArrays:
+    # função de módulo: é o que vai pro pool de processos; lê o CSV em lotes
+    parts = [from_frame(df) for df in RAW_CSV.read_chunks(path, schema)]
+    if not parts:
+        data = from_frame(pd.DataFrame(columns=["date", "home_team", "away_team", "home_goals", "away_goals"]))
+    else:
+        data = parts[0] if len(parts) == 1 else concat(parts, sort_by_date=False)
+    # liga = pasta de origem (data/raw/eu_top5/<liga>/...)
+    data.leagues = [Path(path).parent.name]
+    data.league = np.zeros(len(data), dtype=np.int16)
+    data.key = match_keys(data)
+    return data
 
-    return out
+def describe_conflict(path, part: MatchArrays, c) -> str:
+    i = c.index
+    return (
+        f"{part.leagues[part.league[i]]} {part.dates[i]} {part.teams[part.home[i]]} x {part.teams[part.away[i]]}: "
+        f"{c.kept[0]}-{c.kept[1]} (mantido) vs {c.found[0]}-{c.found[1]} em {path}"
+    )
 
-def build():
+def build(write_csv: bool = False, full: bool = False, workers: int = None):
     files = glob.glob("data/raw/eu_top5/**/*.csv", recursive=True)
     if not files:
         files = glob.glob("data/raw/eu_top5/*.csv")
 
-    all_parts = []
+    # só arquivos novos/alterados são re-normalizados (data/cache/normalized/all),
+    # em paralelo; o schema (colunas + formato de data) é detectado uma vez por fonte
+    cache = BuildCache("all", version=CACHE_VERSION, fresh=full)
+    schemas = SchemaCache(cache.meta.setdefault("schemas", {}))
+
+    ok_files, schema_of = [], {}
     for f in sorted(files):
         try:
-            all_parts.append(normalize_eu_csv(f))
+            schema_of[f] = RAW_CSV.schema(f, schemas=schemas)
+            ok_files.append(f)
         except Exception as e:
             print(f"[SKIP] {f}: {e}")
 
-    if not all_parts:
+    if not ok_files:
         raise RuntimeError("Nenhum CSV válido encontrado em data/raw/eu_top5.")
 
-    big = pd.concat(all_parts, ignore_index=True).drop_duplicates()
+    # incremental: com store + seen-set de uma execução anterior, só os arquivos
+    # novos/alterados são lidos e só as chaves inéditas são anexadas
+    seen_path = Path(OUT) / SEEN_FILE
+    incremental = not full and seen_path.exists()
+    todo = [f for f in ok_files if not cache.is_fresh(f)] if incremental else ok_files
+    seen = SeenSet.load(seen_path) if incremental else SeenSet()
 
     os.makedirs(os.path.dirname(OUT), exist_ok=True)
-    big.to_csv(OUT, index=False)
-    print(f"OK: {OUT} (linhas={len(big)})")
+    writer = StoreWriter(OUT, append=incremental)
+    if incremental and seen.rows != writer.start_rows:
+        # seen-set e store fora de sincronia (build interrompido, seen.npz antigo):
+        # anexar agora duplicaria ou pularia jogos, então refaz do zero
+        print(f"[FULL] {SEEN_FILE} cobre {seen.rows} linhas, store tem {writer.start_rows}: refazendo tudo")
+        writer.abort()
+        incremental, todo, seen = False, ok_files, SeenSet()
+        writer = StoreWriter(OUT)
+
+    # o seen.npz é gravado no commit do store (antes do meta.json / junto na troca
+    # do diretório) e o manifest do cache só depois: um crash no meio cai no
+    # check de linhas acima ou só relê arquivos, nunca duplica nem pula jogos
+    writer.sidecar(SEEN_FILE, seen.save)
+    conflicts = []
+    with writer:
+        parts = cache.iter_many(todo, normalize_file, prepare=lambda p: schema_of[str(p)], workers=workers)
+        for f, part in zip(todo, parts):
+            if part.key is None:  # artefato do cache (save_npz não guarda a chave)
+                part.key = match_keys(part)
+            keep, found = seen.filter(part)
+            conflicts.extend(describe_conflict(f, part, c) for c in found)
+            new = part.select(keep)
+            writer.append(new)
+            seen.add(new.key, new.home_goals, new.away_goals)
+        seen.rows = writer.rows
+    rows, added = writer.rows, writer.rows - writer.start_rows
+
+    report = cache.dir / "conflicts.txt"
+    report.unlink(missing_ok=True)
+    for line in conflicts[:10]:
+        print(f"[CONFLITO] {line}")
+    if conflicts:
+        report.parent.mkdir(parents=True, exist_ok=True)
+        report.write_text("\n".join(conflicts) + "\n", encoding="utf-8")
+        print(f"{len(conflicts)} conflitos de placar (lista completa em {report})")
+
+    if write_csv:
+        csv_path = OUT.replace(".cols", ".csv")
+        for i, chunk in enumerate(iter_chunks(OUT)):
+            chunk.to_frame().to_csv(csv_path, index=False, mode="w" if i == 0 else "a", header=(i == 0))
+    cache.save()
+    print(f"OK: {OUT} (linhas={rows}, novas={added}, arquivos lidos={len(todo)}) {cache.summary()}")
 
 if __name__ == "__main__":
-    build()
+    ap = argparse.ArgumentParser(description="Normaliza data/raw/eu_top5 -> data/processed/matches_all.cols")
+    ap.add_argument("--csv", action="store_true", help="também grava o CSV antigo (legado/debug)")
+    ap.add_argument("--full", action="store_true", help="refaz o store do zero (ignora cache e seen-set)")
+    ap.add_argument("--workers", type=int, default=None, help="processos de normalização (padrão: nº de CPUs)")
+    args = ap.parse_args()
+    build(write_csv=args.csv, full=args.full, workers=args.workers)
@@ -1,8 +1,16 @@
 from __future__ import annotations
 
+import argparse
+from concurrent.futures import Executor
+from functools import partial
 from pathlib import Path
+from typing import List
 import pandas as pd
 
+from src.build_cache import BuildCache, build_pool
+from src.match_store import MatchArrays, StoreWriter, from_frame, iter_chunks
+from src.ingest import FootballDataCsvAdapter, SchemaCache, SourceSchema
+
 
 LEAGUES = [
     "bundesliga",
@@ -12,84 +20,101 @@ LEAGUES = [
     "ligue-1",
 ]
 
-# Tentamos suportar variações comuns de nomes de colunas
-CANDIDATES = {
-    "date": ["date", "Date"],
-    "home_team": ["home_team", "HomeTeam", "hometeam", "home"],
-    "away_team": ["away_team", "AwayTeam", "awayteam", "away"],
-    "home_goals": ["home_goals", "FTHG", "fthg", "home_score", "hg"],
-    "away_goals": ["away_goals", "FTAG", "ftag", "away_score", "ag"],
-}
-
-
-def pick_col(df: pd.DataFrame, candidates: list[str]) -> str | None:
-    for c in candidates:
-        if c in df.columns:
-            return c
-    return None
-
+# detecção de colunas/datas: src/ingest.py (ALIASES + SchemaCache)
+SEASON_CSV = FootballDataCsvAdapter()
 
-def normalize_one_file(path: Path, league: str) -> pd.DataFrame:
-    df = pd.read_csv(path)
 
-    c_date = pick_col(df, CANDIDATES["date"])
-    c_home = pick_col(df, CANDIDATES["home_team"])
-    c_away = pick_col(df, CANDIDATES["away_team"])
-    c_hg = pick_col(df, CANDIDATES["home_goals"])
-    c_ag = pick_col(df, CANDIDATES["away_goals"])
+def normalize_one_file(path: Path, league: str, schema: SourceSchema | None = None) -> pd.DataFrame:
+    if schema is None:
+        schema = SEASON_CSV.schema(path, league)
 
-    missing = [k for k, v in [("date", c_date), ("home_team", c_home), ("away_team", c_away), ("home_goals", c_hg), ("away_goals", c_ag)] if v is None]
-    if missing:
-        raise ValueError(f"{path.name}: faltando colunas {missing}. Colunas atuais: {list(df.columns)}")
-
-    out = df[[c_date, c_home, c_away, c_hg, c_ag]].copy()
-    out.columns = ["date", "home_team", "away_team", "home_goals", "away_goals"]
+    out = SEASON_CSV.read_schema(path, schema)
 
     # season vem do nome do arquivo: season-2324.csv -> 2324
     season = path.stem.replace("season-", "")
     out["season"] = season
     out["league"] = league
-
-    # tipos
-    out["date"] = pd.to_datetime(out["date"], errors="coerce", dayfirst=True)
-    out["home_goals"] = pd.to_numeric(out["home_goals"], errors="coerce")
-    out["away_goals"] = pd.to_numeric(out["away_goals"], errors="coerce")
-
-    out = out.dropna(subset=["date", "home_team", "away_team", "home_goals", "away_goals"])
-    out["home_goals"] = out["home_goals"].astype(int)
-    out["away_goals"] = out["away_goals"].astype(int)
-
     return out
 
 
-def build_league(league: str) -> pd.DataFrame:
+def normalize_season(path: Path, schema: SourceSchema, league: str) -> MatchArrays:
+    # função de módulo: é o que vai pro pool de processos
+    return from_frame(normalize_one_file(path, league, schema))
+
+
+def build_league(
+    league: str,
+    writers: List[StoreWriter],
+    cache: BuildCache | None = None,
+    pool: Executor | None = None,
+) -> int:
+    """
+    Grava as temporadas da liga, uma de cada vez, em todos os `writers`
+    (store da liga + store das 5 ligas): nenhuma liga nem o histórico
+    inteiro fica em memória. Só as season-*.csv novas ou alteradas são
+    re-normalizadas (em paralelo); o resto vem de data/cache/normalized.
+    Devolve o nº de linhas da liga.
+    """
     folder = Path("data/raw/eu_top5") / league
     files = sorted(folder.glob("season-*.csv"))
     if not files:
         raise FileNotFoundError(f"Nenhum arquivo season-*.csv em {folder}")
 
-    frames = [normalize_one_file(f, league) for f in files]
-    df = pd.concat(frames, ignore_index=True)
-    df = df.sort_values("date").reset_index(drop=True)
-    return df
+    cache = cache or BuildCache(f"leagues/{league}")
+    schemas = SchemaCache(cache.meta.setdefault("schemas", {}))
+    parts = cache.iter_many(
+        files,
+        partial(normalize_season, league=league),
+        prepare=lambda f: SEASON_CSV.schema(f, league, schemas),
+        pool=pool,
+    )
+    rows = 0
+    for part in parts:
+        for w in writers:
+            w.append(part)
+        rows += len(part)
+    return rows
 
 
-def main():
-    out_dir = Path("data/processed/leagues")
-    out_dir.mkdir(parents=True, exist_ok=True)
+def write_csv(store: Path) -> None:
+    csv_path = store.with_suffix(".csv")
+    for i, chunk in enumerate(iter_chunks(store)):
+        chunk.to_frame().to_csv(csv_path, index=False, mode="w" if i == 0 else "a", header=(i == 0))
 
-    all_frames = []
 
-    for league in LEAGUES:
-        df_l = build_league(league)
-        out_path = out_dir / f"{league}.csv"
-        df_l.to_csv(out_path, index=False)
-        print(f"OK: {out_path} (linhas={len(df_l)})")
-        all_frames.append(df_l)
+def main():
+    ap = argparse.ArgumentParser(description="Normaliza data/raw/eu_top5 -> data/processed (stores .cols).")
+    ap.add_argument("--csv", action="store_true", help="também grava os CSVs antigos (legado/debug)")
+    ap.add_argument("--full", action="store_true", help="ignora o cache e re-normaliza todas as temporadas")
+    ap.add_argument("--workers", type=int, default=None, help="processos de normalização (padrão: nº de CPUs)")
+    args = ap.parse_args()
 
-    df_all = pd.concat(all_frames, ignore_index=True).sort_values("date").reset_index(drop=True)
-    df_all.to_csv("data/processed/matches_eu_top5.csv", index=False)
-    print(f"OK: data/processed/matches_eu_top5.csv (linhas={len(df_all)})")
+    out_dir = Path("data/processed/leagues")
+    out_dir.mkdir(parents=True, exist_ok=True)
+    all_path = Path("data/processed/matches_eu_top5.cols")
+
+    pool = build_pool(args.workers)
+    try:
+        with StoreWriter(all_path) as writer_all:
+            for league in LEAGUES:
+                cache = BuildCache(f"leagues/{league}", fresh=args.full)
+                out_path = out_dir / f"{league}.cols"
+                with StoreWriter(out_path) as writer:
+                    rows = build_league(league, [writer, writer_all], cache, pool)
+                # o .npz antigo teria preferência no load_matches
+                out_path.with_suffix(".npz").unlink(missing_ok=True)
+                if args.csv:
+                    write_csv(out_path)
+                cache.save()
+                print(f"OK: {out_path} (linhas={rows}) {cache.summary()}")
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    all_path.with_suffix(".npz").unlink(missing_ok=True)
+    if args.csv:
+        write_csv(all_path)
+    print(f"OK: {all_path} (linhas={writer_all.rows})")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,139 @@
+from __future__ import annotations
+
+import hashlib
+import re
+import unicodedata
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from src.match_store import MatchArrays, PathLike
+
+# Chave canônica do jogo: hash de 64 bits de (liga, dia, mandante, visitante),
+# com os nomes normalizados (sem acento/caixa/pontuação), então "Nott'm Forest"
+# e "Nott'm forest " ou "Deportivo La Coruña" e "Deportivo La Coruna" batem.
+# Datas já chegam como dias (int32), independente do formato do texto de origem.
+SEEN_FILE = "seen.npz"
+
+_NON_ALNUM = re.compile(r"[^0-9a-z]+")
+
+
+def canonical_name(name: str) -> str:
+    s = unicodedata.normalize("NFKD", str(name))
+    s = "".join(c for c in s if not unicodedata.combining(c)).casefold()
+    return _NON_ALNUM.sub(" ", s).strip()
+
+
+def _hash_names(names: List[str]) -> np.ndarray:
+    # só o dicionário (dezenas/centenas de nomes) passa por Python
+    return np.array(
+        [int.from_bytes(hashlib.blake2b(canonical_name(n).encode("utf-8"), digest_size=8).digest(), "little") for n in names],
+        dtype=np.uint64,
+    )
+
+
+def _mix(x: np.ndarray) -> np.ndarray:
+    # finalizador do splitmix64 (aritmética uint64 com overflow proposital)
+    with np.errstate(over="ignore"):
+        x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+        x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+        return x ^ (x >> np.uint64(31))
+
+
+def match_keys(data: MatchArrays, league: Optional[str] = None) -> np.ndarray:
+    """Coluna uint64 com a chave de cada jogo (liga do próprio dataset ou `league`)."""
+    n = len(data)
+    if data.league is not None and data.leagues:
+        lg = _hash_names(data.leagues)[data.league.astype(np.intp)]
+    else:
+        lg = np.full(n, _hash_names([league or ""])[0], dtype=np.uint64)
+    teams = _hash_names(data.teams) if data.teams else np.zeros(0, dtype=np.uint64)
+    home = teams[data.home.astype(np.intp)]
+    away = teams[data.away.astype(np.intp)]
+    days = data.days.astype(np.int64).astype(np.uint64)
+    return _mix(_mix(_mix(lg ^ days) ^ home) ^ away)
+
+
+@dataclass
+class Conflict:
+    index: int               # linha no lote
+    kept: Tuple[int, int]    # placar que já estava (fica)
+    found: Tuple[int, int]   # placar divergente (descartado)
+
+
+@dataclass
+class SeenSet:
+    """
+    Conjunto persistente de chaves já gravadas (ordenado, com o placar de
+    cada uma). Consulta por searchsorted: O(linhas novas · log N), sem
+    reler o store. `rows` é o nº de linhas do store quando o conjunto foi
+    gravado (-1 = desconhecido): se não bater com o meta.json, os dois
+    saíram de sincronia (build interrompido) e o build refaz tudo.
+    """
+
+    keys: np.ndarray = field(default_factory=lambda: np.zeros(0, dtype=np.uint64))
+    home_goals: np.ndarray = field(default_factory=lambda: np.zeros(0, dtype=np.int8))
+    away_goals: np.ndarray = field(default_factory=lambda: np.zeros(0, dtype=np.int8))
+    rows: int = 0
+
+    def __len__(self) -> int:
+        return int(self.keys.shape[0])
+
+    @classmethod
+    def load(cls, path: PathLike) -> "SeenSet":
+        path = Path(path)
+        if not path.exists():
+            return cls()
+        with np.load(path, allow_pickle=False) as z:
+            rows = int(z["rows"]) if "rows" in z.files else -1
+            return cls(keys=z["keys"], home_goals=z["home_goals"], away_goals=z["away_goals"], rows=rows)
+
+    def save(self, path: PathLike) -> None:
+        np.savez(
+            Path(path), keys=self.keys, home_goals=self.home_goals, away_goals=self.away_goals, rows=np.int64(self.rows)
+        )
+
+    def filter(self, data: MatchArrays) -> Tuple[np.ndarray, List[Conflict]]:
+        """
+        Máscara das linhas realmente novas do lote (1ª ocorrência de cada chave
+        ainda não vista) + conflitos: mesma chave com placar diferente.
+        O lote precisa ter `key` (match_keys).
+        """
+        keys = data.key
+        n = len(keys)
+        hg = data.home_goals.astype(np.int8)
+        ag = data.away_goals.astype(np.int8)
+        conflicts: List[Conflict] = []
+
+        # contra o que já foi gravado
+        pos = np.searchsorted(self.keys, keys)
+        pos_c = np.minimum(pos, max(len(self.keys) - 1, 0))
+        found = (pos < len(self.keys)) & (self.keys[pos_c] == keys) if len(self.keys) else np.zeros(n, dtype=bool)
+        diff = found & ((self.home_goals[pos_c] != hg) | (self.away_goals[pos_c] != ag)) if len(self.keys) else found
+        for i in np.flatnonzero(diff):
+            p = pos_c[i]
+            conflicts.append(Conflict(int(i), (int(self.home_goals[p]), int(self.away_goals[p])), (int(hg[i]), int(ag[i]))))
+
+        # dentro do próprio lote: fica a 1ª ocorrência
+        _, first, inv = np.unique(keys, return_index=True, return_inverse=True)
+        is_first = np.zeros(n, dtype=bool)
+        is_first[first] = True
+        f = first[inv]
+        dup_diff = ~is_first & ~found & ((hg[f] != hg) | (ag[f] != ag))
+        for i in np.flatnonzero(dup_diff):
+            conflicts.append(Conflict(int(i), (int(hg[f[i]]), int(ag[f[i]])), (int(hg[i]), int(ag[i]))))
+
+        return is_first & ~found, conflicts
+
+    def add(self, keys: np.ndarray, home_goals: np.ndarray, away_goals: np.ndarray) -> None:
+        if not len(keys):
+            return
+        order = np.argsort(keys, kind="stable")
+        keys = keys[order].astype(np.uint64)
+        pos = np.searchsorted(self.keys, keys)
+        # inserção ordenada: O(N + m log m), sem reordenar o conjunto todo
+        self.keys = np.insert(self.keys, pos, keys)
+        self.home_goals = np.insert(self.home_goals, pos, home_goals[order].astype(np.int8))
+        self.away_goals = np.insert(self.away_goals, pos, away_goals[order].astype(np.int8))
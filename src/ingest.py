@@ -0,0 +1,470 @@
+"""
+Ingestão unificada de partidas.
+
+Cada fonte tem um adapter que sabe abrir o arquivo e devolver lotes
+normalizados e tipados (MatchBatch):
+
+    date        datetime64 (quando a fonte tem data)
+    home_team   str
+    away_team   str
+    home_goals  int
+    away_goals  int
+
+O schema (mapeamento de colunas + formato de data) é detectado uma vez por
+(adapter, fonte, cabeçalho) e guardado num SchemaCache — em memória por
+padrão, ou no manifest do BuildCache nos builders.
+
+Adapters:
+  football-data.co.uk CSV    data/raw/eu_top5/<liga>/season-*.csv
+  football-data.co.uk XLSX   data/football-data/all-euro-data-*.xlsx (1 aba por divisão)
+  football-data.org JSON     payload de /competitions/{code}/matches
+  generic CSV                qualquer CSV com cabeçalho reconhecível (ALIASES)
+
+Medir throughput:  python -m src.ingest data/raw/eu_top5/*/*.csv
+"""
+from __future__ import annotations
+
+import csv
+import hashlib
+import json
+import sys
+import time
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+
+import pandas as pd
+
+PathLike = Union[str, Path]
+
+CANONICAL = ("date", "home_team", "away_team", "home_goals", "away_goals")
+NO_DATE = CANONICAL[1:]
+
+# Variações de cabeçalho aceitas (comparação sem caixa e sem espaços nas pontas),
+# em ordem de preferência.
+ALIASES: Dict[str, Tuple[str, ...]] = {
+    "date": ("date", "utcdate", "match_date", "data"),
+    "home_team": ("home_team", "hometeam", "home", "mandante"),
+    "away_team": ("away_team", "awayteam", "away", "visitante"),
+    "home_goals": ("home_goals", "homegoals", "fthg", "hg", "home_score", "gols_mandante"),
+    "away_goals": ("away_goals", "awaygoals", "ftag", "ag", "away_score", "gols_visitante"),
+}
+
+# Formatos testados (na ordem) na detecção; o football-data.co.uk usa
+# dd/mm/yy nas temporadas antigas e dd/mm/yyyy nas novas.
+DATE_FORMATS = (
+    "%d/%m/%y",
+    "%d/%m/%Y",
+    "%Y-%m-%d",
+    "%Y-%m-%dT%H:%M:%SZ",
+    "%d.%m.%Y",
+)
+DATE_SAMPLE = 200
+CHUNK_ROWS = 50_000
+
+
+# =========================================================
+# Colunas e datas
+# =========================================================
+def detect_columns(header: Sequence[str], required: Sequence[str] = CANONICAL) -> Dict[str, str]:
+    """Nome canônico -> coluna do arquivo. ValueError se faltar alguma de `required`."""
+    by_key: Dict[str, str] = {}
+    for h in header:
+        by_key.setdefault(str(h).strip().lower(), h)
+
+    cols: Dict[str, str] = {}
+    for name, aliases in ALIASES.items():
+        hit = next((by_key[a] for a in aliases if a in by_key), None)
+        if hit is not None:
+            cols[name] = hit
+
+    missing = [k for k in required if k not in cols]
+    if missing:
+        raise ValueError(f"faltando colunas {missing}. Colunas atuais: {list(header)}")
+    return cols
+
+
+def detect_date_format(values: pd.Series, formats: Sequence[str] = DATE_FORMATS) -> Optional[str]:
+    """Primeiro formato que parseia toda a amostra não-vazia; None = deixa o pandas inferir."""
+    sample = values.dropna().astype(str).str.strip()
+    sample = sample[sample != ""].head(DATE_SAMPLE)
+    if sample.empty:
+        return None
+    for fmt in formats:
+        if pd.to_datetime(sample, format=fmt, errors="coerce").notna().all():
+            return fmt
+    return None
+
+
+def parse_dates(values: pd.Series, fmt: Optional[str]) -> pd.Series:
+    """
+    Caminho rápido com formato fixo; as linhas que não baterem com ele caem na
+    inferência antiga (dayfirst), então o resultado é o mesmo de antes.
+    """
+    if pd.api.types.is_datetime64_any_dtype(values.dtype):
+        return values
+    if fmt is None:
+        return pd.to_datetime(values, errors="coerce", dayfirst=True)
+    out = pd.to_datetime(values, format=fmt, errors="coerce")
+    retry = out.isna() & values.notna()
+    if retry.any():
+        out[retry] = pd.to_datetime(values[retry], errors="coerce", dayfirst=True)
+    return out
+
+
+# =========================================================
+# Schema cache
+# =========================================================
+@dataclass(frozen=True)
+class SourceSchema:
+    columns: Dict[str, str]        # nome canônico -> coluna no arquivo
+    date_format: Optional[str]
+
+    def to_json(self) -> dict:
+        return {"columns": self.columns, "date_format": self.date_format}
+
+    @classmethod
+    def from_json(cls, doc: dict) -> "SourceSchema":
+        return cls(columns=dict(doc["columns"]), date_format=doc.get("date_format"))
+
+
+class SchemaCache:
+    """
+    Schema detectado uma vez por (adapter, fonte, cabeçalho). `entries` é um
+    dict JSON-serializável (o BuildCache guarda no manifest), então a detecção
+    sobrevive entre execuções.
+    """
+
+    def __init__(self, entries: Optional[dict] = None):
+        self.entries = entries if entries is not None else {}
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _key(adapter: str, source: str, header: Sequence[str], required: Sequence[str]) -> str:
+        sig = "\x1f".join(str(h) for h in header) + "\x1e" + ",".join(required)
+        return f"{adapter}:{source}:" + hashlib.sha1(sig.encode("utf-8")).hexdigest()[:16]
+
+    def resolve(
+        self,
+        adapter: str,
+        source: str,
+        header: Sequence[str],
+        sample_dates: Callable[[str], pd.Series],
+        required: Sequence[str] = CANONICAL,
+    ) -> SourceSchema:
+        key = self._key(adapter, source, header, required)
+        hit = self.entries.get(key)
+        if hit is not None:
+            self.hits += 1
+            return SourceSchema.from_json(hit)
+
+        self.misses += 1
+        columns = detect_columns(header, required)
+        fmt = detect_date_format(sample_dates(columns["date"])) if "date" in columns else None
+        schema = SourceSchema(columns=columns, date_format=fmt)
+        self.entries[key] = schema.to_json()
+        return schema
+
+
+# cache padrão do processo (local_stats, CLI); builders passam o do manifest
+SCHEMAS = SchemaCache()
+
+
+def normalize_frame(df: pd.DataFrame, schema: SourceSchema) -> pd.DataFrame:
+    """Renomeia/tipa as colunas do schema e descarta linhas incompletas."""
+    out = df[list(schema.columns.values())].rename(columns={v: k for k, v in schema.columns.items()})
+    out = out[[c for c in CANONICAL if c in schema.columns]]
+
+    if "date" in out.columns:
+        out["date"] = parse_dates(out["date"], schema.date_format)
+    out["home_goals"] = pd.to_numeric(out["home_goals"], errors="coerce")
+    out["away_goals"] = pd.to_numeric(out["away_goals"], errors="coerce")
+
+    out = out.dropna(subset=list(out.columns))
+    out["home_team"] = out["home_team"].astype(str).str.strip()
+    out["away_team"] = out["away_team"].astype(str).str.strip()
+    out["home_goals"] = out["home_goals"].astype(int)
+    out["away_goals"] = out["away_goals"].astype(int)
+    return out
+
+
+# =========================================================
+# Throughput
+# =========================================================
+@dataclass
+class IngestStats:
+    files: Dict[str, int] = field(default_factory=dict)
+    rows: Dict[str, int] = field(default_factory=dict)
+    seconds: Dict[str, float] = field(default_factory=dict)
+
+    def record(self, adapter: str, rows: int, seconds: float, files: int = 0) -> None:
+        self.files[adapter] = self.files.get(adapter, 0) + files
+        self.rows[adapter] = self.rows.get(adapter, 0) + rows
+        self.seconds[adapter] = self.seconds.get(adapter, 0.0) + seconds
+
+    def summary(self) -> str:
+        parts = []
+        for name in sorted(self.rows):
+            s = self.seconds[name]
+            rate = self.rows[name] / s if s > 0 else 0.0
+            parts.append(f"{name}: {self.files.get(name, 0)} arquivos, {self.rows[name]} linhas, {s:.2f}s ({rate:,.0f} linhas/s)")
+        return "\n".join(parts) or "nada lido"
+
+
+STATS = IngestStats()
+
+
+# =========================================================
+# Adapters
+# =========================================================
+@dataclass
+class MatchBatch:
+    source: str            # liga/aba/competição de onde o lote veio
+    frame: pd.DataFrame    # colunas canônicas, já tipadas
+
+
+class Adapter(ABC):
+    name = "base"
+
+    @abstractmethod
+    def accepts(self, path: Path) -> bool:
+        """True se o adapter sabe ler `path` (extensão/formato)."""
+
+    @abstractmethod
+    def read(
+        self,
+        path: Path,
+        source: Optional[str] = None,
+        schemas: Optional[SchemaCache] = None,
+        required: Sequence[str] = CANONICAL,
+        chunksize: Optional[int] = None,
+    ) -> Iterator[MatchBatch]:
+        """Lotes normalizados; com `chunksize`, fontes que suportam leem em pedaços."""
+
+
+def csv_header(path: PathLike) -> List[str]:
+    with open(path, newline="", encoding="utf-8-sig", errors="replace") as f:
+        return next(csv.reader(f), [])
+
+
+class GenericCsvAdapter(Adapter):
+    name = "csv"
+
+    def accepts(self, path: Path) -> bool:
+        return path.suffix.lower() == ".csv"
+
+    def schema(
+        self,
+        path: PathLike,
+        source: Optional[str] = None,
+        schemas: Optional[SchemaCache] = None,
+        required: Sequence[str] = CANONICAL,
+    ) -> SourceSchema:
+        path = Path(path)
+        schemas = SCHEMAS if schemas is None else schemas
+
+        def sample(col: str) -> pd.Series:
+            return pd.read_csv(path, usecols=[col], nrows=DATE_SAMPLE, dtype=str)[col]
+
+        try:
+            return schemas.resolve(self.name, source or path.parent.name, csv_header(path), sample, required)
+        except ValueError as e:
+            raise ValueError(f"{path.name}: {e}") from None
+
+    def read_schema(self, path: PathLike, schema: SourceSchema) -> pd.DataFrame:
+        """Lê só as colunas do schema (o resto, ex. odds, nem é parseado)."""
+        t0 = time.perf_counter()
+        df = normalize_frame(pd.read_csv(path, usecols=list(schema.columns.values())), schema)
+        STATS.record(self.name, len(df), time.perf_counter() - t0, files=1)
+        return df
+
+    def read_chunks(self, path: PathLike, schema: SourceSchema, chunksize: int = CHUNK_ROWS) -> Iterator[pd.DataFrame]:
+        """Como read_schema, mas em lotes de até `chunksize` linhas (memória constante)."""
+        STATS.record(self.name, 0, 0.0, files=1)
+        with pd.read_csv(path, usecols=list(schema.columns.values()), chunksize=chunksize) as reader:
+            while True:
+                t0 = time.perf_counter()
+                try:
+                    chunk = next(reader)
+                except StopIteration:
+                    return
+                df = normalize_frame(chunk, schema)
+                STATS.record(self.name, len(df), time.perf_counter() - t0)
+                yield df
+
+    def read(self, path, source=None, schemas=None, required=CANONICAL, chunksize=None) -> Iterator[MatchBatch]:
+        path = Path(path)
+        schema = self.schema(path, source, schemas, required)
+        source = source or path.parent.name
+        if chunksize is None:
+            yield MatchBatch(source, self.read_schema(path, schema))
+            return
+        for df in self.read_chunks(path, schema, chunksize):
+            yield MatchBatch(source, df)
+
+
+class FootballDataCsvAdapter(GenericCsvAdapter):
+    """football-data.co.uk (Div, Date, HomeTeam, AwayTeam, FTHG, FTAG, ...)."""
+
+    name = "football-data.co.uk"
+
+    def accepts(self, path: Path) -> bool:
+        if not super().accepts(path):
+            return False
+        header = {h.strip() for h in csv_header(path)}
+        return {"HomeTeam", "AwayTeam", "FTHG", "FTAG"} <= header
+
+
+class FootballDataXlsxAdapter(Adapter):
+    """Workbook all-euro-data-*.xlsx: 1 aba por divisão, lidas numa passada só."""
+
+    name = "football-data.co.uk-xlsx"
+
+    def accepts(self, path: Path) -> bool:
+        return path.suffix.lower() in (".xlsx", ".xls")
+
+    def sheets(self, path: PathLike, names: Optional[Iterable[str]] = None, usecols=None) -> Dict[str, pd.DataFrame]:
+        """Abas do workbook (todas, ou só as de `names` que existirem), abrindo o arquivo uma vez."""
+        t0 = time.perf_counter()
+        with pd.ExcelFile(path) as xl:
+            wanted = xl.sheet_names if names is None else [s for s in xl.sheet_names if s in set(names)]
+            book = xl.parse(sheet_name=wanted, usecols=usecols) if wanted else {}
+        STATS.record(self.name, 0, time.perf_counter() - t0, files=1)
+        return book
+
+    def read(self, path, source=None, schemas=None, required=CANONICAL, chunksize=None) -> Iterator[MatchBatch]:
+        # XLSX não tem leitura parcial: o lote é a aba
+        schemas = SCHEMAS if schemas is None else schemas
+        for sheet, df in self.sheets(path).items():
+            if source is not None and sheet != source:
+                continue
+            try:
+                schema = schemas.resolve(self.name, sheet, [str(c) for c in df.columns], lambda c: df[c].head(DATE_SAMPLE), required)
+            except ValueError:
+                continue  # aba sem jogos (ex.: notas)
+            t0 = time.perf_counter()
+            out = normalize_frame(df, schema)
+            STATS.record(self.name, len(out), time.perf_counter() - t0)
+            yield MatchBatch(sheet, out)
+
+
+class FootballDataOrgAdapter(Adapter):
+    """Payload JSON do football-data.org v4 (só jogos FINISHED com placar)."""
+
+    name = "football-data.org"
+
+    def accepts(self, path: Path) -> bool:
+        return path.suffix.lower() == ".json"
+
+    @staticmethod
+    def frame(payload: dict, with_ids: bool = False) -> pd.DataFrame:
+        """Jogos com placar; `with_ids` mantém o id da API e o utcDate completo (sync incremental)."""
+        t0 = time.perf_counter()
+        rows = []
+        for m in payload.get("matches", []):
+            if m.get("status") != "FINISHED":
+                continue
+            score = (m.get("score") or {}).get("fullTime") or {}
+            hg, ag = score.get("home"), score.get("away")
+            if hg is None or ag is None:
+                continue
+            row = {
+                "date": (m.get("utcDate") or "")[:10],
+                "home_team": m["homeTeam"]["name"],
+                "away_team": m["awayTeam"]["name"],
+                "home_goals": hg,
+                "away_goals": ag,
+            }
+            if with_ids:
+                row["id"] = m.get("id")
+                row["utc_date"] = m.get("utcDate") or ""
+            rows.append(row)
+        df = pd.DataFrame(rows, columns=list(CANONICAL) + (["id", "utc_date"] if with_ids else []))
+        if with_ids:
+            df = df.dropna(subset=["id"])
+            df["id"] = df["id"].astype("int64")
+        df["date"] = pd.to_datetime(df["date"], format="%Y-%m-%d", errors="coerce")
+        df = df.dropna(subset=["date"])
+        df["home_goals"] = df["home_goals"].astype(int)
+        df["away_goals"] = df["away_goals"].astype(int)
+        STATS.record(FootballDataOrgAdapter.name, len(df), time.perf_counter() - t0)
+        return df
+
+    def read(self, path, source=None, schemas=None, required=CANONICAL, chunksize=None) -> Iterator[MatchBatch]:
+        path = Path(path)
+        payload = json.loads(path.read_text(encoding="utf-8"))
+        code = source or ((payload.get("competition") or {}).get("code")) or path.stem
+        STATS.record(self.name, 0, 0.0, files=1)
+        yield MatchBatch(code, self.frame(payload))
+
+
+# ordem importa: o primeiro que aceitar o arquivo fica com ele
+ADAPTERS: List[Adapter] = [
+    FootballDataCsvAdapter(),
+    FootballDataXlsxAdapter(),
+    FootballDataOrgAdapter(),
+    GenericCsvAdapter(),
+]
+
+
+def adapter_for(path: PathLike) -> Adapter:
+    path = Path(path)
+    for a in ADAPTERS:
+        if a.accepts(path):
+            return a
+    raise ValueError(f"Nenhum adapter de ingestão para {path}")
+
+
+def read_batches(
+    path: PathLike,
+    source: Optional[str] = None,
+    schemas: Optional[SchemaCache] = None,
+    required: Sequence[str] = CANONICAL,
+    chunksize: Optional[int] = None,
+) -> Iterator[MatchBatch]:
+    path = Path(path)
+    return adapter_for(path).read(path, source, schemas, required, chunksize)
+
+
+def iter_batches(
+    paths: Sequence[PathLike],
+    chunksize: int = CHUNK_ROWS,
+    schemas: Optional[SchemaCache] = None,
+    required: Sequence[str] = CANONICAL,
+) -> Iterator[MatchBatch]:
+    """Stream de lotes sobre vários arquivos, um lote em memória por vez."""
+    for p in paths:
+        yield from read_batches(p, None, schemas, required, chunksize)
+
+
+def read_frame(
+    path: PathLike,
+    source: Optional[str] = None,
+    schemas: Optional[SchemaCache] = None,
+    required: Sequence[str] = CANONICAL,
+) -> pd.DataFrame:
+    """Todos os lotes de um arquivo num DataFrame só (canônico e tipado)."""
+    frames = [b.frame for b in read_batches(path, source, schemas, required)]
+    if not frames:
+        return pd.DataFrame(columns=list(CANONICAL))
+    return frames[0] if len(frames) == 1 else pd.concat(frames, ignore_index=True)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    paths = argv if argv is not None else sys.argv[1:]
+    if not paths:
+        raise SystemExit("uso: python -m src.ingest ARQUIVO [ARQUIVO...]")
+    for p in paths:
+        try:
+            for _ in read_batches(p, chunksize=CHUNK_ROWS):
+                pass
+        except ValueError as e:
+            print(f"[SKIP] {p}: {e}")
+    print(STATS.summary())
+    print(f"schemas: {SCHEMAS.misses} detectados, {SCHEMAS.hits} do cache")
+
+
+if __name__ == "__main__":
+    main()
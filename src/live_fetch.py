@@ -1,10 +1,25 @@
 from __future__ import annotations
 
 import os
-from typing import Any, Dict, Optional, List
+import re
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, Optional, List
 
 import requests
 
+from src.metrics import (
+    UPSTREAM_429,
+    UPSTREAM_AVAILABLE,
+    UPSTREAM_BREAKER_OPEN,
+    UPSTREAM_LATENCY,
+    UPSTREAM_REQUESTS,
+    UPSTREAM_SHORT_CIRCUITS,
+)
+from src.timing import stage
+
 BASE_URL = os.getenv("FOOTBALL_API_BASE_URL", "https://api.football-data.org/v4")
 TOKEN = (
     os.getenv("FOOTBALL_DATA_TOKEN")
@@ -15,6 +30,122 @@ TOKEN = (
 
 DEFAULT_TIMEOUT = 20
 
+# Circuit breaker por competição: abre após N falhas seguidas (timeout,
+# erro de rede, 5xx, 429) e só deixa passar uma sonda depois do cooldown.
+BREAKER_FAILURES = int(os.getenv("UPSTREAM_BREAKER_FAILURES", "3"))
+BREAKER_COOLDOWN = float(os.getenv("UPSTREAM_BREAKER_COOLDOWN", "30"))
+
+# Abaixo disso não vale a pena nem tentar (o prazo do chamador já acabou)
+MIN_ATTEMPT_SECONDS = 0.05
+
+
+class UpstreamUnavailable(RuntimeError):
+    """
+    Chamada não feita (ou abandonada): circuito aberto ou prazo (deadline)
+    do chamador esgotado. `reason` é "open" ou "deadline".
+    """
+
+    def __init__(self, message: str, retry_after: float = 0.0, reason: str = "open"):
+        super().__init__(message)
+        self.retry_after = retry_after
+        self.reason = reason
+
+
+class CircuitBreaker:
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failures: Optional[int] = None, cooldown: Optional[float] = None):
+        self.max_failures = BREAKER_FAILURES if failures is None else failures
+        self.cooldown = BREAKER_COOLDOWN if cooldown is None else cooldown
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """True se a chamada pode ir; no meio-aberto, só a primeira sonda passa."""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.cooldown:
+                self.state = self.HALF_OPEN
+                return True
+            return False
+
+    def success(self) -> None:
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+
+    def failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.max_failures:
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+    def release(self) -> None:
+        """Chamada sem veredito (cortada pelo prazo do chamador): no meio-aberto, libera outra sonda."""
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                self.state = self.OPEN
+
+    def retry_after(self) -> float:
+        if self.state == self.CLOSED:
+            return 0.0
+        return max(0.0, self.cooldown - (time.monotonic() - self.opened_at))
+
+
+_BREAKERS: Dict[str, CircuitBreaker] = {}
+_BREAKERS_LOCK = threading.Lock()
+
+
+def breaker(competition: str) -> CircuitBreaker:
+    with _BREAKERS_LOCK:
+        br = _BREAKERS.get(competition)
+        if br is None:
+            br = CircuitBreaker()
+            _BREAKERS[competition] = br
+        return br
+
+
+UPSTREAM_BREAKER_OPEN.set_function(
+    lambda: {(c,): float(b.state != CircuitBreaker.CLOSED) for c, b in list(_BREAKERS.items())}
+)
+
+# Prazo absoluto (time.monotonic) do chamador atual; None = só DEFAULT_TIMEOUT
+_DEADLINE: ContextVar[Optional[float]] = ContextVar("upstream_deadline", default=None)
+
+
+@contextmanager
+def upstream_deadline(seconds: float) -> Iterator[None]:
+    """
+    `with upstream_deadline(0.8): fetch_...()` -> as chamadas à API dentro
+    do bloco usam no máximo o tempo que sobra. Prazos aninhados valem o menor.
+    """
+    deadline = time.monotonic() + seconds
+    current = _DEADLINE.get()
+    if current is not None:
+        deadline = min(deadline, current)
+    token = _DEADLINE.set(deadline)
+    try:
+        yield
+    finally:
+        _DEADLINE.reset(token)
+
+
+def _request_timeout() -> Optional[float]:
+    """Timeout da próxima chamada; None se o prazo do chamador já acabou."""
+    deadline = _DEADLINE.get()
+    if deadline is None:
+        return DEFAULT_TIMEOUT
+    remaining = deadline - time.monotonic()
+    if remaining < MIN_ATTEMPT_SECONDS:
+        return None
+    return min(DEFAULT_TIMEOUT, remaining)
+
 
 def _headers() -> Dict[str, str]:
     if not TOKEN:
@@ -28,13 +159,71 @@ def _rate_limit_debug(resp: requests.Response) -> str:
     return f"avail={avail}, reset={reset}"
 
 
+_COMPETITION_RE = re.compile(r"/competitions/([^/]+)")
+
+
+def _competition(url: str) -> str:
+    m = _COMPETITION_RE.search(url)
+    return m.group(1) if m else "-"
+
+
+def _record_upstream(url: str, resp: Optional[requests.Response], elapsed: float) -> None:
+    comp = _competition(url)
+    UPSTREAM_LATENCY.observe(elapsed, competition=comp)
+    UPSTREAM_REQUESTS.inc(competition=comp, status=resp.status_code if resp is not None else "error")
+    if resp is None:
+        return
+    if resp.status_code == 429:
+        UPSTREAM_429.inc(competition=comp)
+    avail = resp.headers.get("X-Requests-Available-Minute")
+    if avail is not None:
+        try:
+            UPSTREAM_AVAILABLE.set(float(avail))
+        except ValueError:
+            pass
+
+
 def _get(url: str, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
     if not TOKEN:
         raise RuntimeError(
             "Token não encontrado. Defina FOOTBALL_DATA_TOKEN (ou FOOTBALL_TOKEN/API_TOKEN)."
         )
 
-    resp = requests.get(url, headers=_headers(), params=params, timeout=DEFAULT_TIMEOUT)
+    comp = _competition(url)
+    br = breaker(comp)
+
+    timeout = _request_timeout()
+    if timeout is None:
+        UPSTREAM_SHORT_CIRCUITS.inc(competition=comp, reason="deadline")
+        raise UpstreamUnavailable(f"Prazo esgotado antes de chamar a API ({comp}).", reason="deadline")
+    if not br.allow():
+        UPSTREAM_SHORT_CIRCUITS.inc(competition=comp, reason="open")
+        raise UpstreamUnavailable(
+            f"Circuito aberto para {comp} (API instável).", retry_after=br.retry_after(), reason="open"
+        )
+
+    t0 = time.perf_counter()
+    resp: Optional[requests.Response] = None
+    try:
+        with stage("upstream"):
+            resp = requests.get(url, headers=_headers(), params=params, timeout=timeout)
+    except requests.Timeout as e:
+        if timeout < DEFAULT_TIMEOUT:
+            # timeout encurtado pelo prazo do chamador: não diz nada sobre a API
+            br.release()
+            raise UpstreamUnavailable(f"Prazo esgotado esperando a API ({comp}).", reason="deadline") from e
+        br.failure()
+        raise
+    except requests.RequestException:
+        br.failure()
+        raise
+    finally:
+        _record_upstream(url, resp, time.perf_counter() - t0)
+
+    if resp.status_code == 429 or resp.status_code >= 500:
+        br.failure()
+    else:
+        br.success()
 
     if resp.status_code == 429:
         raise RuntimeError(f"429 Rate limit. {_rate_limit_debug(resp)}")
@@ -83,6 +272,11 @@ def fetch_competition_matches(
     return data
 
 
+def fetch_upcoming_matches(code: str) -> Dict[str, Any]:
+    """Jogos ainda não disputados (SCHEDULED/TIMED) da competição, sem corte."""
+    return fetch_competition_matches(code, statuses=["SCHEDULED", "TIMED"], limit=0)
+
+
 def fetch_competition_standings(code: str) -> Dict[str, Any]:
     url = f"{BASE_URL}/competitions/{code}/standings"
     return _get(url)
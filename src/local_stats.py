@@ -1,56 +1,14 @@
 from __future__ import annotations
 
-import csv
-from dataclasses import dataclass
-from datetime import datetime
 from pathlib import Path
 from typing import Dict, List, Optional, Tuple
 
-DATA_DIR = Path("data")
-
-# Aceita variações comuns de cabeçalho
-HOME_TEAM_KEYS = ["home_team", "homeTeam", "HomeTeam", "home", "mandante"]
-AWAY_TEAM_KEYS = ["away_team", "awayTeam", "AwayTeam", "away", "visitante"]
-HOME_GOALS_KEYS = ["home_goals", "homeGoals", "FTHG", "HG", "home_score", "gols_mandante"]
-AWAY_GOALS_KEYS = ["away_goals", "awayGoals", "FTAG", "AG", "away_score", "gols_visitante"]
-DATE_KEYS = ["date", "utcDate", "Date", "match_date", "data"]
-
-def _pick_key(headers: List[str], candidates: List[str]) -> Optional[str]:
-    s = {h.lower(): h for h in headers}
-    for c in candidates:
-        if c.lower() in s:
-            return s[c.lower()]
-    return None
+import numpy as np
+import pandas as pd
 
-def _to_int(x) -> Optional[int]:
-    try:
-        if x is None:
-            return None
-        x = str(x).strip()
-        if x == "" or x.lower() == "none" or x.lower() == "nan":
-            return None
-        return int(float(x))
-    except Exception:
-        return None
+from src.ingest import NO_DATE, read_frame
 
-def _parse_date(x: str) -> Optional[datetime]:
-    if not x:
-        return None
-    x = x.strip()
-    # tenta ISO
-    try:
-        if x.endswith("Z"):
-            x = x.replace("Z", "+00:00")
-        return datetime.fromisoformat(x)
-    except Exception:
-        pass
-    # tenta formatos comuns
-    for fmt in ("%Y-%m-%d", "%d/%m/%Y", "%Y/%m/%d", "%d-%m-%Y", "%Y-%m-%d %H:%M", "%d/%m/%Y %H:%M"):
-        try:
-            return datetime.strptime(x, fmt)
-        except Exception:
-            continue
-    return None
+DATA_DIR = Path("data")
 
 def _find_csv_for_league(code: str) -> Optional[Path]:
     code_u = code.upper()
@@ -73,17 +31,87 @@ def _find_csv_for_league(code: str) -> Optional[Path]:
                 return p
     return None
 
-@dataclass
-class TeamAgg:
-    games: int = 0
-    gf: int = 0
-    ga: int = 0
-    btts: int = 0
-    over15: int = 0
-    over25: int = 0
+# cache por liga: code -> (csv, mtime_ns, {time: {"home", "away", "overall"}} ou None se ilegível)
+_LEAGUE_CACHE: Dict[str, Tuple[Path, int, Optional[Dict[str, Dict[str, Dict[str, float]]]]]] = {}
+_CSV_PATHS: Dict[str, Path] = {}
+
+def _league_csv(code: str) -> Optional[Path]:
+    # caminho resolvido uma vez por liga; só procura de novo se o arquivo sumir
+    p = _CSV_PATHS.get(code)
+    if p is None or not p.exists():
+        p = _find_csv_for_league(code)
+        if p is None:
+            _CSV_PATHS.pop(code, None)
+            return None
+        _CSV_PATHS[code] = p
+    return p
+
+def _pack(games: np.ndarray, gf: np.ndarray, ga: np.ndarray, btts: np.ndarray, o15: np.ndarray, o25: np.ndarray) -> List[Dict[str, float]]:
+    n = np.maximum(games, 1)  # time sem jogos no lado: tudo 0.0
+    cols = {
+        "games": games.astype(float),
+        "gf_avg": np.where(games > 0, gf / n, 0.0),
+        "ga_avg": np.where(games > 0, ga / n, 0.0),
+        "btts": np.where(games > 0, btts / n, 0.0),
+        "over15": np.where(games > 0, o15 / n, 0.0),
+        "over25": np.where(games > 0, o25 / n, 0.0),
+    }
+    lists = {k: v.tolist() for k, v in cols.items()}
+    return [dict(zip(lists, vals)) for vals in zip(*lists.values())]
+
+def _aggregate(df: pd.DataFrame) -> Dict[str, Dict[str, Dict[str, float]]]:
+    """Um group-by por lado (mandante/visitante) para todos os times da liga de uma vez."""
+    hg = df["home_goals"].to_numpy(dtype=np.int64)
+    ag = df["away_goals"].to_numpy(dtype=np.int64)
+    total = hg + ag
+    flags = np.stack([np.ones_like(hg), hg, ag, (hg > 0) & (ag > 0), total >= 2, total >= 3], axis=1).astype(np.int64)
+
+    teams, idx = np.unique(np.concatenate([df["home_team"].to_numpy(dtype=object), df["away_team"].to_numpy(dtype=object)]), return_inverse=True)
+    hi, ai = idx[: len(df)], idx[len(df):]
+
+    # colunas: jogos, gols pró, gols contra, btts, over 1.5, over 2.5
+    def per_team(i: np.ndarray, cols: List[int]) -> np.ndarray:
+        return np.stack([np.bincount(i, weights=flags[:, c], minlength=len(teams)) for c in cols], axis=1).astype(np.int64)
+
+    home = per_team(hi, [0, 1, 2, 3, 4, 5])
+    away = per_team(ai, [0, 2, 1, 3, 4, 5])  # fora: pró/contra invertidos
+    overall = home + away
+
+    packed = [_pack(*m.T) for m in (home, away, overall)]
+    return {t: {"home": h, "away": a, "overall": o} for t, h, a, o in zip(teams.tolist(), *packed)}
+
+def _league_stats(code: str) -> Optional[Dict[str, Dict[str, Dict[str, float]]]]:
+    # None = sem CSV ou CSV sem as colunas de time/gols
+    csv_path = _league_csv(code)
+    if not csv_path:
+        return None
+    try:
+        mtime = csv_path.stat().st_mtime_ns
+    except OSError:
+        return None
+
+    hit = _LEAGUE_CACHE.get(code)
+    if hit and hit[0] == csv_path and hit[1] == mtime:
+        return hit[2]
+
+    # colunas detectadas por src/ingest.py (schema cacheado por cabeçalho)
+    try:
+        stats = _aggregate(read_frame(csv_path, source=code.upper(), required=NO_DATE))
+    except ValueError:
+        stats = None
+    _LEAGUE_CACHE[code] = (csv_path, mtime, stats)
+    return stats
+
+def get_league_stats(code: str) -> Dict[str, Dict[str, Dict[str, float]]]:
+    """
+    Estatísticas históricas de todos os times da liga, a partir do CSV local:
+      {time: {"home": {...}, "away": {...}, "overall": {...}}}
+    Calculado uma vez por arquivo (refeito se o mtime mudar); os dicts são
+    compartilhados, então não altere o retorno.
+    """
+    return _league_stats(code) or {}
 
-def _rate(n: int, d: int) -> float:
-    return (n / d) if d > 0 else 0.0
+_EMPTY = _pack(*np.zeros((6, 1), dtype=np.int64))[0]
 
 def get_team_historical_stats(code: str, team: str) -> Dict[str, Dict[str, float]]:
     """
@@ -95,69 +123,11 @@ def get_team_historical_stats(code: str, team: str) -> Dict[str, Dict[str, float
         "overall": {...}
       }
     """
-    csv_path = _find_csv_for_league(code)
-    if not csv_path:
+    stats = _league_stats(code)
+    if stats is None:
         return {}
-
-    with csv_path.open("r", encoding="utf-8", newline="") as f:
-        reader = csv.DictReader(f)
-        headers = reader.fieldnames or []
-        k_home = _pick_key(headers, HOME_TEAM_KEYS)
-        k_away = _pick_key(headers, AWAY_TEAM_KEYS)
-        k_hg = _pick_key(headers, HOME_GOALS_KEYS)
-        k_ag = _pick_key(headers, AWAY_GOALS_KEYS)
-
-        if not (k_home and k_away and k_hg and k_ag):
-            return {}
-
-        home = TeamAgg()
-        away = TeamAgg()
-
-        for row in reader:
-            ht = (row.get(k_home) or "").strip()
-            at = (row.get(k_away) or "").strip()
-            hg = _to_int(row.get(k_hg))
-            ag = _to_int(row.get(k_ag))
-            if hg is None or ag is None:
-                continue
-
-            total = hg + ag
-            is_btts = (hg > 0 and ag > 0)
-            is_over15 = (total >= 2)
-            is_over25 = (total >= 3)
-
-            if ht == team:
-                home.games += 1
-                home.gf += hg
-                home.ga += ag
-                home.btts += 1 if is_btts else 0
-                home.over15 += 1 if is_over15 else 0
-                home.over25 += 1 if is_over25 else 0
-            if at == team:
-                away.games += 1
-                away.gf += ag
-                away.ga += hg
-                away.btts += 1 if is_btts else 0
-                away.over15 += 1 if is_over15 else 0
-                away.over25 += 1 if is_over25 else 0
-
-    def pack(a: TeamAgg) -> Dict[str, float]:
-        return {
-            "games": float(a.games),
-            "gf_avg": (a.gf / a.games) if a.games else 0.0,
-            "ga_avg": (a.ga / a.games) if a.games else 0.0,
-            "btts": _rate(a.btts, a.games),
-            "over15": _rate(a.over15, a.games),
-            "over25": _rate(a.over25, a.games),
-        }
-
-    overall = TeamAgg(
-        games=home.games + away.games,
-        gf=home.gf + away.gf,
-        ga=home.ga + away.ga,
-        btts=home.btts + away.btts,
-        over15=home.over15 + away.over15,
-        over25=home.over25 + away.over25,
-    )
-
-    return {"home": pack(home), "away": pack(away), "overall": pack(overall)}
+    hit = stats.get(team)
+    if hit is not None:
+        return hit
+    # time sem jogos na liga: tudo zerado
+    return {"home": dict(_EMPTY), "away": dict(_EMPTY), "overall": dict(_EMPTY)}
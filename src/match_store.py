@@ -0,0 +1,490 @@
+from __future__ import annotations
+
+import json
+import os
+import shutil
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+# Formato colunar da camada processed (NPZ, sem pickle):
+#   teams       dicionário de times (ordenado) -> ids int16 em home/away
+#   home_goals  int8 / away_goals int8
+#   days        int32 (dias desde 1970-01-01)
+#   league/season: ids int16 + dicionários (opcionais)
+#
+# Datasets grandes usam a variante em diretório (<nome>.cols/), escrita por
+# append (StoreWriter) e lida com memmap: meta.json + um .bin cru por coluna.
+FORMAT_VERSION = 1
+EPOCH = np.datetime64("1970-01-01", "D")
+CHUNK_ROWS = 50_000
+
+COLUMN_DTYPES = {
+    "home": np.int16,
+    "away": np.int16,
+    "home_goals": np.int8,
+    "away_goals": np.int8,
+    "days": np.int32,
+    "league": np.int16,
+    "season": np.int16,
+    "key": np.uint64,
+}
+
+PathLike = Union[str, Path]
+
+
+@dataclass
+class MatchArrays:
+    teams: List[str]
+    home: np.ndarray        # int16, índice em teams
+    away: np.ndarray        # int16
+    home_goals: np.ndarray  # int8
+    away_goals: np.ndarray  # int8
+    days: np.ndarray        # int32
+    leagues: Optional[List[str]] = None
+    league: Optional[np.ndarray] = None  # int16, índice em leagues
+    seasons: Optional[List[str]] = None
+    season: Optional[np.ndarray] = None  # int16, índice em seasons
+    key: Optional[np.ndarray] = None     # uint64, chave do jogo (src/dedup.py)
+
+    def __len__(self) -> int:
+        return int(self.home.shape[0])
+
+    @property
+    def dates(self) -> np.ndarray:
+        return EPOCH + self.days.astype("timedelta64[D]")
+
+    def select(self, mask: np.ndarray) -> "MatchArrays":
+        return MatchArrays(
+            teams=self.teams,
+            home=self.home[mask],
+            away=self.away[mask],
+            home_goals=self.home_goals[mask],
+            away_goals=self.away_goals[mask],
+            days=self.days[mask],
+            leagues=self.leagues,
+            league=None if self.league is None else self.league[mask],
+            seasons=self.seasons,
+            season=None if self.season is None else self.season[mask],
+            key=None if self.key is None else self.key[mask],
+        )
+
+    def for_league(self, name: str) -> "MatchArrays":
+        if self.leagues is None or self.league is None:
+            raise ValueError("Dataset sem coluna de liga.")
+        if name not in self.leagues:
+            raise KeyError(f"Liga '{name}' não existe no dataset ({self.leagues}).")
+        return self.select(self.league == self.leagues.index(name))
+
+    def compact_teams(self) -> Tuple[List[str], np.ndarray, np.ndarray]:
+        """
+        (times, home_idx, away_idx) só com os times presentes, em ordem
+        alfabética — os mesmos ids que o train_team_poisson geraria.
+        """
+        present = np.zeros(len(self.teams), dtype=bool)
+        present[self.home] = True
+        present[self.away] = True
+        home = self.home.astype(np.intp)
+        away = self.away.astype(np.intp)
+        idx = np.flatnonzero(present)
+        names = [self.teams[i] for i in idx]
+        order = sorted(range(len(names)), key=names.__getitem__)
+        if len(idx) == len(self.teams) and order == list(range(len(names))):
+            return list(self.teams), home, away  # dicionário já ordenado e todo usado
+        # dicionário de store com append (ordem de chegada) ou com times sobrando
+        remap = np.full(len(self.teams), -1, dtype=np.intp)
+        remap[idx[order]] = np.arange(len(idx))
+        return [names[i] for i in order], remap[home], remap[away]
+
+    def to_frame(self) -> pd.DataFrame:
+        """DataFrame no formato dos CSVs antigos (para quem ainda precisa)."""
+        names = np.array(self.teams, dtype=object)
+        df = pd.DataFrame({
+            "date": self.dates.astype(str),
+            "home_team": names[self.home],
+            "away_team": names[self.away],
+            "home_goals": self.home_goals.astype(int),
+            "away_goals": self.away_goals.astype(int),
+        })
+        if self.season is not None and self.seasons is not None:
+            df["season"] = np.array(self.seasons, dtype=object)[self.season]
+        if self.league is not None and self.leagues is not None:
+            df["league"] = np.array(self.leagues, dtype=object)[self.league]
+        return df
+
+
+def _encode(values: pd.Series) -> Tuple[List[str], np.ndarray]:
+    uniques, codes = np.unique(values.to_numpy().astype(str), return_inverse=True)
+    return uniques.tolist(), codes.astype(np.int16)
+
+
+def _to_days(values: pd.Series) -> np.ndarray:
+    if pd.api.types.is_datetime64_dtype(values.dtype):
+        dates = values.to_numpy(dtype="datetime64[D]")  # já tipado (builders): sem reparse
+    else:
+        dates = pd.to_datetime(values, errors="coerce", utc=True).dt.tz_localize(None).to_numpy(dtype="datetime64[D]")
+    return (dates - EPOCH).astype(np.int32)
+
+
+def from_frame(df: pd.DataFrame) -> MatchArrays:
+    """
+    Converte o DataFrame normalizado (date, home_team, away_team,
+    home_goals, away_goals[, season, league]) para o formato colunar.
+    """
+    n = len(df)
+    names = np.concatenate([df["home_team"].to_numpy().astype(str), df["away_team"].to_numpy().astype(str)])
+    teams, codes = np.unique(names, return_inverse=True)
+    if len(teams) > np.iinfo(np.int16).max:
+        raise ValueError(f"Times demais para int16: {len(teams)}")
+
+    out = MatchArrays(
+        teams=teams.tolist(),
+        home=codes[:n].astype(np.int16),
+        away=codes[n:].astype(np.int16),
+        home_goals=df["home_goals"].to_numpy(dtype=np.int8),
+        away_goals=df["away_goals"].to_numpy(dtype=np.int8),
+        days=_to_days(df["date"]),
+    )
+    if "league" in df.columns:
+        out.leagues, out.league = _encode(df["league"])
+    if "season" in df.columns:
+        out.seasons, out.season = _encode(df["season"])
+    return out
+
+
+def _merge_dict(parts: List[Optional[List[str]]]) -> List[str]:
+    return sorted(set().union(*(p for p in parts if p)))
+
+
+def _recode(codes: np.ndarray, local: List[str], merged: List[str]) -> np.ndarray:
+    if not len(local):
+        return codes.astype(np.int16)
+    # merged é ordenado: searchsorted mapeia id local -> id global
+    # (local pode vir fora de ordem, ex.: store com append)
+    lut = np.searchsorted(np.array(merged, dtype=str), np.array(local, dtype=str)).astype(np.int16)
+    return lut[codes]
+
+
+def concat(parts: List[MatchArrays], sort_by_date: bool = True) -> MatchArrays:
+    """
+    Junta vários MatchArrays (cada um com seu dicionário) num só, unindo os
+    dicionários e renumerando os ids. Ordena por data de forma estável, então
+    a ordem das partes desempata jogos do mesmo dia (resultado determinístico).
+    """
+    if not parts:
+        raise ValueError("concat: nenhuma parte.")
+    teams = _merge_dict([p.teams for p in parts])
+    if len(teams) > np.iinfo(np.int16).max:
+        raise ValueError(f"Times demais para int16: {len(teams)}")
+
+    out = MatchArrays(
+        teams=teams,
+        home=np.concatenate([_recode(p.home, p.teams, teams) for p in parts]),
+        away=np.concatenate([_recode(p.away, p.teams, teams) for p in parts]),
+        home_goals=np.concatenate([p.home_goals for p in parts]).astype(np.int8),
+        away_goals=np.concatenate([p.away_goals for p in parts]).astype(np.int8),
+        days=np.concatenate([p.days for p in parts]).astype(np.int32),
+    )
+    for names_attr, codes_attr in (("leagues", "league"), ("seasons", "season")):
+        if all(getattr(p, codes_attr) is not None for p in parts):
+            merged = _merge_dict([getattr(p, names_attr) for p in parts])
+            setattr(out, names_attr, merged)
+            setattr(out, codes_attr, np.concatenate([
+                _recode(getattr(p, codes_attr), getattr(p, names_attr), merged) for p in parts
+            ]))
+
+    if all(p.key is not None for p in parts):
+        out.key = np.concatenate([p.key for p in parts])
+
+    if sort_by_date:
+        out = out.select(np.argsort(out.days, kind="stable"))
+    return out
+
+
+def drop_duplicates(data: MatchArrays) -> MatchArrays:
+    """Remove linhas idênticas (data, times, placar), mantendo a primeira ocorrência."""
+    rows = np.empty(len(data), dtype=[("d", np.int32), ("h", np.int16), ("a", np.int16), ("hg", np.int8), ("ag", np.int8)])
+    rows["d"], rows["h"], rows["a"] = data.days, data.home, data.away
+    rows["hg"], rows["ag"] = data.home_goals, data.away_goals
+    _, first = np.unique(rows, return_index=True)
+    if len(first) == len(data):
+        return data
+    return data.select(np.sort(first))
+
+
+def save_npz(path: PathLike, data: MatchArrays) -> None:
+    arrays: Dict[str, np.ndarray] = {
+        "format_version": np.array(FORMAT_VERSION, dtype=np.int16),
+        "teams": np.array(data.teams, dtype=str),
+        "home": data.home.astype(np.int16),
+        "away": data.away.astype(np.int16),
+        "home_goals": data.home_goals.astype(np.int8),
+        "away_goals": data.away_goals.astype(np.int8),
+        "days": data.days.astype(np.int32),
+    }
+    if data.league is not None:
+        arrays["leagues"] = np.array(data.leagues, dtype=str)
+        arrays["league"] = data.league.astype(np.int16)
+    if data.season is not None:
+        arrays["seasons"] = np.array(data.seasons, dtype=str)
+        arrays["season"] = data.season.astype(np.int16)
+
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    np.savez_compressed(path, **arrays)
+
+
+def load_npz(path: PathLike) -> MatchArrays:
+    with np.load(path, allow_pickle=False) as z:
+        version = int(z["format_version"]) if "format_version" in z.files else 0
+        if version > FORMAT_VERSION:
+            raise ValueError(f"{path}: formato v{version} mais novo que o suportado (v{FORMAT_VERSION}).")
+        return MatchArrays(
+            teams=z["teams"].tolist(),
+            home=z["home"],
+            away=z["away"],
+            home_goals=z["home_goals"],
+            away_goals=z["away_goals"],
+            days=z["days"],
+            leagues=z["leagues"].tolist() if "leagues" in z.files else None,
+            league=z["league"] if "league" in z.files else None,
+            seasons=z["seasons"].tolist() if "seasons" in z.files else None,
+            season=z["season"] if "season" in z.files else None,
+        )
+
+
+# =========================================================
+# Store em diretório (append + memmap)
+# =========================================================
+class StoreWriter:
+    """
+    Escreve <nome>.cols/ lote a lote, sem segurar o dataset em memória: só os
+    dicionários (times/ligas/temporadas) ficam em RAM. No close() os
+    dicionários são ordenados e os códigos renumerados no disco, chunk a chunk,
+    então o resultado tem o mesmo layout ordenado do from_frame.
+
+        with StoreWriter("data/processed/matches_all") as w:
+            for chunk in chunks:
+                w.append(chunk)
+    """
+
+    def __init__(self, path: PathLike, append: bool = False):
+        self.path = Path(path).with_suffix(".cols")
+        self.rows = 0
+        self.start_rows = 0
+        self._dicts: Dict[str, Dict[str, int]] = {"teams": {}, "leagues": {}, "seasons": {}}
+        self._columns: Optional[List[str]] = None
+        self._files: Dict[str, object] = {}
+        self._sidecars: Dict[str, Callable[[Path], None]] = {}
+        self.append_mode = append and (self.path / "meta.json").exists()
+
+        if self.append_mode:
+            # append no próprio diretório; o meta.json (nº de linhas) é o ponto de commit
+            self.tmp = self.path
+            meta = json.loads((self.path / "meta.json").read_text(encoding="utf-8"))
+            self.rows = self.start_rows = int(meta["rows"])
+            for kind in self._dicts:
+                self._dicts[kind] = {n: i for i, n in enumerate(meta.get(kind) or [])}
+            self._columns = list(meta["columns"])
+            for c in self._columns:
+                f = open(self.path / f"{c}.bin", "r+b")
+                f.truncate(self.rows * np.dtype(COLUMN_DTYPES[c]).itemsize)  # sobra de append abortado
+                f.seek(0, os.SEEK_END)
+                self._files[c] = f
+        else:
+            self.tmp = self.path.with_name(self.path.name + ".tmp")
+            shutil.rmtree(self.tmp, ignore_errors=True)
+            self.tmp.mkdir(parents=True)
+
+    def sidecar(self, name: str, write: Callable[[Path], None]) -> None:
+        """
+        Arquivo extra do store (ex.: seen.npz), gravado no close() antes do
+        meta.json: `write(tmp)` grava num temporário que é trocado por
+        os.replace. Num build completo ele vai junto na troca do diretório.
+        """
+        self._sidecars[name] = write
+
+    def _lut(self, kind: str, names: List[str]) -> np.ndarray:
+        d = self._dicts[kind]
+        return np.array([d.setdefault(n, len(d)) for n in names], dtype=np.int64)
+
+    def append(self, data: MatchArrays) -> None:
+        teams = self._lut("teams", data.teams)
+        cols = {
+            "home": teams[data.home.astype(np.intp)] if len(data) else data.home,
+            "away": teams[data.away.astype(np.intp)] if len(data) else data.away,
+            "home_goals": data.home_goals,
+            "away_goals": data.away_goals,
+            "days": data.days,
+        }
+        if data.league is not None:
+            cols["league"] = self._lut("leagues", data.leagues or [])[data.league.astype(np.intp)] if len(data) else data.league
+        if data.season is not None:
+            cols["season"] = self._lut("seasons", data.seasons or [])[data.season.astype(np.intp)] if len(data) else data.season
+        if data.key is not None:
+            cols["key"] = data.key
+
+        if self._columns is None:
+            self._columns = list(cols)
+            self._files = {c: open(self.tmp / f"{c}.bin", "wb") for c in self._columns}
+        elif list(cols) != self._columns:
+            raise ValueError(f"Lote com colunas {list(cols)}, esperado {self._columns}")
+
+        for c, arr in cols.items():
+            self._files[c].write(np.ascontiguousarray(arr, dtype=COLUMN_DTYPES[c]).tobytes())
+        self.rows += len(data)
+
+    def _sort_dict(self, kind: str, columns: List[str]) -> List[str]:
+        d = self._dicts[kind]
+        names = sorted(d)
+        remap = np.empty(len(names), dtype=np.int64)
+        remap[[d[n] for n in names]] = np.arange(len(names))
+        if not np.array_equal(remap, np.arange(len(names))):
+            for c in columns:
+                if c not in (self._columns or []) or self.rows == 0:
+                    continue
+                mm = np.memmap(self.tmp / f"{c}.bin", dtype=COLUMN_DTYPES[c], mode="r+", shape=(self.rows,))
+                for i in range(0, self.rows, CHUNK_ROWS):
+                    mm[i:i + CHUNK_ROWS] = remap[mm[i:i + CHUNK_ROWS]]
+                mm.flush()
+                del mm
+        return names
+
+    def close(self) -> Path:
+        for f in self._files.values():
+            f.close()
+        columns = self._columns or []
+        if self.append_mode:
+            # sem reordenar: os dicionários crescem na ordem de chegada
+            # (compact_teams/concat lidam com isso) e o append fica O(linhas novas)
+            dicts = {kind: list(d) for kind, d in self._dicts.items()}
+        else:
+            dicts = {
+                "teams": self._sort_dict("teams", ["home", "away"]),
+                "leagues": self._sort_dict("leagues", ["league"]),
+                "seasons": self._sort_dict("seasons", ["season"]),
+            }
+        meta = {
+            "format_version": FORMAT_VERSION,
+            "rows": self.rows,
+            "columns": {c: np.dtype(COLUMN_DTYPES[c]).str for c in columns},
+            "teams": dicts["teams"],
+            "leagues": dicts["leagues"] if "league" in columns else None,
+            "seasons": dicts["seasons"] if "season" in columns else None,
+        }
+        for name, write in self._sidecars.items():
+            final = self.tmp / name
+            tmp = final.with_name(f"{final.stem}.tmp{final.suffix}")
+            write(tmp)
+            os.replace(tmp, final)
+        tmp_meta = self.tmp / "meta.json.tmp"
+        tmp_meta.write_text(json.dumps(meta, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp_meta, self.tmp / "meta.json")
+        if self.append_mode:
+            return self.path
+
+        old = self.path.with_name(self.path.name + ".old")
+        shutil.rmtree(old, ignore_errors=True)
+        if self.path.exists():
+            os.replace(self.path, old)
+        os.replace(self.tmp, self.path)
+        shutil.rmtree(old, ignore_errors=True)
+        return self.path
+
+    def abort(self) -> None:
+        for f in self._files.values():
+            f.close()
+        if not self.append_mode:  # no append, o meta.json antigo continua valendo
+            shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def __enter__(self) -> "StoreWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+def open_store(path: PathLike) -> MatchArrays:
+    """Abre <nome>.cols/ com memmap (nada é lido até alguém tocar nas colunas)."""
+    path = Path(path)
+    if path.suffix != ".cols":
+        path = path.with_suffix(".cols")
+    meta = json.loads((path / "meta.json").read_text(encoding="utf-8"))
+    if meta.get("format_version", 0) > FORMAT_VERSION:
+        raise ValueError(f"{path}: formato v{meta['format_version']} mais novo que o suportado (v{FORMAT_VERSION}).")
+    rows = int(meta["rows"])
+
+    def col(name: str) -> Optional[np.ndarray]:
+        if name not in meta["columns"]:
+            return None
+        dtype = np.dtype(meta["columns"][name])
+        if rows == 0:
+            return np.zeros(0, dtype=dtype)
+        return np.memmap(path / f"{name}.bin", dtype=dtype, mode="r", shape=(rows,))
+
+    return MatchArrays(
+        teams=meta["teams"],
+        home=col("home"),
+        away=col("away"),
+        home_goals=col("home_goals"),
+        away_goals=col("away_goals"),
+        days=col("days"),
+        leagues=meta.get("leagues"),
+        league=col("league"),
+        seasons=meta.get("seasons"),
+        season=col("season"),
+        key=col("key"),
+    )
+
+
+def _clean_csv_chunk(df: pd.DataFrame) -> pd.DataFrame:
+    df["home_goals"] = pd.to_numeric(df["home_goals"], errors="coerce")
+    df["away_goals"] = pd.to_numeric(df["away_goals"], errors="coerce")
+    return df.dropna(subset=["date", "home_team", "away_team", "home_goals", "away_goals"])
+
+
+def iter_chunks(path: PathLike, rows: int = CHUNK_ROWS) -> Iterator[MatchArrays]:
+    """
+    Percorre o dataset em lotes de até `rows` linhas, na mesma ordem de
+    preferência do load_matches. No .cols e no .csv só um lote fica em
+    memória por vez; o .npz (comprimido) é carregado e fatiado.
+    """
+    path = Path(path)
+    npz, cols, csv = path.with_suffix(".npz"), path.with_suffix(".cols"), path.with_suffix(".csv")
+    if npz.exists() or cols.exists():
+        data = load_npz(npz) if npz.exists() else open_store(cols)
+        for i in range(0, len(data), rows):
+            yield data.select(slice(i, i + rows))
+        return
+    if csv.exists():
+        for df in pd.read_csv(csv, chunksize=rows):
+            df = _clean_csv_chunk(df)
+            if len(df):
+                yield from_frame(df)
+        return
+    raise FileNotFoundError(f"Não achei {npz}, {cols} nem {csv}")
+
+
+def load_matches(path: PathLike) -> MatchArrays:
+    """
+    Carrega o dataset pelo caminho sem extensão ou .npz/.cols/.csv: prefere o
+    .npz ao lado, depois o store em diretório (memmap); cai no CSV (mais
+    lento) se ainda não houver build colunar.
+    """
+    path = Path(path)
+    npz = path.with_suffix(".npz")
+    if npz.exists():
+        return load_npz(npz)
+    cols = path.with_suffix(".cols")
+    if cols.exists():
+        return open_store(cols)
+    csv = path.with_suffix(".csv")
+    if csv.exists():
+        return from_frame(_clean_csv_chunk(pd.read_csv(csv)))
+    raise FileNotFoundError(f"Não achei {npz}, {cols} nem {csv}")
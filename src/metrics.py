@@ -0,0 +1,224 @@
+from __future__ import annotations
+
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from src.timing import route_label
+
+# Formato de exposição texto do Prometheus (0.0.4), sem depender de client lib.
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(v: str) -> str:
+    return v.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(str(v))}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _num(v: float) -> str:
+    if v == float("inf"):
+        return "+Inf"
+    return repr(float(v)) if not float(v).is_integer() else str(int(v))
+
+
+class _Metric(ABC):
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, Any]) -> LabelValues:
+        return tuple(str(labels.get(n, "")) for n in self.labelnames)
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+    @abstractmethod
+    def render(self) -> List[str]:
+        """Linhas do formato texto (HELP/TYPE + amostras)."""
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, help, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: Any) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return self.header() + [f"{self.name}{_labels(self.labelnames, k)} {_num(v)}" for k, v in items]
+
+
+class Gauge(_Metric):
+    """Valor pontual; opcionalmente calculado na hora do scrape via `set_function`."""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, help, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+        self._fn: Optional[Callable[[], Dict[LabelValues, float]]] = None
+
+    def set(self, value: float, **labels: Any) -> None:
+        with self._lock:
+            self._values[self._key(labels)] = float(value)
+
+    def set_function(self, fn: Callable[[], Dict[LabelValues, float]]) -> None:
+        self._fn = fn
+
+    def render(self) -> List[str]:
+        if self._fn is not None:
+            items = sorted(self._fn().items())
+        else:
+            with self._lock:
+                items = sorted(self._values.items())
+        return self.header() + [f"{self.name}{_labels(self.labelnames, k)} {_num(v)}" for k, v in items]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._values: Dict[LabelValues, List[float]] = {}  # [contagem por bucket..., soma, total]
+
+    def observe(self, value: float, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            st = self._values.get(key)
+            if st is None:
+                st = [0.0] * (len(self.buckets) + 2)
+                self._values[key] = st
+            for i, b in enumerate(self.buckets):
+                if value <= b:
+                    st[i] += 1
+                    break
+            st[-2] += value
+            st[-1] += 1
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted((k, list(v)) for k, v in self._values.items())
+        lines = self.header()
+        for key, st in items:
+            acc = 0.0
+            for b, c in zip(self.buckets, st):
+                acc += c
+                le = _labels(self.labelnames, key, 'le="%s"' % _num(b))
+                lines.append(f"{self.name}_bucket{le} {_num(acc)}")
+            le = _labels(self.labelnames, key, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{le} {_num(st[-1])}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {_num(st[-2])}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {_num(st[-1])}")
+        return lines
+
+
+class Registry:
+    def __init__(self) -> None:
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            # idempotente: reimportar o módulo não duplica a métrica
+            return self._metrics.setdefault(metric.name, metric)
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines: List[str] = []
+        for m in metrics:
+            lines.extend(m.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+def counter(name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+    return REGISTRY.register(Counter(name, help, labelnames))  # type: ignore[return-value]
+
+
+def gauge(name: str, help: str, labelnames: Sequence[str] = ()) -> Gauge:
+    return REGISTRY.register(Gauge(name, help, labelnames))  # type: ignore[return-value]
+
+
+def histogram(name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+    return REGISTRY.register(Histogram(name, help, labelnames, buckets))  # type: ignore[return-value]
+
+
+# =========================================================
+# Métricas compartilhadas
+# =========================================================
+HTTP_REQUESTS = counter("sf_http_requests_total", "Requests HTTP por rota, método e status.", ("route", "method", "status"))
+HTTP_LATENCY = histogram("sf_http_request_duration_seconds", "Latência dos requests HTTP por rota.", ("route",))
+
+CACHE_REQUESTS = counter("sf_cache_requests_total", "Leituras do cache em memória por namespace.", ("namespace", "result"))
+CACHE_EVICTIONS = counter("sf_cache_evictions_total", "Entradas removidas do cache (TTL) por namespace.", ("namespace",))
+CACHE_ENTRIES = gauge("sf_cache_entries", "Entradas no cache por namespace.", ("namespace",))
+CACHE_BYTES = gauge("sf_cache_bytes", "Bytes de JSON serializado guardados no cache por namespace.", ("namespace",))
+
+UPSTREAM_REQUESTS = counter("sf_upstream_requests_total", "Chamadas à football-data.org por competição e status.", ("competition", "status"))
+UPSTREAM_LATENCY = histogram("sf_upstream_request_duration_seconds", "Latência das chamadas à football-data.org.", ("competition",))
+UPSTREAM_429 = counter("sf_upstream_rate_limited_total", "Respostas 429 da football-data.org por competição.", ("competition",))
+UPSTREAM_AVAILABLE = gauge("sf_upstream_requests_available_minute", "Último X-Requests-Available-Minute recebido.")
+UPSTREAM_SHORT_CIRCUITS = counter("sf_upstream_short_circuits_total", "Chamadas não feitas (circuito aberto ou sem prazo).", ("competition", "reason"))
+UPSTREAM_BREAKER_OPEN = gauge("sf_upstream_breaker_open", "1 se o circuito da competição está aberto/meio-aberto.", ("competition",))
+
+MODEL_LOAD_SECONDS = gauge("sf_model_load_seconds", "Tempo de carga de cada modelo (s).", ("model",))
+
+
+def cache_namespace(key: str) -> str:
+    return key.split(":", 1)[0] if ":" in key else key
+
+
+class MetricsMiddleware:
+    """Conta requests e mede latência por rota (template, não o path cru)."""
+
+    def __init__(self, app: Any):
+        self.app = app
+
+    async def __call__(self, scope: Dict[str, Any], receive: Callable, send: Callable) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = {"code": 500}
+        t0 = time.perf_counter()
+
+        async def send_with_status(message: Dict[str, Any]) -> None:
+            if message["type"] == "http.response.start":
+                status["code"] = message.get("status", 200)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = route_label(scope)
+            HTTP_REQUESTS.inc(route=route, method=scope.get("method", ""), status=status["code"])
+            HTTP_LATENCY.observe(time.perf_counter() - t0, route=route)
@@ -1,13 +1,16 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import Dict, Tuple, List
+from typing import TYPE_CHECKING, Dict, Iterable, Optional, Tuple, List
 import math
 
 import numpy as np
 import pandas as pd
 from joblib import dump, load
 
+if TYPE_CHECKING:
+    from src.match_store import MatchArrays
+
 # Clipping para evitar overflow no exp()
 CLIP_MIN = -20.0
 CLIP_MAX = 20.0
@@ -38,6 +41,30 @@ def probs_1x2_from_matrix(mat: np.ndarray) -> Tuple[float, float, float]:
     return float(home_win), float(draw), float(away_win)
 
 
+def score_matrices(lam_home: np.ndarray, lam_away: np.ndarray, max_goals: int = 10) -> np.ndarray:
+    """Versão em lote do score_matrix: shape (n, max_goals + 1, max_goals + 1), cada matriz normalizada."""
+    lam_home = np.asarray(lam_home, dtype=float)
+    lam_away = np.asarray(lam_away, dtype=float)
+    k = np.arange(max_goals + 1, dtype=float)
+    fact = np.array([math.factorial(i) for i in range(max_goals + 1)], dtype=float)
+
+    p_home = np.exp(-lam_home)[:, None] * lam_home[:, None] ** k / fact
+    p_away = np.exp(-lam_away)[:, None] * lam_away[:, None] ** k / fact
+    mats = p_home[:, :, None] * p_away[:, None, :]
+
+    s = mats.sum(axis=(1, 2), keepdims=True)
+    np.divide(mats, s, out=mats, where=s > 0)
+    return mats
+
+
+def probs_1x2_from_matrices(mats: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    i, j = np.indices(mats.shape[1:])
+    home_win = (mats * (i > j)).sum(axis=(1, 2))
+    draw = np.trace(mats, axis1=1, axis2=2)
+    away_win = (mats * (i < j)).sum(axis=(1, 2))
+    return home_win, draw, away_win
+
+
 @dataclass
 class PoissonTeamModel:
     teams: List[str]
@@ -60,6 +87,18 @@ class PoissonTeamModel:
         lam_away = float(max(math.exp(log_lam_away), 0.01))
         return lam_home, lam_away
 
+    def expected_goals_many(self, home_teams: List[str], away_teams: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """expected_goals para vários jogos de uma vez (KeyError se algum time não existir)."""
+        hi = np.array([self.team_index[t] for t in home_teams], dtype=int)
+        ai = np.array([self.team_index[t] for t in away_teams], dtype=int)
+
+        log_lam_home = np.clip(self.home_adv + self.attack[hi] - self.defense[ai], CLIP_MIN, CLIP_MAX)
+        log_lam_away = np.clip(self.attack[ai] - self.defense[hi], CLIP_MIN, CLIP_MAX)
+
+        lam_home = np.maximum(np.exp(log_lam_home), 0.01)
+        lam_away = np.maximum(np.exp(log_lam_away), 0.01)
+        return lam_home, lam_away
+
     def predict_1x2(self, home_team: str, away_team: str, max_goals: int = 10) -> Dict:
         lam_home, lam_away = self.expected_goals(home_team, away_team)
         mat = score_matrix(lam_home, lam_away, max_goals=max_goals)
@@ -102,18 +141,59 @@ def train_team_poisson(
 
     teams = sorted(set(df["home_team"]).union(set(df["away_team"])))
     team_index = {t: i for i, t in enumerate(teams)}
-    n = len(teams)
 
     home_idx = df["home_team"].map(team_index).to_numpy(dtype=int)
     away_idx = df["away_team"].map(team_index).to_numpy(dtype=int)
     home_goals = df["home_goals"].to_numpy(dtype=float)
     away_goals = df["away_goals"].to_numpy(dtype=float)
 
+    return fit_team_poisson(
+        teams, home_idx, away_idx, home_goals, away_goals,
+        iters=iters, lr=lr, reg=reg, verbose_every=verbose_every,
+    )
+
+
+def train_team_poisson_arrays(
+    data: "MatchArrays",
+    iters: int = 800,
+    lr: float = 0.03,
+    reg: float = 0.02,
+    verbose_every: int = 200,
+) -> PoissonTeamModel:
+    """Mesmo treino, direto do dataset colunar (src.match_store) — sem strings por linha."""
+    teams, home_idx, away_idx = data.compact_teams()
+    return fit_team_poisson(
+        teams, home_idx, away_idx,
+        data.home_goals.astype(float), data.away_goals.astype(float),
+        iters=iters, lr=lr, reg=reg, verbose_every=verbose_every,
+    )
+
+
+def fit_team_poisson(
+    teams: List[str],
+    home_idx: np.ndarray,
+    away_idx: np.ndarray,
+    home_goals: np.ndarray,
+    away_goals: np.ndarray,
+    iters: int = 800,
+    lr: float = 0.03,
+    reg: float = 0.02,
+    verbose_every: int = 200,
+    counts: Optional[np.ndarray] = None,
+) -> PoissonTeamModel:
+    """
+    Gradiente do Poisson ataque/defesa sobre índices já codificados (teams[i] <-> i).
+    Com `counts`, cada linha é um confronto agregado: counts[k] jogos e
+    home_goals/away_goals são as somas de gols (ver PoissonSuffStats).
+    """
+    team_index = {t: i for i, t in enumerate(teams)}
+    n = len(teams)
+
     attack = np.zeros(n, dtype=float)
     defense = np.zeros(n, dtype=float)
     home_adv = 0.0
 
-    m = float(len(df))
+    m = float(len(home_idx)) if counts is None else float(counts.sum())
 
     for step in range(1, iters + 1):
         log_lam_home = home_adv + attack[home_idx] - defense[away_idx]
@@ -125,8 +205,12 @@ def train_team_poisson(
         lam_home = np.exp(log_lam_home)
         lam_away = np.exp(log_lam_away)
 
-        err_home = lam_home - home_goals
-        err_away = lam_away - away_goals
+        if counts is None:
+            err_home = lam_home - home_goals
+            err_away = lam_away - away_goals
+        else:
+            err_home = counts * lam_home - home_goals
+            err_away = counts * lam_away - away_goals
 
         grad_attack = np.zeros(n, dtype=float)
         grad_defense = np.zeros(n, dtype=float)
@@ -164,6 +248,88 @@ def train_team_poisson(
     )
 
 
+class PoissonSuffStats:
+    """
+    Estatísticas suficientes do treino, acumuladas lote a lote: o gradiente
+    só depende de (jogos, soma de gols do mandante, soma de gols do visitante)
+    por confronto mandante x visitante. Memória = O(confrontos), não O(jogos).
+    """
+
+    def __init__(self) -> None:
+        self.team_ids: Dict[str, int] = {}
+        self.pairs: Dict[int, List[float]] = {}  # (home << 16 | away) -> [n, gols casa, gols fora]
+        self.matches = 0
+
+    def _ids(self, names: np.ndarray) -> np.ndarray:
+        uniq, inv = np.unique(names.astype(str), return_inverse=True)
+        lut = np.array([self.team_ids.setdefault(t, len(self.team_ids)) for t in uniq], dtype=np.int64)
+        return lut[inv]
+
+    def _add(self, home: np.ndarray, away: np.ndarray, home_goals: np.ndarray, away_goals: np.ndarray) -> None:
+        keys = (home << 16) | away
+        uniq, inv = np.unique(keys, return_inverse=True)
+        n = np.bincount(inv, minlength=len(uniq))
+        shg = np.bincount(inv, weights=home_goals, minlength=len(uniq))
+        sag = np.bincount(inv, weights=away_goals, minlength=len(uniq))
+        for k, c, h, a in zip(uniq.tolist(), n.tolist(), shg.tolist(), sag.tolist()):
+            acc = self.pairs.get(k)
+            if acc is None:
+                self.pairs[k] = [c, h, a]
+            else:
+                acc[0] += c
+                acc[1] += h
+                acc[2] += a
+        self.matches += len(keys)
+
+    def add_frame(self, df: pd.DataFrame) -> None:
+        """Lote com home_team/away_team/home_goals/away_goals (ex.: MatchBatch.frame)."""
+        self._add(
+            self._ids(df["home_team"].to_numpy()),
+            self._ids(df["away_team"].to_numpy()),
+            df["home_goals"].to_numpy(dtype=float),
+            df["away_goals"].to_numpy(dtype=float),
+        )
+
+    def add_arrays(self, data: "MatchArrays") -> None:
+        """Lote do dataset colunar (códigos + dicionário de times)."""
+        lut = self._ids(np.array(data.teams, dtype=str)) if data.teams else np.zeros(0, dtype=np.int64)
+        self._add(
+            lut[data.home.astype(np.intp)],
+            lut[data.away.astype(np.intp)],
+            data.home_goals.astype(float),
+            data.away_goals.astype(float),
+        )
+
+    def fit(self, iters: int = 800, lr: float = 0.03, reg: float = 0.02, verbose_every: int = 200) -> PoissonTeamModel:
+        if not self.pairs:
+            raise ValueError("PoissonSuffStats vazio: nenhum jogo acumulado.")
+        # ids em ordem alfabética, como no train_team_poisson
+        teams = sorted(self.team_ids)
+        remap = np.empty(len(teams), dtype=np.int64)
+        remap[[self.team_ids[t] for t in teams]] = np.arange(len(teams))
+
+        keys = np.fromiter(self.pairs.keys(), dtype=np.int64, count=len(self.pairs))
+        acc = np.array(list(self.pairs.values()), dtype=float)
+        return fit_team_poisson(
+            teams, remap[keys >> 16], remap[keys & 0xFFFF], acc[:, 1], acc[:, 2],
+            iters=iters, lr=lr, reg=reg, verbose_every=verbose_every, counts=acc[:, 0],
+        )
+
+
+def train_team_poisson_stream(
+    chunks: Iterable["MatchArrays"],
+    iters: int = 800,
+    lr: float = 0.03,
+    reg: float = 0.02,
+    verbose_every: int = 200,
+) -> PoissonTeamModel:
+    """Treino sem materializar o histórico: acumula PoissonSuffStats chunk a chunk."""
+    stats = PoissonSuffStats()
+    for chunk in chunks:
+        stats.add_arrays(chunk)
+    return stats.fit(iters=iters, lr=lr, reg=reg, verbose_every=verbose_every)
+
+
 def save_model(model: PoissonTeamModel, path: str) -> None:
     dump(model, path)
 
@@ -0,0 +1,88 @@
+from __future__ import annotations
+
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+Pair = Tuple[str, str]
+
+
+@dataclass
+class PredTable:
+    version: str
+    rows: Dict[int, Dict[str, Any]] = field(default_factory=dict)
+
+
+class PredictionStore:
+    """
+    Tabela materializada de previsões por competição, indexada por match_id.
+
+    Cada competição tem um carimbo de versão (hash do teamstats, mtime do
+    modelo, ...). Se a versão muda, a tabela daquela competição é descartada
+    e as previsões são recalculadas em lote na próxima leitura.
+    """
+
+    def __init__(self) -> None:
+        self._tables: Dict[str, PredTable] = {}
+        self._lock = threading.Lock()
+
+    def _table(self, code: str, version: str) -> PredTable:
+        table = self._tables.get(code)
+        if table is None or table.version != version:
+            table = PredTable(version=version)
+            self._tables[code] = table
+        return table
+
+    def get_many(
+        self,
+        code: str,
+        version: str,
+        fixtures: Dict[int, Pair],
+        compute: Callable[[List[Pair]], List[Dict[str, Any]]],
+    ) -> Dict[int, Dict[str, Any]]:
+        """
+        Retorna {match_id: previsão} para os fixtures pedidos, chamando
+        `compute` uma única vez com todos os que ainda não estão na tabela.
+        """
+        with self._lock:
+            rows = self._table(code, version).rows
+            found = {
+                mid: rows[mid]["pred"] for mid, pair in fixtures.items()
+                if mid in rows and rows[mid]["teams"] == pair
+            }
+        missing = [mid for mid in fixtures if mid not in found]
+
+        if missing:
+            preds = compute([fixtures[mid] for mid in missing])
+            found.update(zip(missing, preds))
+            with self._lock:
+                # outro request pode ter trocado a versão durante o compute:
+                # aí só não grava (a resposta sai do que foi calculado aqui)
+                table = self._tables.get(code)
+                if table is not None and table.version == version:
+                    for mid, pred in zip(missing, preds):
+                        table.rows[mid] = {"teams": fixtures[mid], "pred": pred}
+
+        return {mid: found[mid] for mid in fixtures}
+
+    def seed(self, code: str, version: str, rows: Dict[int, Tuple[Pair, Dict[str, Any]]]) -> None:
+        """Carrega previsões já calculadas (ex.: export anterior) se a versão bater."""
+        with self._lock:
+            table = self._table(code, version)
+            for mid, (pair, pred) in rows.items():
+                table.rows[int(mid)] = {"teams": tuple(pair), "pred": pred}
+
+    def invalidate(self, code: Optional[str] = None) -> None:
+        with self._lock:
+            if code is None:
+                self._tables.clear()
+            else:
+                self._tables.pop(code, None)
+
+    def version(self, code: str) -> Optional[str]:
+        table = self._tables.get(code)
+        return table.version if table else None
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return {code: {"version": t.version, "rows": len(t.rows)} for code, t in self._tables.items()}
@@ -4,10 +4,11 @@ from __future__ import annotations
 import json
 import os
 from datetime import datetime, timezone
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Set, Tuple
 
 from src.live_fetch import fetch_upcoming_matches
-from src.model import load_model
+from src.model import PoissonTeamModel, load_model, probs_1x2_from_matrices, score_matrices
+from src.pred_store import PredictionStore
 
 
 # Use exatamente os códigos que apareceram no seu print do site
@@ -27,6 +28,57 @@ def _safe_team_name(obj: Dict[str, Any]) -> str:
     return str(name) if name else "UNKNOWN_TEAM"
 
 
+def _model_version(model_path: str) -> str:
+    st = os.stat(model_path)
+    return f"{st.st_mtime_ns}-{st.st_size}"
+
+
+def _out_path(code: str) -> str:
+    return f"data/preds_live/{code}.json"
+
+
+def _seed_from_previous(store: PredictionStore, code: str, version: str) -> Set[int]:
+    """Reaproveita as previsões do export anterior se o modelo não mudou."""
+    path = _out_path(code)
+    if not os.path.exists(path):
+        return set()
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            prev = json.load(f)
+    except Exception:
+        return set()
+    if prev.get("model_version") != version:
+        return set()
+
+    rows = {}
+    for p in prev.get("predictions") or []:
+        if p.get("error") or p.get("match_id") is None:
+            continue
+        rows[int(p["match_id"])] = (
+            (p.get("home"), p.get("away")),
+            {"expected_goals": p.get("expected_goals"), "probabilities_1x2": p.get("probabilities_1x2")},
+        )
+    store.seed(code, version, rows)
+    return set(rows)
+
+
+def _predict_many(model: PoissonTeamModel, pairs: List[Tuple[str, str]]) -> List[Dict[str, Any]]:
+    lam_home, lam_away = model.expected_goals_many([h for h, _ in pairs], [a for _, a in pairs])
+    mats = score_matrices(lam_home, lam_away, max_goals=MAX_GOALS_TRUNC)
+    p_home, p_draw, p_away = probs_1x2_from_matrices(mats)
+    return [
+        {
+            "expected_goals": {"home": float(lam_home[i]), "away": float(lam_away[i])},
+            "probabilities_1x2": {
+                "home_win": float(p_home[i]),
+                "draw": float(p_draw[i]),
+                "away_win": float(p_away[i]),
+            },
+        }
+        for i in range(len(pairs))
+    ]
+
+
 def run_competition(code: str) -> Dict[str, Any]:
     # 1) Puxa jogos futuros
     data = fetch_upcoming_matches(code)
@@ -47,8 +99,23 @@ def run_competition(code: str) -> Dict[str, Any]:
         }
 
     model = load_model(model_path)
+    model_version = _model_version(model_path)
+
+    # 3) Predições: tabela materializada por match_id; só calcula (em lote)
+    #    os jogos que ainda não estavam no export anterior desta versão do modelo
+    store = PredictionStore()
+    seeded = _seed_from_previous(store, code, model_version)
+
+    fixtures: Dict[int, Tuple[str, str]] = {}
+    for m in matches:
+        home = _safe_team_name(m.get("homeTeam", {}))
+        away = _safe_team_name(m.get("awayTeam", {}))
+        if m.get("id") is None or home not in model.team_index or away not in model.team_index:
+            continue
+        fixtures[int(m["id"])] = (home, away)
+
+    stored = store.get_many(code, model_version, fixtures, lambda pairs: _predict_many(model, pairs))
 
-    # 3) Predições
     preds: List[Dict[str, Any]] = []
     shown = 0
 
@@ -60,16 +127,16 @@ def run_competition(code: str) -> Dict[str, Any]:
         if home == "UNKNOWN_TEAM" or away == "UNKNOWN_TEAM":
             continue
 
-        try:
-            out = model.predict_1x2(home, away, max_goals=MAX_GOALS_TRUNC)
-        except KeyError as e:
+        out = stored.get(int(m["id"])) if m.get("id") is not None else None
+        if out is None:
             # time não existe no modelo (ex.: recém-promovido e sem histórico no dataset)
+            missing = home if home not in model.team_index else away
             preds.append({
                 "match_id": m.get("id"),
                 "utcDate": m.get("utcDate"),
                 "home": home,
                 "away": away,
-                "error": f"unknown_team: {str(e)}",
+                "error": f"unknown_team: {repr(missing)}",
             })
             continue
 
@@ -94,7 +161,9 @@ def run_competition(code: str) -> Dict[str, Any]:
         "competition": code,
         "generated_at": _now_iso(),
         "model_path": model_path,
+        "model_version": model_version,
         "matches_fetched": len(matches),
+        "predictions_reused": len(seeded & set(fixtures)),
         "predictions": preds,
     }
 
@@ -106,7 +175,7 @@ def main() -> None:
     for code in CODES:
         try:
             payload = run_competition(code)
-            out_path = f"data/preds_live/{code}.json"
+            out_path = _out_path(code)
             with open(out_path, "w", encoding="utf-8") as f:
                 json.dump(payload, f, ensure_ascii=False, indent=2)
             total_ok += 1
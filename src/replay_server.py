@@ -0,0 +1,377 @@
+"""
+Stand-in local da football-data.org (v4) para testes e benchmarks offline.
+
+Serve /competitions/{code}/matches e /competitions/{code}/standings a partir de:
+  1) fixtures gravados (JSON cru da API) em REPLAY_FIXTURES_DIR:
+       <CODE>.matches.json / <CODE>.standings.json
+  2) senão, dos CSVs de data/api_processed/<CODE>.csv (só jogos finalizados):
+     as datas são deslocadas em dias inteiros para que os últimos
+     REPLAY_FUTURE_DAYS dias do CSV caiam no futuro (viram TIMED, sem placar);
+     a classificação é calculada dos jogos já "disputados".
+
+Falhas simuladas (env ou CLI): latência, taxa de erro 500 e cota por minuto
+(X-Requests-Available-Minute / 429 com X-RequestCounter-Reset).
+
+Uso:
+    python -m src.replay_server --port 8001 --latency-ms 80 --error-rate 0.02 --quota 30
+    FOOTBALL_API_BASE_URL=http://127.0.0.1:8001 FOOTBALL_DATA_TOKEN=x uvicorn src.api_server:app
+
+    # gravar fixtures da API real (usa o token do live_fetch)
+    python -m src.replay_server record --codes PL,BL1
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import csv
+import json
+import os
+import random
+import threading
+import time
+import zlib
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from fastapi import FastAPI, HTTPException, Query
+from fastapi.responses import JSONResponse
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+CSV_DIR = Path(os.getenv("REPLAY_CSV_DIR", str(ROOT_DIR / "data" / "api_processed")))
+FIXTURES_DIR = Path(os.getenv("REPLAY_FIXTURES_DIR", str(ROOT_DIR / "data" / "replay_fixtures")))
+
+FUTURE_DAYS = int(os.getenv("REPLAY_FUTURE_DAYS", "14"))
+LIVE_MINUTES = 110
+
+COMPETITION_NAMES = {
+    "PL": "Premier League",
+    "BL1": "Bundesliga",
+    "PD": "Primera Division",
+    "SA": "Serie A",
+    "FL1": "Ligue 1",
+    "DED": "Eredivisie",
+    "PPL": "Primeira Liga",
+    "ELC": "Championship",
+    "CL": "UEFA Champions League",
+    "EC": "European Championship",
+    "BSA": "Campeonato Brasileiro Série A",
+}
+
+
+class ReplayConfig:
+    def __init__(self) -> None:
+        self.latency_ms = float(os.getenv("REPLAY_LATENCY_MS", "0"))
+        self.jitter_ms = float(os.getenv("REPLAY_JITTER_MS", "0"))
+        self.error_rate = float(os.getenv("REPLAY_ERROR_RATE", "0"))
+        self.quota_per_minute = int(os.getenv("REPLAY_QUOTA", "0"))  # 0 = sem limite
+        self.rng = random.Random(int(os.getenv("REPLAY_SEED", "42")))
+
+
+CONFIG = ReplayConfig()
+
+
+class MinuteQuota:
+    """Cota por janela de 60s (como o free tier da API, por token)."""
+
+    def __init__(self) -> None:
+        self.window_start = time.monotonic()
+        self.used = 0
+        self._lock = threading.Lock()
+
+    def take(self, limit: int) -> Tuple[bool, int, int]:
+        """(permitido, restantes, segundos até zerar)."""
+        with self._lock:
+            now = time.monotonic()
+            if now - self.window_start >= 60:
+                self.window_start = now
+                self.used = 0
+            reset = max(1, int(60 - (now - self.window_start)))
+            if limit <= 0:
+                return True, 999, reset
+            if self.used >= limit:
+                return False, 0, reset
+            self.used += 1
+            return True, limit - self.used, reset
+
+
+QUOTA = MinuteQuota()
+
+# =========================================================
+# Dados
+# =========================================================
+def iso_z(dt: datetime) -> str:
+    return dt.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def parse_iso(s: str) -> datetime:
+    return datetime.fromisoformat(s.replace("Z", "+00:00")).astimezone(timezone.utc)
+
+
+def stable_id(*parts: Any) -> int:
+    return zlib.crc32("|".join(str(p) for p in parts).encode("utf-8")) & 0x7FFFFFFF
+
+
+def team_obj(teams: Dict[str, int], name: str) -> Dict[str, Any]:
+    return {"id": teams.get(name), "name": name, "shortName": name, "tla": name[:3].upper(), "crest": None}
+
+
+def matches_from_csv(code: str, now: datetime) -> List[Dict[str, Any]]:
+    path = CSV_DIR / f"{code}.csv"
+    if not path.exists():
+        return []
+
+    with path.open(encoding="utf-8", newline="") as f:
+        rows = [r for r in csv.DictReader(f) if r.get("date")]
+    if not rows:
+        return []
+
+    dates = [parse_iso(r["date"]) for r in rows]
+    # desloca em dias inteiros: os últimos FUTURE_DAYS dias do CSV ficam no futuro
+    shift_days = (now.date() - (max(dates) - timedelta(days=FUTURE_DAYS)).date()).days
+    shift = timedelta(days=shift_days)
+
+    names = sorted({r["home_team"] for r in rows} | {r["away_team"] for r in rows})
+    teams = {n: stable_id(code, n) % 100000 for n in names}
+    comp = {"id": stable_id(code) % 10000, "name": COMPETITION_NAMES.get(code, code), "code": code}
+
+    out: List[Dict[str, Any]] = []
+    for r, d in zip(rows, dates):
+        kickoff = d + shift
+        if kickoff > now:
+            status, hg, ag = "TIMED", None, None
+        elif now - kickoff < timedelta(minutes=LIVE_MINUTES):
+            status, hg, ag = "IN_PLAY", int(r["home_goals"]), int(r["away_goals"])
+        else:
+            status, hg, ag = "FINISHED", int(r["home_goals"]), int(r["away_goals"])
+
+        winner = None
+        if hg is not None and status == "FINISHED":
+            winner = "HOME_TEAM" if hg > ag else "AWAY_TEAM" if ag > hg else "DRAW"
+
+        out.append({
+            "id": stable_id(code, r["date"], r["home_team"], r["away_team"]),
+            "competition": comp,
+            "utcDate": iso_z(kickoff),
+            "status": status,
+            "homeTeam": team_obj(teams, r["home_team"]),
+            "awayTeam": team_obj(teams, r["away_team"]),
+            "score": {
+                "winner": winner,
+                "duration": "REGULAR",
+                "fullTime": {"home": hg, "away": ag},
+            },
+        })
+
+    out.sort(key=lambda m: m["utcDate"])
+    return out
+
+
+def standings_from_matches(code: str, matches: List[Dict[str, Any]]) -> Dict[str, Any]:
+    table: Dict[str, Dict[str, Any]] = {}
+    for m in matches:
+        if m["status"] != "FINISHED":
+            continue
+        hg = m["score"]["fullTime"]["home"]
+        ag = m["score"]["fullTime"]["away"]
+        for side, gf, ga in (("homeTeam", hg, ag), ("awayTeam", ag, hg)):
+            t = m[side]
+            row = table.setdefault(t["name"], {
+                "team": t, "playedGames": 0, "won": 0, "draw": 0, "lost": 0,
+                "points": 0, "goalsFor": 0, "goalsAgainst": 0,
+            })
+            row["playedGames"] += 1
+            row["goalsFor"] += gf
+            row["goalsAgainst"] += ga
+            if gf > ga:
+                row["won"] += 1
+                row["points"] += 3
+            elif gf == ga:
+                row["draw"] += 1
+                row["points"] += 1
+            else:
+                row["lost"] += 1
+
+    rows = list(table.values())
+    for r in rows:
+        r["goalDifference"] = r["goalsFor"] - r["goalsAgainst"]
+    rows.sort(key=lambda r: (-r["points"], -r["goalDifference"], -r["goalsFor"], r["team"]["name"]))
+    for i, r in enumerate(rows, start=1):
+        r["position"] = i
+
+    return {
+        "competition": {"name": COMPETITION_NAMES.get(code, code), "code": code},
+        "standings": [{"stage": "REGULAR_SEASON", "type": "TOTAL", "table": rows}],
+    }
+
+
+def load_fixture(code: str, kind: str) -> Optional[Dict[str, Any]]:
+    path = FIXTURES_DIR / f"{code}.{kind}.json"
+    if not path.exists():
+        return None
+    with path.open(encoding="utf-8") as f:
+        return json.load(f)
+
+
+_DATA: Dict[Tuple[str, str], Tuple[str, List[Dict[str, Any]]]] = {}
+_DATA_LOCK = threading.Lock()
+
+
+def competition_matches(code: str) -> List[Dict[str, Any]]:
+    """Jogos da competição (fixture gravado ou CSV); recalculado uma vez por dia."""
+    code = code.upper()
+    today = datetime.now(timezone.utc).date().isoformat()
+    with _DATA_LOCK:
+        hit = _DATA.get((code, "matches"))
+        if hit and hit[0] == today:
+            return hit[1]
+
+    fx = load_fixture(code, "matches")
+    matches = (fx or {}).get("matches") if fx else matches_from_csv(code, datetime.now(timezone.utc))
+    if not matches:
+        raise HTTPException(status_code=404, detail=f"Competition {code} not found in replay data")
+
+    with _DATA_LOCK:
+        _DATA[(code, "matches")] = (today, matches)
+    return matches
+
+
+def competition_standings(code: str) -> Dict[str, Any]:
+    code = code.upper()
+    fx = load_fixture(code, "standings")
+    if fx is not None:
+        return fx
+    return standings_from_matches(code, competition_matches(code))
+
+
+def filter_matches(
+    matches: List[Dict[str, Any]],
+    date_from: Optional[str],
+    date_to: Optional[str],
+    status: Optional[str],
+) -> List[Dict[str, Any]]:
+    statuses = {s.strip().upper() for s in status.split(",")} if status else None
+    out = []
+    for m in matches:
+        day = (m.get("utcDate") or "")[:10]
+        if date_from and day < date_from:
+            continue
+        if date_to and day > date_to:
+            continue
+        if statuses and m.get("status") not in statuses:
+            continue
+        out.append(m)
+    return out
+
+
+# =========================================================
+# App
+# =========================================================
+app = FastAPI(title="football-data replay", version="1.0")
+
+
+async def simulate(config: ReplayConfig = CONFIG) -> Dict[str, str]:
+    """Aplica latência/erro/cota; devolve os headers de cota da resposta."""
+    delay = config.latency_ms + (config.rng.uniform(0, config.jitter_ms) if config.jitter_ms else 0)
+    if delay > 0:
+        await asyncio.sleep(delay / 1000.0)
+
+    ok, remaining, reset = QUOTA.take(config.quota_per_minute)
+    headers = {"X-Requests-Available-Minute": str(remaining), "X-RequestCounter-Reset": str(reset)}
+    if not ok:
+        raise HTTPException(
+            status_code=429,
+            detail=f"You reached your request limit. Wait {reset} seconds.",
+            headers=headers,
+        )
+    if config.error_rate and config.rng.random() < config.error_rate:
+        raise HTTPException(status_code=500, detail="Simulated upstream error", headers=headers)
+    return headers
+
+
+@app.get("/competitions/{code}/matches")
+async def matches(
+    code: str,
+    date_from: Optional[str] = Query(None, alias="dateFrom"),
+    date_to: Optional[str] = Query(None, alias="dateTo"),
+    status: Optional[str] = Query(None),
+):
+    headers = await simulate()
+    ms = filter_matches(competition_matches(code), date_from, date_to, status)
+    body = {
+        "filters": {k: v for k, v in {"dateFrom": date_from, "dateTo": date_to, "status": status}.items() if v},
+        "resultSet": {"count": len(ms)},
+        "matches": ms,
+    }
+    return JSONResponse(body, headers=headers)
+
+
+@app.get("/competitions/{code}/standings")
+async def standings(code: str):
+    headers = await simulate()
+    return JSONResponse(competition_standings(code), headers=headers)
+
+
+@app.get("/replay/status")
+def replay_status():
+    return {
+        "csv_dir": str(CSV_DIR),
+        "fixtures_dir": str(FIXTURES_DIR),
+        "latency_ms": CONFIG.latency_ms,
+        "jitter_ms": CONFIG.jitter_ms,
+        "error_rate": CONFIG.error_rate,
+        "quota_per_minute": CONFIG.quota_per_minute,
+        "loaded": sorted({code for code, _ in _DATA}),
+    }
+
+
+# =========================================================
+# CLI
+# =========================================================
+def record(codes: List[str]) -> None:
+    from src.live_fetch import BASE_URL, _get
+
+    FIXTURES_DIR.mkdir(parents=True, exist_ok=True)
+    for code in codes:
+        for kind, url in (
+            ("matches", f"{BASE_URL}/competitions/{code}/matches"),
+            ("standings", f"{BASE_URL}/competitions/{code}/standings"),
+        ):
+            data = _get(url)
+            out = FIXTURES_DIR / f"{code}.{kind}.json"
+            with out.open("w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False)
+            print("OK:", out)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Stand-in local da football-data.org")
+    ap.add_argument("command", nargs="?", default="serve", choices=["serve", "record"])
+    ap.add_argument("--codes", default="PL,BL1,PD,SA,FL1,DED,PPL,ELC,CL,BSA", help="(record) competições")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8001)
+    ap.add_argument("--latency-ms", type=float, default=CONFIG.latency_ms)
+    ap.add_argument("--jitter-ms", type=float, default=CONFIG.jitter_ms)
+    ap.add_argument("--error-rate", type=float, default=CONFIG.error_rate)
+    ap.add_argument("--quota", type=int, default=CONFIG.quota_per_minute, help="requests/minuto (0 = sem limite)")
+    ap.add_argument("--seed", type=int, default=None)
+    args = ap.parse_args()
+
+    if args.command == "record":
+        record([c.strip().upper() for c in args.codes.split(",") if c.strip()])
+        return
+
+    CONFIG.latency_ms = args.latency_ms
+    CONFIG.jitter_ms = args.jitter_ms
+    CONFIG.error_rate = args.error_rate
+    CONFIG.quota_per_minute = args.quota
+    if args.seed is not None:
+        CONFIG.rng = random.Random(args.seed)
+
+    import uvicorn
+
+    uvicorn.run(app, host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+from __future__ import annotations
+
+import gzip
+import hashlib
+import mimetypes
+import threading
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Optional
+
+from fastapi import Request
+from fastapi.responses import Response
+
+try:
+    import brotli  # opcional: variante .br além do gzip
+except Exception:
+    brotli = None  # type: ignore
+
+mimetypes.add_type("application/manifest+json", ".webmanifest")
+mimetypes.add_type("application/javascript", ".js")
+
+# só comprime tipos que ganham com isso (png/ico já vêm comprimidos)
+COMPRESSIBLE_PREFIXES = ("text/", "application/javascript", "application/json", "application/manifest+json", "image/svg+xml")
+MIN_COMPRESS_BYTES = 256
+
+IMMUTABLE_CACHE = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE = "no-cache"
+
+
+@dataclass
+class Asset:
+    media_type: str
+    etag: str
+    variants: Dict[str, bytes] = field(default_factory=dict)  # encoding -> corpo ("identity", "gzip", "br")
+
+
+class StaticAssets:
+    """
+    Carrega o web root na memória (uma vez) com variantes gzip/brotli
+    pré-calculadas e serve com Content-Encoding, ETag e Cache-Control.
+    URLs versionadas (?v=... ) de arquivos que não são HTML/SW ganham
+    cache `immutable`; o resto revalida pelo ETag.
+    """
+
+    def __init__(self, root: Path):
+        self.root = root
+        self.assets: Dict[str, Asset] = {}
+        self.loaded = False
+        self._lock = threading.Lock()
+
+    def load(self) -> None:
+        assets: Dict[str, Asset] = {}
+        if self.root.exists():
+            for p in sorted(self.root.rglob("*")):
+                if not p.is_file() or any(part.startswith(".") for part in p.relative_to(self.root).parts):
+                    continue
+                rel = p.relative_to(self.root).as_posix()
+                assets[rel] = self._build(p)
+        with self._lock:
+            self.assets = assets
+            self.loaded = True
+
+    def _build(self, path: Path) -> Asset:
+        raw = path.read_bytes()
+        media_type = mimetypes.guess_type(path.name)[0] or "application/octet-stream"
+        asset = Asset(media_type=media_type, etag=hashlib.sha1(raw).hexdigest()[:20], variants={"identity": raw})
+
+        if len(raw) >= MIN_COMPRESS_BYTES and media_type.startswith(COMPRESSIBLE_PREFIXES):
+            gz = gzip.compress(raw, compresslevel=9, mtime=0)
+            if len(gz) < len(raw):
+                asset.variants["gzip"] = gz
+            if brotli is not None:
+                br = brotli.compress(raw, quality=11)
+                if len(br) < len(raw):
+                    asset.variants["br"] = br
+        return asset
+
+    def get(self, rel: str) -> Optional[Asset]:
+        if not self.loaded:
+            self.load()
+        return self.assets.get(rel)
+
+    @staticmethod
+    def pick_encoding(asset: Asset, accept_encoding: str) -> str:
+        accepted = {tok.split(";")[0].strip().lower() for tok in accept_encoding.split(",")}
+        for enc in ("br", "gzip"):
+            if enc in accepted and enc in asset.variants:
+                return enc
+        return "identity"
+
+    @staticmethod
+    def cache_control(rel: str, asset: Asset, request: Request) -> str:
+        if asset.media_type == "text/html" or rel == "sw.js":
+            return REVALIDATE_CACHE
+        if "v" in request.query_params:
+            return IMMUTABLE_CACHE
+        return REVALIDATE_CACHE
+
+    def serve(self, request: Request, rel: str) -> Optional[Response]:
+        asset = self.get(rel)
+        if asset is None:
+            return None
+
+        enc = self.pick_encoding(asset, request.headers.get("accept-encoding", ""))
+        etag = f'"{asset.etag}-{enc}"' if enc != "identity" else f'"{asset.etag}"'
+        headers = {
+            "ETag": etag,
+            "Cache-Control": self.cache_control(rel, asset, request),
+            "Vary": "Accept-Encoding",
+        }
+        if enc != "identity":
+            headers["Content-Encoding"] = enc
+
+        inm = request.headers.get("if-none-match")
+        if inm and etag in [t.strip().removeprefix("W/") for t in inm.split(",")]:
+            headers.pop("Content-Encoding", None)
+            return Response(status_code=304, headers=headers)
+
+        return Response(content=asset.variants[enc], media_type=asset.media_type, headers=headers)
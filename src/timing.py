@@ -0,0 +1,186 @@
+from __future__ import annotations
+
+import functools
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional, Tuple
+
+# Janela das estatísticas por (endpoint, etapa): últimas N amostras
+ROLLING_WINDOW = 2048
+BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+# Chamadas fora de um request HTTP (LiveHub, scripts) caem aqui
+BACKGROUND = "background"
+
+
+class RequestTimings:
+    """Tempo acumulado por etapa dentro de um request (pode vir de várias threads)."""
+
+    def __init__(self, endpoint: str):
+        self.endpoint = endpoint
+        self.stages: Dict[str, List[float]] = {}  # etapa -> [ms total, chamadas]
+        self._lock = threading.Lock()
+
+    def add(self, name: str, ms: float) -> None:
+        with self._lock:
+            t = self.stages.setdefault(name, [0.0, 0])
+            t[0] += ms
+            t[1] += 1
+
+    def server_timing(self, total_ms: float) -> str:
+        with self._lock:
+            items = list(self.stages.items())
+        parts = []
+        for name, (ms, n) in items:
+            desc = f';desc="{n}x"' if n > 1 else ""
+            parts.append(f"{name};dur={ms:.1f}{desc}")
+        parts.append(f"total;dur={total_ms:.1f}")
+        return ", ".join(parts)
+
+
+_CURRENT: ContextVar[Optional[RequestTimings]] = ContextVar("square_foot_timings", default=None)
+
+
+class LatencyStats:
+    """
+    Histogramas "rolantes" por (endpoint, etapa): guarda as últimas
+    ROLLING_WINDOW amostras (ms) e resume em percentis + buckets.
+    """
+
+    def __init__(self, window: int = ROLLING_WINDOW):
+        self.window = window
+        self._samples: Dict[Tuple[str, str], Deque[float]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, endpoint: str, stage: str, ms: float) -> None:
+        key = (endpoint, stage)
+        with self._lock:
+            dq = self._samples.get(key)
+            if dq is None:
+                dq = deque(maxlen=self.window)
+                self._samples[key] = dq
+            dq.append(ms)
+
+    @staticmethod
+    def _summary(samples: List[float]) -> Dict[str, Any]:
+        samples = sorted(samples)
+        n = len(samples)
+
+        def q(p: float) -> float:
+            return round(samples[min(n - 1, int(p * n))], 2)
+
+        buckets: Dict[str, int] = {}
+        i = 0
+        for b in BUCKETS_MS:
+            while i < n and samples[i] <= b:
+                i += 1
+            buckets[f"le_{b}"] = i
+        buckets["le_inf"] = n
+
+        return {
+            "count": n,
+            "mean": round(sum(samples) / n, 2),
+            "p50": q(0.50),
+            "p90": q(0.90),
+            "p99": q(0.99),
+            "max": round(samples[-1], 2),
+            "buckets": buckets,
+        }
+
+    def snapshot(self) -> Dict[str, Dict[str, Dict[str, Any]]]:
+        with self._lock:
+            data = {k: list(v) for k, v in self._samples.items() if v}
+        out: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        for (endpoint, stage), samples in sorted(data.items()):
+            out.setdefault(endpoint, {})[stage] = self._summary(samples)
+        return out
+
+    def reset(self) -> None:
+        with self._lock:
+            self._samples.clear()
+
+
+LATENCY = LatencyStats()
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """Mede um trecho; soma no request atual (Server-Timing) ou vai direto p/ histograma."""
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        ms = (time.perf_counter() - t0) * 1000.0
+        cur = _CURRENT.get()
+        if cur is not None:
+            cur.add(name, ms)
+        else:
+            LATENCY.record(BACKGROUND, name, ms)
+
+
+def timed(name: str) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+    """Decorator: `@timed("upstream")` == `with stage("upstream"): ...` no corpo da função."""
+
+    def deco(fn: Callable[..., Any]) -> Callable[..., Any]:
+        @functools.wraps(fn)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            with stage(name):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    return deco
+
+
+def route_label(scope: Dict[str, Any]) -> str:
+    route = scope.get("route")
+    path = getattr(route, "path", None)
+    if path:
+        return path
+    endpoint = scope.get("endpoint")
+    if endpoint is not None:
+        return getattr(endpoint, "__name__", str(endpoint))
+    return scope.get("path", "")
+
+
+class ServerTimingMiddleware:
+    """
+    Abre um RequestTimings por request, emite `Server-Timing` no início da
+    resposta e, no fim, joga cada etapa (+ "total") nos histogramas.
+
+    Etapas que rodam depois dos headers (corpo de StreamingResponse) não
+    entram no header, mas entram nos histogramas.
+    """
+
+    def __init__(self, app: Any):
+        self.app = app
+
+    async def __call__(self, scope: Dict[str, Any], receive: Callable, send: Callable) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timings = RequestTimings(scope.get("path", ""))
+        token = _CURRENT.set(timings)
+        t0 = time.perf_counter()
+
+        async def send_with_timing(message: Dict[str, Any]) -> None:
+            if message["type"] == "http.response.start":
+                total_ms = (time.perf_counter() - t0) * 1000.0
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", timings.server_timing(total_ms).encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _CURRENT.reset(token)
+            total_ms = (time.perf_counter() - t0) * 1000.0
+            endpoint = route_label(scope)
+            for name, (ms, _n) in list(timings.stages.items()):
+                LATENCY.record(endpoint, name, ms)
+            LATENCY.record(endpoint, "total", total_ms)
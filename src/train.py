@@ -1,13 +1,14 @@
-import pandas as pd
-from src.model import train_team_poisson, save_model
+from src.match_store import iter_chunks
+from src.model import train_team_poisson_stream, save_model
 
-INPUT_CSV = "data/processed/matches_all.csv"
+# store colunar (build_dataset.py); cai no .csv se ainda não existir
+INPUT = "data/processed/matches_all"
 
 OUTPUT_MODEL = "data/model.joblib"
 
 def main():
-    df = pd.read_csv(INPUT_CSV)
-    model = train_team_poisson(df, iters=600, lr=0.03, reg=0.02)
+    # estatísticas suficientes acumuladas lote a lote: o histórico não vai inteiro pra memória
+    model = train_team_poisson_stream(iter_chunks(INPUT), iters=600, lr=0.03, reg=0.02)
     save_model(model, OUTPUT_MODEL)
     print(f"Modelo salvo em: {OUTPUT_MODEL}")
     print(f"Times conhecidos: {len(model.teams)}")
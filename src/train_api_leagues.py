@@ -1,7 +1,7 @@
 import os
-import pandas as pd
 
-from src.model import train_team_poisson, save_model
+from src.match_store import load_matches
+from src.model import train_team_poisson_arrays, save_model
 
 CODES = [
     "CL",
@@ -19,23 +19,23 @@ CODES = [
 ]
 
 def train(code: str):
-    inp = f"data/api_processed/{code}.csv"
+    inp = f"data/api_processed/{code}"
     out = f"data/models/{code}.joblib"
 
-    if not os.path.exists(inp):
-        print(f"[SKIP] {code}: não existe {inp}")
+    if not (os.path.exists(inp + ".npz") or os.path.exists(inp + ".csv")):
+        print(f"[SKIP] {code}: não existe {inp}.npz/.csv")
         return
 
-    df = pd.read_csv(inp)
+    data = load_matches(inp)
 
     # Se vier vazio, pula
-    if len(df) == 0:
+    if len(data) == 0:
         print(f"[SKIP] {code}: dataset vazio")
         return
 
-    model = train_team_poisson(df, iters=600, lr=0.05, reg=0.02, verbose_every=200)
+    model = train_team_poisson_arrays(data, iters=600, lr=0.05, reg=0.02, verbose_every=200)
     save_model(model, out)
-    print(f"OK: {code} -> {out} | times={len(model.teams)} | linhas={len(df)}")
+    print(f"OK: {code} -> {out} | times={len(model.teams)} | linhas={len(data)}")
 
 def main():
     os.makedirs("data/models", exist_ok=True)
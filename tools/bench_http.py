@@ -0,0 +1,419 @@
+"""
+Benchmark HTTP ponta a ponta do api_server.
+
+Sobe o src.replay_server (stand-in da football-data.org) e o src.api_server
+apontado para ele, dispara misturas realistas de tráfego com um cliente
+assíncrono e grava um relatório JSON comparável entre commits:
+throughput, p50/p95/p99, chamadas ao upstream e hit ratio do cache
+(lidos do /metrics antes/depois de cada cenário).
+
+Cenários:
+  matchday  lista pesada: /matches de várias ligas/status + /leagues + alguns /card
+  live      card pesado: /card de poucos jogos + /matches?status=LIVE
+  cold      reinicia o servidor e mede a mistura "matchday" com cache vazio
+
+Uso:
+    python tools/bench_http.py --scenarios matchday,live,cold --concurrency 32 --duration 20
+    python tools/bench_http.py --upstream-latency-ms 150 --out bench.json --compare bench_prev.json
+    python tools/bench_http.py --target http://127.0.0.1:8000 --upstream http://127.0.0.1:8001
+
+Precisa de httpx (pip install httpx).
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import re
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+try:
+    import httpx  # opcional: só este script usa
+except Exception:
+    httpx = None  # type: ignore
+
+ROOT = Path(__file__).resolve().parents[1]
+
+CODES = ["PL", "BL1", "PD", "SA", "FL1", "DED", "PPL", "ELC", "BSA"]
+
+METRIC_RE = re.compile(r'^(?P<name>[a-zA-Z_:][\w:]*)(?:\{(?P<labels>[^}]*)\})? (?P<value>\S+)$')
+LABEL_RE = re.compile(r'(\w+)="((?:[^"\\]|\\.)*)"')
+
+Request = Tuple[str, str]  # (rota p/ agrupar, path com query)
+
+
+# =========================================================
+# Processos
+# =========================================================
+def start_process(args: List[str], env: Dict[str, str]) -> subprocess.Popen:
+    return subprocess.Popen(
+        [sys.executable, *args],
+        cwd=str(ROOT),
+        env={**os.environ, "PYTHONPATH": str(ROOT), **env},
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+
+
+def stop_process(p: Optional[subprocess.Popen]) -> None:
+    if p is None or p.poll() is not None:
+        return
+    p.terminate()
+    try:
+        p.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        p.kill()
+
+
+def wait_ready(url: str, timeout: float = 30.0) -> None:
+    t0 = time.time()
+    while time.time() - t0 < timeout:
+        try:
+            if httpx.get(url, timeout=1.0).status_code < 500:
+                return
+        except Exception:
+            pass
+        time.sleep(0.2)
+    raise SystemExit(f"Servidor não respondeu em {timeout:.0f}s: {url}")
+
+
+class Servers:
+    """Replay + api_server locais (ou só URLs, se --target for usado)."""
+
+    def __init__(self, args: argparse.Namespace):
+        self.args = args
+        self.upstream = args.upstream or f"http://127.0.0.1:{args.upstream_port}"
+        self.target = args.target or f"http://127.0.0.1:{args.port}"
+        self.replay: Optional[subprocess.Popen] = None
+        self.api: Optional[subprocess.Popen] = None
+
+    def start(self) -> None:
+        if not self.args.upstream:
+            self.replay = start_process(
+                [
+                    "-m", "src.replay_server",
+                    "--port", str(self.args.upstream_port),
+                    "--latency-ms", str(self.args.upstream_latency_ms),
+                    "--error-rate", str(self.args.upstream_error_rate),
+                    "--quota", str(self.args.upstream_quota),
+                ],
+                env={},
+            )
+            wait_ready(f"{self.upstream}/replay/status")
+        if not self.args.target:
+            self.start_api()
+
+    def start_api(self) -> None:
+        self.api = start_process(
+            ["-m", "uvicorn", "src.api_server:app", "--port", str(self.args.port), "--log-level", "warning"],
+            env={"FOOTBALL_API_BASE_URL": self.upstream, "FOOTBALL_DATA_TOKEN": "bench"},
+        )
+        wait_ready(f"{self.target}/leagues")
+
+    def restart_api(self) -> bool:
+        if self.args.target:
+            return False  # servidor externo: não dá para reiniciar
+        stop_process(self.api)
+        self.start_api()
+        return True
+
+    def stop(self) -> None:
+        stop_process(self.api)
+        stop_process(self.replay)
+
+
+# =========================================================
+# Cenários
+# =========================================================
+def discover_ids(upstream: str, codes: List[str]) -> Dict[str, Dict[str, List[int]]]:
+    """Ids por competição direto do upstream (não aquece o cache do servidor)."""
+    out: Dict[str, Dict[str, List[int]]] = {}
+    for code in codes:
+        try:
+            ms = httpx.get(f"{upstream}/competitions/{code}/matches", timeout=10).json().get("matches", [])
+        except Exception:
+            continue
+        by_status: Dict[str, List[int]] = {"upcoming": [], "live": [], "finished": []}
+        for m in ms:
+            st = m.get("status")
+            key = "upcoming" if st in ("SCHEDULED", "TIMED") else "live" if st in ("IN_PLAY", "PAUSED") else "finished"
+            by_status[key].append(int(m["id"]))
+        by_status["upcoming"] = by_status["upcoming"][:20]
+        by_status["finished"] = by_status["finished"][-20:]
+        out[code] = by_status
+    return out
+
+
+def matchday_mix(ids: Dict[str, Dict[str, List[int]]], rng: random.Random) -> Callable[[], Request]:
+    codes = list(ids) or CODES
+    statuses = ["SCHEDULED", "SCHEDULED", "ALL", "FINISHED", "LIVE"]
+
+    def next_request() -> Request:
+        x = rng.random()
+        code = rng.choice(codes)
+        if x < 0.70:
+            status = rng.choice(statuses)
+            limit = rng.choice([15, 15, 30, 50])
+            return "/matches", f"/matches?code={code}&status={status}&limit={limit}"
+        if x < 0.90:
+            return "/leagues", "/leagues"
+        pool = ids.get(code, {}).get("upcoming") or [1]
+        return "/card", f"/card?code={code}&match_id={rng.choice(pool)}"
+
+    return next_request
+
+
+def live_mix(ids: Dict[str, Dict[str, List[int]]], rng: random.Random) -> Callable[[], Request]:
+    codes = list(ids)[:3] or CODES[:3]
+    hot = [(c, mid) for c in codes for mid in (ids.get(c, {}).get("live") or ids.get(c, {}).get("upcoming", []))[:4]]
+    hot = hot or [(codes[0], 1)]
+
+    def next_request() -> Request:
+        if rng.random() < 0.80:
+            code, mid = rng.choice(hot)
+            return "/card", f"/card?code={code}&match_id={mid}"
+        return "/matches", f"/matches?code={rng.choice(codes)}&status=LIVE"
+
+    return next_request
+
+
+SCENARIOS = {
+    "matchday": matchday_mix,
+    "live": live_mix,
+    "cold": matchday_mix,  # mesma mistura, servidor reiniciado antes
+}
+
+
+# =========================================================
+# Execução
+# =========================================================
+def percentile(sorted_ms: List[float], p: float) -> Optional[float]:
+    if not sorted_ms:
+        return None
+    return round(sorted_ms[min(len(sorted_ms) - 1, int(p * len(sorted_ms)))], 2)
+
+
+def latency_summary(samples: List[float]) -> Dict[str, Any]:
+    s = sorted(samples)
+    return {
+        "count": len(s),
+        "mean": round(sum(s) / len(s), 2) if s else None,
+        "p50": percentile(s, 0.50),
+        "p95": percentile(s, 0.95),
+        "p99": percentile(s, 0.99),
+        "max": round(s[-1], 2) if s else None,
+    }
+
+
+async def drive(
+    base_url: str, next_request: Callable[[], Request], concurrency: int, duration: float, max_requests: int
+) -> Dict[str, Any]:
+    samples: Dict[str, List[float]] = {}
+    statuses: Dict[str, int] = {}
+    errors = 0
+    sent = 0
+    first_ok_ms: Optional[float] = None
+    t_start = time.perf_counter()
+    deadline = t_start + duration
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, timeout=30.0, limits=limits) as client:
+
+        async def worker() -> None:
+            nonlocal errors, sent, first_ok_ms
+            while time.perf_counter() < deadline and (not max_requests or sent < max_requests):
+                sent += 1
+                route, path = next_request()
+                t0 = time.perf_counter()
+                try:
+                    r = await client.get(path, headers={"Accept-Encoding": "gzip"})
+                    code = str(r.status_code)
+                except Exception:
+                    code = "error"
+                ms = (time.perf_counter() - t0) * 1000.0
+                statuses[code] = statuses.get(code, 0) + 1
+                if code.startswith("2") or code == "304":
+                    samples.setdefault(route, []).append(ms)
+                    if first_ok_ms is None:
+                        first_ok_ms = (time.perf_counter() - t_start) * 1000.0
+                else:
+                    errors += 1
+
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+
+    elapsed = time.perf_counter() - t_start
+    all_ms = [x for v in samples.values() for x in v]
+    done = sum(statuses.values())
+    return {
+        "requests": done,
+        "errors": errors,
+        "status_counts": dict(sorted(statuses.items())),
+        "duration_s": round(elapsed, 3),
+        "rps": round(done / elapsed, 1) if elapsed else None,
+        "first_ok_ms": round(first_ok_ms, 2) if first_ok_ms is not None else None,
+        "latency_ms": latency_summary(all_ms),
+        "per_route": {route: latency_summary(v) for route, v in sorted(samples.items())},
+    }
+
+
+def scrape_metrics(base_url: str) -> Dict[Tuple[str, Tuple[Tuple[str, str], ...]], float]:
+    try:
+        text = httpx.get(f"{base_url}/metrics", timeout=5).text
+    except Exception:
+        return {}
+    out: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], float] = {}
+    for line in text.splitlines():
+        if not line or line.startswith("#"):
+            continue
+        m = METRIC_RE.match(line)
+        if not m:
+            continue
+        labels = tuple(sorted(LABEL_RE.findall(m.group("labels") or "")))
+        try:
+            out[(m.group("name"), labels)] = float(m.group("value"))
+        except ValueError:
+            pass
+    return out
+
+
+def metrics_delta(before: Dict, after: Dict) -> Dict[str, Any]:
+    def delta(name: str) -> Dict[Tuple[Tuple[str, str], ...], float]:
+        d: Dict[Tuple[Tuple[str, str], ...], float] = {}
+        for (n, labels), v in after.items():
+            if n == name:
+                d[labels] = v - before.get((n, labels), 0.0)
+        return d
+
+    upstream_by_status: Dict[str, float] = {}
+    for labels, v in delta("sf_upstream_requests_total").items():
+        st = dict(labels).get("status", "")
+        upstream_by_status[st] = upstream_by_status.get(st, 0) + v
+
+    cache: Dict[str, Dict[str, float]] = {}
+    for labels, v in delta("sf_cache_requests_total").items():
+        lab = dict(labels)
+        cache.setdefault(lab.get("namespace", ""), {})[lab.get("result", "")] = v
+
+    hits = sum(ns.get("hit", 0) + ns.get("stale", 0) for ns in cache.values())
+    total = hits + sum(ns.get("miss", 0) for ns in cache.values())
+
+    def ratio(ns: Dict[str, float]) -> Optional[float]:
+        t = ns.get("hit", 0) + ns.get("stale", 0) + ns.get("miss", 0)
+        return round((ns.get("hit", 0) + ns.get("stale", 0)) / t, 4) if t else None
+
+    return {
+        "upstream_calls": int(sum(upstream_by_status.values())),
+        "upstream_by_status": {k: int(v) for k, v in sorted(upstream_by_status.items())},
+        "upstream_short_circuits": int(sum(delta("sf_upstream_short_circuits_total").values())),
+        "cache_hit_ratio": round(hits / total, 4) if total else None,
+        "cache_by_namespace": {
+            ns: {**{k: int(v) for k, v in sorted(d.items())}, "hit_ratio": ratio(d)} for ns, d in sorted(cache.items())
+        },
+    }
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=str(ROOT), text=True).strip()
+    except Exception:
+        return None
+
+
+def compare(report: Dict[str, Any], prev_path: Path) -> None:
+    prev = json.loads(prev_path.read_text(encoding="utf-8"))
+    print(f"\nComparação com {prev_path} (commit {prev.get('meta', {}).get('commit')}):")
+    for name, cur in report["scenarios"].items():
+        old = prev.get("scenarios", {}).get(name)
+        if not old:
+            continue
+        for key in ("rps",):
+            a, b = old.get(key), cur.get(key)
+            if a and b:
+                print(f"  {name:9s} {key:4s} {a:>9} -> {b:>9} ({(b - a) / a * 100:+.1f}%)")
+        for key in ("p50", "p95", "p99"):
+            a, b = old["latency_ms"].get(key), cur["latency_ms"].get(key)
+            if a and b:
+                print(f"  {name:9s} {key:4s} {a:>9} -> {b:>9} ({(b - a) / a * 100:+.1f}%)")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark HTTP do api_server contra o replay local.")
+    ap.add_argument("--scenarios", default="matchday,live,cold")
+    ap.add_argument("--concurrency", type=int, default=16)
+    ap.add_argument("--duration", type=float, default=15.0, help="segundos por cenário")
+    ap.add_argument("--requests", type=int, default=0, help="máx. de requests por cenário (0 = só duração)")
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--port", type=int, default=8010)
+    ap.add_argument("--upstream-port", type=int, default=8011)
+    ap.add_argument("--upstream-latency-ms", type=float, default=100.0)
+    ap.add_argument("--upstream-error-rate", type=float, default=0.0)
+    ap.add_argument("--upstream-quota", type=int, default=0)
+    ap.add_argument("--target", default=None, help="usar um api_server já rodando (não sobe processos)")
+    ap.add_argument("--upstream", default=None, help="usar um upstream já rodando")
+    ap.add_argument("--out", default=None, help="grava o relatório JSON aqui")
+    ap.add_argument("--compare", default=None, help="relatório anterior para comparar")
+    args = ap.parse_args()
+
+    if httpx is None:
+        raise SystemExit("Instale httpx para rodar o benchmark: pip install httpx")
+
+    names = [s.strip() for s in args.scenarios.split(",") if s.strip()]
+    unknown = [s for s in names if s not in SCENARIOS]
+    if unknown:
+        raise SystemExit(f"Cenário desconhecido: {', '.join(unknown)} (use {', '.join(SCENARIOS)})")
+
+    servers = Servers(args)
+    servers.start()
+    report: Dict[str, Any] = {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "config": {k: v for k, v in vars(args).items() if k not in ("out", "compare")},
+        },
+        "scenarios": {},
+    }
+
+    try:
+        ids = discover_ids(servers.upstream, CODES)
+        for name in names:
+            if name == "cold" and not servers.restart_api():
+                print("cold: ignorado com --target (não dá para reiniciar o servidor)")
+                continue
+            rng = random.Random(args.seed)
+            before = scrape_metrics(servers.target)
+            result = asyncio.run(
+                drive(servers.target, SCENARIOS[name](ids, rng), args.concurrency, args.duration, args.requests)
+            )
+            result.update(metrics_delta(before, scrape_metrics(servers.target)))
+            report["scenarios"][name] = result
+            lat = result["latency_ms"]
+            print(
+                f"{name:9s} {result['rps']:>8} req/s  p50={lat['p50']}ms p95={lat['p95']}ms p99={lat['p99']}ms  "
+                f"upstream={result['upstream_calls']} cache_hit={result['cache_hit_ratio']} erros={result['errors']}"
+            )
+    finally:
+        servers.stop()
+
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.out:
+        Path(args.out).write_text(text, encoding="utf-8")
+        print("OK:", args.out)
+    else:
+        print(text)
+
+    if args.compare:
+        compare(report, Path(args.compare))
+
+
+if __name__ == "__main__":
+    main()
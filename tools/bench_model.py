@@ -0,0 +1,423 @@
+"""
+Micro-benchmark + regressão dos hot paths do src/model.py.
+
+Mede score_matrix, probs_1x2_from_matrix, expected_goals, predict_1x2 e
+train_team_poisson (dados sintéticos) em max_goals 5–15, ligas de 18–200
+times e datasets de 1k–1M jogos, e compara com o baseline salvo em
+tools/bench_baselines/model.json: sai com código 1 se algum caso ficar
+mais lento que (1 + tolerância) x baseline E a diferença passar do piso
+absoluto de ruído (casos de microssegundos oscilam mais que 25%).
+
+Cada rodada do caso é intercalada com um laço de calibração fixo; o que se
+compara é a mediana de (tempo do caso / tempo da calibração), então carga
+na máquina ou variação de clock durante a execução se cancelam.
+
+Antes de medir, confere equivalência numérica com as implementações de
+referência abaixo (cópias das versões originais) e com os resultados de
+treino gravados no baseline — otimização que muda número não passa.
+
+Uso:
+    python tools/bench_model.py                   # compara com o baseline
+    python tools/bench_model.py --quick           # sem os casos grandes (1M linhas, 200 times)
+    python tools/bench_model.py --save-baseline   # regrava o baseline (rode na máquina de referência)
+    python tools/bench_model.py --tolerance 0.5 --only score_matrix
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import platform
+import re
+import sys
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from src.model import (  # noqa: E402
+    PoissonTeamModel,
+    probs_1x2_from_matrices,
+    probs_1x2_from_matrix,
+    score_matrices,
+    score_matrix,
+    train_team_poisson,
+)
+
+BASELINE_PATH = ROOT / "tools" / "bench_baselines" / "model.json"
+DEFAULT_TOLERANCE = 0.25
+DEFAULT_NOISE_FLOOR = 5e-6  # segundos: diferença abaixo disso nunca é regressão
+
+MAX_GOALS = (5, 10, 15)
+LEAGUE_SIZES = (18, 50, 200)
+DATASET_ROWS = (1_000, 10_000, 100_000, 1_000_000)
+TRAIN_ITERS = 20  # treino no benchmark: poucas iterações (o custo é linear nelas)
+
+# treino "golden": resultado exato gravado no baseline
+GOLDEN_TRAIN = {"n_teams": 20, "rows": 2_000, "iters": 200, "seed": 7}
+
+RTOL = 1e-9
+ATOL = 1e-12
+
+
+# =========================================================
+# Referências (implementação original, para equivalência)
+# =========================================================
+def ref_poisson_pmf(k: int, lam: float) -> float:
+    if lam <= 0:
+        return 0.0 if k > 0 else 1.0
+    return math.exp(-lam) * (lam ** k) / math.factorial(k)
+
+
+def ref_score_matrix(lam_home: float, lam_away: float, max_goals: int) -> np.ndarray:
+    mat = np.zeros((max_goals + 1, max_goals + 1), dtype=float)
+    for i in range(max_goals + 1):
+        for j in range(max_goals + 1):
+            mat[i, j] = ref_poisson_pmf(i, lam_home) * ref_poisson_pmf(j, lam_away)
+    s = mat.sum()
+    return mat / s if s > 0 else mat
+
+
+def ref_probs_1x2(mat: np.ndarray) -> Tuple[float, float, float]:
+    h = d = a = 0.0
+    for i in range(mat.shape[0]):
+        for j in range(mat.shape[1]):
+            if i > j:
+                h += mat[i, j]
+            elif i == j:
+                d += mat[i, j]
+            else:
+                a += mat[i, j]
+    return h, d, a
+
+
+def ref_expected_goals(model: PoissonTeamModel, home: str, away: str) -> Tuple[float, float]:
+    hi, ai = model.team_index[home], model.team_index[away]
+    lh = min(max(model.home_adv + model.attack[hi] - model.defense[ai], -20.0), 20.0)
+    la = min(max(model.attack[ai] - model.defense[hi], -20.0), 20.0)
+    return max(math.exp(lh), 0.01), max(math.exp(la), 0.01)
+
+
+# =========================================================
+# Dados sintéticos
+# =========================================================
+def team_names(n: int) -> List[str]:
+    return [f"Team {i:03d}" for i in range(n)]
+
+
+def synthetic_model(n_teams: int, seed: int = 0) -> PoissonTeamModel:
+    rng = np.random.default_rng(seed)
+    teams = team_names(n_teams)
+    return PoissonTeamModel(
+        teams=teams,
+        team_index={t: i for i, t in enumerate(teams)},
+        attack=rng.normal(0, 0.3, n_teams),
+        defense=rng.normal(0, 0.3, n_teams),
+        home_adv=0.25,
+    )
+
+
+def synthetic_matches(n_teams: int, rows: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    attack = rng.normal(0, 0.3, n_teams)
+    defense = rng.normal(0, 0.3, n_teams)
+    home = rng.integers(0, n_teams, rows)
+    away = (home + rng.integers(1, n_teams, rows)) % n_teams
+    names = np.array(team_names(n_teams), dtype=object)
+    return pd.DataFrame({
+        "home_team": names[home],
+        "away_team": names[away],
+        "home_goals": rng.poisson(np.exp(0.25 + attack[home] - defense[away])),
+        "away_goals": rng.poisson(np.exp(attack[away] - defense[home])),
+    })
+
+
+# =========================================================
+# Casos
+# =========================================================
+@dataclass
+class Case:
+    name: str
+    setup: Callable[[], Callable[[], Any]]  # prepara dados e devolve a função medida
+    big: bool = False
+
+
+def fixture_pairs(model: PoissonTeamModel, n: int = 64, seed: int = 1) -> List[Tuple[str, str]]:
+    rng = np.random.default_rng(seed)
+    k = len(model.teams)
+    h = rng.integers(0, k, n)
+    a = (h + rng.integers(1, k, n)) % k
+    return [(model.teams[i], model.teams[j]) for i, j in zip(h, a)]
+
+
+def build_cases() -> List[Case]:
+    cases: List[Case] = []
+
+    for g in MAX_GOALS:
+        cases.append(Case(f"score_matrix[max_goals={g}]", lambda g=g: (lambda: score_matrix(1.45, 1.1, max_goals=g))))
+
+        def setup_probs(g=g):
+            mat = score_matrix(1.45, 1.1, max_goals=g)
+            return lambda: probs_1x2_from_matrix(mat)
+
+        cases.append(Case(f"probs_1x2_from_matrix[max_goals={g}]", setup_probs))
+
+    for n in LEAGUE_SIZES:
+        big = n >= 200
+
+        def setup_xg(n=n):
+            model = synthetic_model(n)
+            pairs = fixture_pairs(model)
+            return lambda: [model.expected_goals(h, a) for h, a in pairs]
+
+        def setup_predict(n=n):
+            model = synthetic_model(n)
+            pairs = fixture_pairs(model, n=8)
+            return lambda: [model.predict_1x2(h, a, max_goals=10) for h, a in pairs]
+
+        cases.append(Case(f"expected_goals[teams={n},x64]", setup_xg, big=big))
+        cases.append(Case(f"predict_1x2[teams={n},x8]", setup_predict, big=big))
+
+    for rows in DATASET_ROWS:
+        def setup_train(rows=rows):
+            df = synthetic_matches(20, rows)
+            return lambda: train_team_poisson(df, iters=TRAIN_ITERS, verbose_every=0)
+
+        cases.append(Case(f"train_team_poisson[rows={rows},iters={TRAIN_ITERS}]", setup_train, big=rows >= 1_000_000))
+
+    return cases
+
+
+def calibration_loop() -> float:
+    # carga fixa parecida com a dos casos: Python puro + numpy pequeno
+    acc = 0.0
+    for i in range(2_000):
+        acc += math.exp(-(i % 7) * 0.1) * (i % 3)
+    v = np.arange(256, dtype=float)
+    for _ in range(20):
+        acc += float(np.exp(-v * 0.01).sum())
+    return acc
+
+
+def calls_for(fn: Callable[[], Any], min_time: float) -> int:
+    """Nº de chamadas por rodada para a rodada durar ~`min_time` segundos."""
+    fn()  # aquece
+    number = 1
+    while True:
+        t0 = time.perf_counter()
+        for _ in range(number):
+            fn()
+        dt = time.perf_counter() - t0
+        if dt >= min_time or number >= 1_000_000:
+            return number
+        number *= 2 if dt == 0 else max(2, min(10, int(min_time / dt) + 1))
+
+
+def per_call(fn: Callable[[], Any], number: int) -> float:
+    t0 = time.perf_counter()
+    for _ in range(number):
+        fn()
+    return (time.perf_counter() - t0) / number
+
+
+def time_case(fn: Callable[[], Any], min_time: float, repeat: int, calib_number: int) -> Tuple[float, float]:
+    """
+    (segundos por chamada, tempo relativo à calibração): medianas entre
+    `repeat` rodadas, cada uma seguida de uma rodada do calibration_loop.
+    """
+    number = calls_for(fn, min_time)
+    secs, rel = [], []
+    for _ in range(repeat):
+        sec = per_call(fn, number)
+        secs.append(sec)
+        rel.append(sec / per_call(calibration_loop, calib_number))
+    return float(np.median(secs)), float(np.median(rel))
+
+
+# =========================================================
+# Equivalência
+# =========================================================
+def golden_train_values() -> Dict[str, Any]:
+    g = GOLDEN_TRAIN
+    df = synthetic_matches(g["n_teams"], g["rows"], seed=g["seed"])
+    model = train_team_poisson(df, iters=g["iters"], verbose_every=0)
+    return {
+        **g,
+        "home_adv": model.home_adv,
+        "attack": [float(x) for x in model.attack],
+        "defense": [float(x) for x in model.defense],
+    }
+
+
+def check_equivalence(baseline: Optional[Dict[str, Any]]) -> List[str]:
+    failures: List[str] = []
+
+    def close(name: str, a: Any, b: Any) -> None:
+        if not np.allclose(np.asarray(a, dtype=float), np.asarray(b, dtype=float), rtol=RTOL, atol=ATOL):
+            failures.append(name)
+
+    rng = np.random.default_rng(123)
+    lams = [(0.01, 0.01), (0.3, 2.9), (1.45, 1.1), (4.5, 0.2)] + [tuple(x) for x in rng.uniform(0.05, 4.0, (12, 2))]
+
+    for g in range(5, 16):
+        for lh, la in lams:
+            mat = score_matrix(lh, la, max_goals=g)
+            close(f"score_matrix({lh:.3f},{la:.3f},{g})", mat, ref_score_matrix(lh, la, g))
+            close(f"probs_1x2_from_matrix({lh:.3f},{la:.3f},{g})", probs_1x2_from_matrix(mat), ref_probs_1x2(mat))
+
+        lh_arr = np.array([x[0] for x in lams])
+        la_arr = np.array([x[1] for x in lams])
+        mats = score_matrices(lh_arr, la_arr, max_goals=g)
+        close(f"score_matrices(max_goals={g})", mats, [score_matrix(a, b, max_goals=g) for a, b in lams])
+        close(
+            f"probs_1x2_from_matrices(max_goals={g})",
+            np.stack(probs_1x2_from_matrices(mats), axis=1),
+            [probs_1x2_from_matrix(m) for m in mats],
+        )
+
+    for n in LEAGUE_SIZES:
+        model = synthetic_model(n)
+        pairs = fixture_pairs(model)
+        close(f"expected_goals[teams={n}]", [model.expected_goals(h, a) for h, a in pairs],
+              [ref_expected_goals(model, h, a) for h, a in pairs])
+        lh, la = model.expected_goals_many([p[0] for p in pairs], [p[1] for p in pairs])
+        close(f"expected_goals_many[teams={n}]", np.stack([lh, la], axis=1),
+              [model.expected_goals(h, a) for h, a in pairs])
+
+        h, a = pairs[0]
+        pred = model.predict_1x2(h, a, max_goals=10)
+        ref_mat = ref_score_matrix(*ref_expected_goals(model, h, a), 10)
+        p = pred["probabilities_1x2"]
+        close(f"predict_1x2[teams={n}]", [p["home_win"], p["draw"], p["away_win"]], ref_probs_1x2(ref_mat))
+        best = np.unravel_index(np.argmax(ref_mat), ref_mat.shape)
+        top = pred["top_scorelines"][0]
+        if (top["home"], top["away"]) != (int(best[0]), int(best[1])):
+            failures.append(f"predict_1x2.top_scorelines[teams={n}]")
+
+    golden = (baseline or {}).get("golden_train")
+    if golden:
+        cur = golden_train_values()
+        close("train_team_poisson.home_adv", cur["home_adv"], golden["home_adv"])
+        close("train_team_poisson.attack", cur["attack"], golden["attack"])
+        close("train_team_poisson.defense", cur["defense"], golden["defense"])
+
+    return failures
+
+
+# =========================================================
+# Main
+# =========================================================
+def machine_info() -> Dict[str, Any]:
+    return {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "platform": platform.platform(),
+        "processor": platform.processor() or platform.machine(),
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark/regressão do src/model.py")
+    ap.add_argument("--baseline", default=str(BASELINE_PATH))
+    ap.add_argument("--save-baseline", action="store_true", help="grava os tempos atuais como baseline")
+    ap.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE, help="regressão permitida (0.25 = +25%%)")
+    ap.add_argument("--noise-floor", type=float, default=DEFAULT_NOISE_FLOOR,
+                    help="diferença absoluta (s) abaixo da qual não há regressão")
+    ap.add_argument("--quick", action="store_true", help="pula os casos grandes")
+    ap.add_argument("--only", default=None, help="regex no nome do caso")
+    ap.add_argument("--min-time", type=float, default=0.1, help="segundos mínimos por rodada")
+    ap.add_argument("--repeat", type=int, default=11, help="rodadas por caso (vale a mediana)")
+    ap.add_argument("--out", default=None, help="grava o resultado desta execução em JSON")
+    args = ap.parse_args()
+
+    baseline_path = Path(args.baseline)
+    baseline = json.loads(baseline_path.read_text(encoding="utf-8")) if baseline_path.exists() else None
+
+    failures = check_equivalence(None if args.save_baseline else baseline)
+    if failures:
+        print("FALHA de equivalência numérica:")
+        for f in failures:
+            print("  -", f)
+        raise SystemExit(1)
+    print("OK: equivalência numérica")
+
+    if baseline and baseline.get("machine") != machine_info():
+        print("Aviso: baseline gravado em outra máquina/versão; compare com cautela.")
+
+    cases = build_cases()
+    if args.quick:
+        cases = [c for c in cases if not c.big]
+    if args.only:
+        rx = re.compile(args.only)
+        cases = [c for c in cases if rx.search(c.name)]
+
+    base_times: Dict[str, float] = (baseline or {}).get("results", {})
+    base_rel: Dict[str, float] = (baseline or {}).get("relative", {})
+    results: Dict[str, float] = {}
+    relative: Dict[str, float] = {}
+    regressions: List[str] = []
+    calib_number = calls_for(calibration_loop, args.min_time / 4)
+
+    print(f"{'caso':52s} {'atual':>12s} {'baseline':>12s} {'razão':>7s}")
+    for case in cases:
+        sec, rel = time_case(case.setup(), args.min_time, args.repeat, calib_number)
+        results[case.name] = sec
+        relative[case.name] = rel
+        base = base_times.get(case.name)
+        # razão normalizada pela calibração quando o baseline tem o relativo
+        ratio = rel / base_rel[case.name] if case.name in base_rel else (sec / base if base else None)
+        flag = ""
+        if ratio is not None and ratio > 1 + args.tolerance and sec - sec / ratio > args.noise_floor:
+            flag = "  REGRESSÃO"
+            regressions.append(case.name)
+        print(
+            f"{case.name:52s} {sec * 1e6:10.1f}µs "
+            f"{(f'{base * 1e6:10.1f}µs' if base else '           -'):>12s} "
+            f"{(f'{ratio:6.2f}x' if ratio else '      -'):>7s}{flag}"
+        )
+
+    run = {
+        "machine": machine_info(),
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "tolerance": args.tolerance,
+        "noise_floor": args.noise_floor,
+        "results": results,
+        "relative": relative,
+    }
+
+    if args.out:
+        Path(args.out).write_text(json.dumps(run, indent=2), encoding="utf-8")
+        print("OK:", args.out)
+
+    if args.save_baseline:
+        merged = {**base_times, **results}
+        merged_rel = {**base_rel, **relative}
+        baseline_path.parent.mkdir(parents=True, exist_ok=True)
+        baseline_path.write_text(
+            json.dumps(
+                {**run, "results": merged, "relative": merged_rel, "golden_train": golden_train_values()}, indent=2
+            ) + "\n",
+            encoding="utf-8",
+        )
+        print("OK: baseline gravado em", baseline_path)
+        return
+
+    if regressions:
+        print(f"\n{len(regressions)} caso(s) acima de +{args.tolerance:.0%} do baseline "
+              f"(e de {args.noise_floor * 1e6:.0f}µs):")
+        for name in regressions:
+            print("  -", name)
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
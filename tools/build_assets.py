@@ -0,0 +1,146 @@
+"""
+Build dos estáticos do /web com versão por hash de conteúdo.
+
+- calcula o hash de app.js, icons/* e site.webmanifest
+- reescreve as referências (?v=<hash>) no index.html e no manifest
+- gera CACHE_NAME e CORE_ASSETS do web/sw.js
+
+As stats extras não entram no precache: o app pede só o par de times
+ao /extra do servidor (shards em data/extra/, tools/build_extra_stats.py).
+
+Como as URLs mudam só quando o conteúdo muda, o servidor pode mandar
+`Cache-Control: immutable` e o cliente só baixa de novo o que mudou.
+
+Uso:
+    python tools/build_assets.py           # reescreve os arquivos
+    python tools/build_assets.py --check   # só verifica (exit 1 se desatualizado)
+"""
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import re
+from pathlib import Path
+from typing import Dict, List
+
+HASH_LEN = 10
+
+# /app.js, /icons/<arquivo>, /data/<arquivo> dentro de aspas (com ou sem ?v=...)
+REF_RE = re.compile(r"""(?P<url>/(?:app\.js|icons/[\w.\-]+|data/[\w.\-]+))(?:\?v=[\w.\-]*)?(?=["'])""")
+
+CACHE_NAME_RE = re.compile(r'const CACHE_NAME = "[^"]*";')
+CORE_ASSETS_RE = re.compile(r"const CORE_ASSETS = \[[^\]]*\];")
+
+
+def content_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()[:HASH_LEN]
+
+
+def rewrite_refs(text: str, versions: Dict[str, str]) -> str:
+    """Troca cada referência conhecida por `<url>?v=<hash>`; as desconhecidas ficam como estão."""
+
+    def repl(m: re.Match) -> str:
+        url = m.group("url")
+        v = versions.get(url)
+        return f"{url}?v={v}" if v else m.group(0)
+
+    return REF_RE.sub(repl, text)
+
+
+def referenced_urls(text: str, versions: Dict[str, str]) -> List[str]:
+    out: List[str] = []
+    for m in REF_RE.finditer(text):
+        url = m.group("url")
+        if url in versions:
+            full = f"{url}?v={versions[url]}"
+            if full not in out:
+                out.append(full)
+    return out
+
+
+def build(web_dir: Path) -> Dict[str, str]:
+    """
+    Retorna {caminho relativo: novo conteúdo} só dos arquivos que mudaram.
+    A ordem importa: o hash de cada arquivo é calculado depois de reescrever
+    o que ele referencia (icons -> manifest -> index).
+    """
+    index_path = web_dir / "index.html"
+    app_path = web_dir / "app.js"
+    sw_path = web_dir / "sw.js"
+    manifest_path = web_dir / "icons" / "site.webmanifest"
+
+    for p in (index_path, app_path, sw_path):
+        if not p.exists():
+            raise SystemExit(f"Arquivo não encontrado: {p}")
+
+    changed: Dict[str, str] = {}
+    versions: Dict[str, str] = {}
+
+    def save(path: Path, new_text: str, old_text: str) -> None:
+        if new_text != old_text:
+            changed[path.relative_to(web_dir).as_posix()] = new_text
+
+    # 1) ícones binários
+    for p in sorted((web_dir / "icons").glob("*")):
+        if p.is_file() and p != manifest_path:
+            versions[f"/icons/{p.name}"] = content_hash(p.read_bytes())
+
+    # 2) app.js
+    versions["/app.js"] = content_hash(app_path.read_bytes())
+
+    # 3) manifest (referencia ícones)
+    if manifest_path.exists():
+        man_old = manifest_path.read_text(encoding="utf-8")
+        man_new = rewrite_refs(man_old, versions)
+        save(manifest_path, man_new, man_old)
+        versions["/icons/site.webmanifest"] = content_hash(man_new.encode("utf-8"))
+
+    # 4) index.html
+    idx_old = index_path.read_text(encoding="utf-8")
+    idx_new = rewrite_refs(idx_old, versions)
+    save(index_path, idx_new, idx_old)
+
+    # 5) service worker: precache = "/" + tudo que o index referencia
+    precache = ["/"] + referenced_urls(idx_new, versions)
+
+    release = content_hash(
+        json.dumps([precache, content_hash(idx_new.encode("utf-8"))]).encode("utf-8")
+    )
+    assets_js = "const CORE_ASSETS = [\n" + ",\n".join(f'  "{u}"' for u in precache) + "\n];"
+
+    sw_old = sw_path.read_text(encoding="utf-8")
+    sw_new = CACHE_NAME_RE.sub(f'const CACHE_NAME = "square-foot-{release}";', sw_old)
+    sw_new = CORE_ASSETS_RE.sub(lambda _m: assets_js, sw_new)
+    save(sw_path, sw_new, sw_old)
+
+    return changed
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Versiona os estáticos do /web por hash de conteúdo.")
+    ap.add_argument("--web", default=None, help="Pasta web (default: <repo>/web)")
+    ap.add_argument("--check", action="store_true", help="Não grava; exit 1 se algum arquivo estiver desatualizado")
+    args = ap.parse_args()
+
+    root = Path(__file__).resolve().parents[1]
+    web_dir = Path(args.web) if args.web else root / "web"
+
+    changed = build(web_dir)
+
+    if args.check:
+        if changed:
+            print("Desatualizado:", ", ".join(sorted(changed)))
+            raise SystemExit(1)
+        print("OK: estáticos já versionados.")
+        return
+
+    for rel, text in changed.items():
+        (web_dir / rel).write_text(text, encoding="utf-8")
+        print("OK:", rel)
+    if not changed:
+        print("Nada mudou.")
+
+
+if __name__ == "__main__":
+    main()
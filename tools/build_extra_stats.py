@@ -1,10 +1,20 @@
 import os
+import sys
 import json
 import re
+import argparse
 from pathlib import Path
 
+import numpy as np
 import pandas as pd
 
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from src.build_cache import file_sha256  # noqa: E402
+from src.ingest import FootballDataXlsxAdapter  # noqa: E402
+
 # Ligas que VOCÊ usa no site (pela tua lista do dropdown)
 TARGET_LEAGUES = {
     "E0": "Premier League",
@@ -25,51 +35,181 @@ NEEDED_COLS = [
     "HS","AS","HST","AST","HC","AC","HF","AF","HY","AY","HR","AR"
 ]
 
+# stat -> (coluna do mandante, coluna do visitante)
+STAT_COLS = {
+    "shots": ("HS", "AS"),
+    "sot": ("HST", "AST"),
+    "corners": ("HC", "AC"),
+    "fouls": ("HF", "AF"),
+    "yellow": ("HY", "AY"),
+    "red": ("HR", "AR"),
+}
+NUM_COLS = [c for pair in STAT_COLS.values() for c in pair]
+# ordem das chaves no JSON: n, shots_for, shots_against, sot_for, ...
+AVG_KEYS = [f"{k}_{side}" for k in STAT_COLS for side in ("for", "against")]
+
+# Abas já lidas, por hash do workbook (ler XLSX é o passo caro):
+#   data/cache/extra/<sha256>.npz   colunas sheet/home/away + stats, já limpas
+CACHE_DIR = ROOT / "data" / "cache" / "extra"
+CACHE_VERSION = 1
+
+# Shards servidos pelo /extra do api_server (1 arquivo pequeno por liga/temporada):
+#   data/extra/<Div>/<temporada>.json   {div, season, name, matches, teams: {time: {home, away}}}
+SHARDS_DIR = ROOT / "data" / "extra"
+
+XLSX = FootballDataXlsxAdapter()
+
 def season_from_filename(name: str) -> str:
     # all-euro-data-2024-2025.xlsx -> 2024-2025
     m = re.search(r"(\d{4}-\d{4})", name)
     return m.group(1) if m else name
 
-def safe_float(x):
-    try:
-        if pd.isna(x):
-            return None
-        return float(x)
-    except Exception:
-        return None
-
-def add_team_match(agg, team, stats_for, stats_against):
-    # agg[team] = {"n":0,"shots_for":0,...}
-    if team not in agg:
-        agg[team] = {"n": 0}
-        for k in stats_for.keys():
-            agg[team][f"{k}_for"] = 0.0
-            agg[team][f"{k}_against"] = 0.0
-
-    agg[team]["n"] += 1
-    for k,v in stats_for.items():
-        agg[team][f"{k}_for"] += v
-        agg[team][f"{k}_against"] += stats_against[k]
-
-def finalize_avgs(agg):
-    out = {}
-    for team, d in agg.items():
-        n = d.get("n", 0)
-        if n <= 0:
+# ==========================
+# Leitura (1 passada por workbook + cache colunar)
+# ==========================
+def clean_sheet(sheet: str, df: pd.DataFrame) -> pd.DataFrame:
+    """Jogos válidos de uma aba (sheet, home, away + stats), na ordem da planilha."""
+    df = df.dropna(subset=["HomeTeam","AwayTeam"] + NUM_COLS)
+    # valor não numérico numa stat = jogo descartado (como o float() de antes)
+    stats = df[NUM_COLS].apply(pd.to_numeric, errors="coerce").astype(float)
+    ok = stats.notna().all(axis=1).to_numpy()
+    out = pd.DataFrame({
+        "sheet": sheet,
+        "home": df["HomeTeam"].astype(str).str.strip().to_numpy()[ok],
+        "away": df["AwayTeam"].astype(str).str.strip().to_numpy()[ok],
+    })
+    for c in NUM_COLS:
+        out[c] = stats[c].to_numpy()[ok]
+    return out
+
+def parse_workbook(fp: Path, sheets) -> pd.DataFrame:
+    parts = []
+    for sheet, df in XLSX.sheets(fp, names=sheets, usecols=lambda c: c in NEEDED_COLS).items():
+        # abas sem as colunas necessárias (notas, ligas sem stats) ficam de fora
+        if any(c not in df.columns for c in NEEDED_COLS):
             continue
-        out[team] = {"n": n}
-        for key, val in d.items():
-            if key == "n":
-                continue
-            out[team][key] = round(val / n, 2)
+        parts.append(clean_sheet(str(sheet), df))
+    if not parts:
+        return pd.DataFrame({"sheet": [], "home": [], "away": [], **{c: [] for c in NUM_COLS}})
+    return pd.concat(parts, ignore_index=True)
+
+def load_workbook(fp: Path, sheets=TARGET_LEAGUES, use_cache: bool = True) -> pd.DataFrame:
+    """Abas `sheets` do workbook num frame só (do cache se o conteúdo não mudou)."""
+    sheets = sorted(sheets)
+    art = CACHE_DIR / f"{file_sha256(fp)}.npz"
+    if use_cache and art.exists():
+        with np.load(art, allow_pickle=False) as z:
+            # o cache vale se foi feito com (pelo menos) as mesmas abas
+            if int(z["version"]) == CACHE_VERSION and set(sheets) <= set(z["sheets_read"].tolist()):
+                return pd.DataFrame({k: z[k] for k in ["sheet", "home", "away"] + NUM_COLS})
+
+    df = parse_workbook(fp, sheets)
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    cols = {k: df[k].to_numpy(dtype=str) for k in ("sheet", "home", "away")}
+    cols.update({c: df[c].to_numpy(dtype=float) for c in NUM_COLS})
+    tmp = art.with_suffix(".tmp.npz")
+    np.savez(tmp, version=np.int32(CACHE_VERSION), sheets_read=np.array(sheets, dtype=str), **cols)
+    os.replace(tmp, art)
+    return df
+
+# ==========================
+# Agregação (vetorizada)
+# ==========================
+def team_rows(matches: pd.DataFrame) -> pd.DataFrame:
+    """
+    "Derrete" cada jogo em 2 linhas (mandante e visitante) com as stats a favor
+    e contra, intercaladas na ordem dos jogos (ordem de 1ª aparição dos times).
+    A coluna "side" diz se o time jogou em casa ou fora.
+    """
+    pos = np.arange(len(matches)) * 2
+    keys = [c for c in ("sheet", "season") if c in matches.columns]
+    sides = []
+    for offset, team, mine, theirs in ((0, "home", 0, 1), (1, "away", 1, 0)):
+        side = pd.DataFrame({"pos": pos + offset, "team": matches[team].to_numpy(), "side": team})
+        for c in keys:
+            side[c] = matches[c].to_numpy()
+        for k, cols in STAT_COLS.items():
+            side[f"{k}_for"] = matches[cols[mine]].to_numpy()
+            side[f"{k}_against"] = matches[cols[theirs]].to_numpy()
+        sides.append(side)
+    return pd.concat(sides, ignore_index=True).sort_values("pos", kind="stable")
+
+def team_averages(matches: pd.DataFrame) -> dict:
+    """{liga: {time: {"n", "<stat>_for", "<stat>_against"...}}} numa redução só."""
+    rows = team_rows(matches)
+    g = rows.groupby(["sheet", "team"], sort=False)
+    sums = g[AVG_KEYS].sum()
+    n = g.size()
+    avgs = sums.to_numpy() / n.to_numpy()[:, None]
+
+    out = {}
+    for (sheet, team), cnt, vals in zip(sums.index, n.to_numpy(), avgs):
+        d = {"n": int(cnt)}
+        d.update((k, round(float(v), 2)) for k, v in zip(AVG_KEYS, vals))
+        out.setdefault(sheet, {})[team] = d
     return out
 
+def split_shards(matches: pd.DataFrame) -> dict:
+    """
+    {(liga, temporada): shard} com médias por time separadas em casa/fora,
+    na mesma redução (groupby liga, temporada, time, lado).
+    """
+    rows = team_rows(matches)
+    g = rows.groupby(["sheet", "season", "team", "side"], sort=False)
+    sums = g[AVG_KEYS].sum()
+    n = g.size()
+    avgs = sums.to_numpy() / n.to_numpy()[:, None]
+    games = matches.groupby(["sheet", "season"], sort=False).size()
+
+    shards = {}
+    for (sheet, season, team, side), cnt, vals in zip(sums.index, n.to_numpy(), avgs):
+        shard = shards.get((sheet, season))
+        if shard is None:
+            shard = shards[(sheet, season)] = {
+                "div": sheet,
+                "season": season,
+                "name": TARGET_LEAGUES.get(sheet, sheet),
+                "matches": int(games[(sheet, season)]),
+                "teams": {},
+            }
+        d = {"n": int(cnt)}
+        d.update((k, round(float(v), 2)) for k, v in zip(AVG_KEYS, vals))
+        shard["teams"].setdefault(team, {})[side] = d
+    return shards
+
+def write_shards(shards: dict, out_dir: Path) -> int:
+    for (div, season), shard in shards.items():
+        path = out_dir / div / f"{season}.json"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(shard, ensure_ascii=False, separators=(",", ":")), encoding="utf-8")
+        os.replace(tmp, path)  # o servidor pode estar lendo
+    return len(shards)
+
+def league_average(teams_avg: dict) -> dict:
+    # Média da liga (média simples das médias dos times, ponderada por n)
+    total = sum(d["n"] for d in teams_avg.values())
+    if total <= 0:
+        return {}
+    league_avg = {}
+    for k in AVG_KEYS:
+        s = 0
+        for d in teams_avg.values():  # soma na ordem dos times: mesmo arredondamento de sempre
+            s += d[k] * d["n"]
+        league_avg[k] = round(s / total, 2)
+    return league_avg
+
 def main():
-    root = Path(__file__).resolve().parents[1]
-    in_dir = root / "data" / "football-data"
-    out_dir = root / "web" / "data"
-    out_dir.mkdir(parents=True, exist_ok=True)
-    out_path = out_dir / "extra-stats.json"
+    ap = argparse.ArgumentParser(description="Gera web/data/extra-stats.json a partir dos XLSX do football-data.co.uk")
+    ap.add_argument("--in-dir", default=str(ROOT / "data" / "football-data"))
+    ap.add_argument("--out", default=str(ROOT / "web" / "data" / "extra-stats.json"))
+    ap.add_argument("--shards-dir", default=str(SHARDS_DIR), help="saída dos shards por liga/temporada (/extra)")
+    ap.add_argument("--no-cache", action="store_true", help="relê todos os XLSX (ignora data/cache/extra)")
+    args = ap.parse_args()
+
+    in_dir = Path(args.in_dir)
+    out_path = Path(args.out)
+    out_path.parent.mkdir(parents=True, exist_ok=True)
 
     if not in_dir.exists():
         raise SystemExit(f"Pasta não encontrada: {in_dir}")
@@ -89,94 +229,32 @@ def main():
     if not files:
         raise SystemExit(f"Nenhum XLSX encontrado em: {in_dir}")
 
-    seasons = []
-
-    # Vamos acumulando por liga
-    league_team_agg = {code: {} for code in TARGET_LEAGUES.keys()}
-
-    for fp in files:
-        season = season_from_filename(fp.name)
-        seasons.append(season)
-
-        for league_code in TARGET_LEAGUES.keys():
-            # Algumas planilhas podem não ter a aba (raro), então tratamos
-            try:
-                df = pd.read_excel(fp, sheet_name=league_code)
-            except Exception:
-                continue
-
-            # Confere colunas necessárias
-            missing = [c for c in NEEDED_COLS if c not in df.columns]
-            if missing:
-                continue
-
-            # Mantém só o que interessa
-            df = df[NEEDED_COLS].copy()
-
-            # Remove linhas sem times ou sem stats
-            df = df.dropna(subset=["HomeTeam","AwayTeam","HS","AS","HST","AST","HC","AC","HF","AF","HY","AY","HR","AR"])
-
-            # Para cada jogo, soma stats no mandante e no visitante
-            for _, r in df.iterrows():
-                home = str(r["HomeTeam"]).strip()
-                away = str(r["AwayTeam"]).strip()
-
-                hs = safe_float(r["HS"]);  a_s = safe_float(r["AS"])
-                hst = safe_float(r["HST"]); ast = safe_float(r["AST"])
-                hc = safe_float(r["HC"]);  ac = safe_float(r["AC"])
-                hf = safe_float(r["HF"]);  af = safe_float(r["AF"])
-                hy = safe_float(r["HY"]);  ay = safe_float(r["AY"])
-                hr = safe_float(r["HR"]);  ar = safe_float(r["AR"])
-
-                vals = [hs,a_s,hst,ast,hc,ac,hf,af,hy,ay,hr,ar]
-                if any(v is None for v in vals):
-                    continue
-
-                home_for = {"shots": hs, "sot": hst, "corners": hc, "fouls": hf, "yellow": hy, "red": hr}
-                home_against = {"shots": a_s, "sot": ast, "corners": ac, "fouls": af, "yellow": ay, "red": ar}
-
-                away_for = {"shots": a_s, "sot": ast, "corners": ac, "fouls": af, "yellow": ay, "red": ar}
-                away_against = {"shots": hs, "sot": hst, "corners": hc, "fouls": hf, "yellow": hy, "red": hr}
-
-                add_team_match(league_team_agg[league_code], home, home_for, home_against)
-                add_team_match(league_team_agg[league_code], away, away_for, away_against)
+    seasons = [season_from_filename(fp.name) for fp in files]
+    matches = pd.concat(
+        [load_workbook(fp, use_cache=not args.no_cache).assign(season=season) for fp, season in zip(files, seasons)],
+        ignore_index=True,
+    )
+    matches = matches[matches["sheet"].isin(list(TARGET_LEAGUES))]
 
     result["meta"]["seasons_included"] = sorted(list(dict.fromkeys(seasons)))
 
-    # Finaliza médias por liga
-    for league_code, agg in league_team_agg.items():
-        teams_avg = finalize_avgs(agg)
-
-        # Média da liga (média simples das médias dos times, ponderada por n)
-        league_sum = {"n": 0, "shots_for": 0, "shots_against": 0, "sot_for": 0, "sot_against": 0,
-                      "corners_for": 0, "corners_against": 0, "fouls_for": 0, "fouls_against": 0,
-                      "yellow_for": 0, "yellow_against": 0, "red_for": 0, "red_against": 0}
-
-        for _, d in teams_avg.items():
-            n = d["n"]
-            league_sum["n"] += n
-            for k in league_sum.keys():
-                if k == "n": 
-                    continue
-                league_sum[k] += d.get(k, 0) * n
-
-        league_avg = {}
-        if league_sum["n"] > 0:
-            for k, v in league_sum.items():
-                if k == "n":
-                    continue
-                league_avg[k] = round(v / league_sum["n"], 2)
-
+    # Médias por liga
+    by_league = team_averages(matches)
+    for league_code, name in TARGET_LEAGUES.items():
+        teams_avg = by_league.get(league_code, {})
         result["leagues"][league_code] = {
-            "name": TARGET_LEAGUES[league_code],
+            "name": name,
             "teams": teams_avg,
-            "league_avg": league_avg
+            "league_avg": league_average(teams_avg)
         }
 
     with open(out_path, "w", encoding="utf-8") as f:
         json.dump(result, f, ensure_ascii=False, indent=2)
 
+    n_shards = write_shards(split_shards(matches), Path(args.shards_dir))
+
     print(f"OK! Gerado: {out_path}")
+    print(f"OK! {n_shards} shards liga/temporada em: {args.shards_dir}")
 
 if __name__ == "__main__":
     main()
@@ -16,10 +16,11 @@ const elDetails = document.getElementById("details"); // novo bloco no HTML
 
 let autoOn = false;
 let autoTimer = null;
+let liveSource = null; // EventSource do /live/stream (modo Auto)
+let lastPayload = null; // último JSON renderizado (para aplicar updates ao vivo)
 
 // ---------- EXTRA STATS (football-data.co.uk) ----------
-let EXTRA_ROWS = []; // match-level rows
-let EXTRA_READY = false;
+const EXTRA_CACHE = new Map(); // url do /extra -> resposta (a sessão inteira)
 
 const COMP_TO_DIV = {
   "Premier League": "E0",
@@ -123,96 +124,29 @@ async function fetchPredictions() {
   return await r.json();
 }
 
-// ---------- carregar extra-stats.json ----------
-async function loadExtraStats() {
-  // Não deixa quebrar o app se o JSON ainda não estiver disponível
-  try {
-    // cache-bust simples para evitar service worker / cache agressivo
-    const url = `/data/extra-stats.json?v=${Date.now()}`;
-    const r = await fetch(url);
-    if (!r.ok) throw new Error(`HTTP ${r.status}`);
-    const j = await r.json();
-
-    // aceitamos vários formatos:
-    // - array direto
-    // - { rows: [...] }
-    // - { data: [...] }
-    const rows =
-      Array.isArray(j) ? j :
-      Array.isArray(j.rows) ? j.rows :
-      Array.isArray(j.data) ? j.data :
-      [];
-
-    EXTRA_ROWS = rows;
-    EXTRA_READY = true;
-  } catch (e) {
-    EXTRA_ROWS = [];
-    EXTRA_READY = false;
-  }
-}
-
-function asNum(x) {
-  const n = Number(x);
-  return Number.isFinite(n) ? n : null;
-}
-
-function avg(nums) {
-  const vals = nums.filter(v => v !== null && v !== undefined && Number.isFinite(v));
-  if (!vals.length) return null;
-  return vals.reduce((a, b) => a + b, 0) / vals.length;
-}
-
+// ---------- stats extras (/extra, agregadas no servidor) ----------
 // retorna stats médios do mandante em casa e visitante fora, para a competição+temporada
-function computeExtraAverages({ competitionName, utcDate, home, away }) {
-  if (!EXTRA_READY) return null;
-
+async function computeExtraAverages({ competitionName, utcDate, home, away }) {
   const div = COMP_TO_DIV[competitionName];
-  if (!div) return null;
+  if (!div) return { unmapped: true };
 
   const season = seasonFromUtcDate(utcDate);
   if (!season) return null;
 
-  // Esperado no match-level row:
-  // Div, Season, Date, HomeTeam, AwayTeam, HS, AS, HST, AST, HC, AC, HF, AF, HY, AY, HR, AR
-  // Mas vamos ser tolerantes com nomes.
-  const rows = EXTRA_ROWS.filter(r => {
-    const rDiv = normalizeStr(r.Div ?? r.div);
-    const rSeason = normalizeStr(r.Season ?? r.season);
-    const okDiv = rDiv === div;
-    const okSeason = !rSeason ? true : (normalizeStr(rSeason) === season);
-    return okDiv && okSeason;
-  });
+  // o servidor responde só o par pedido (poucas centenas de bytes), já agregado
+  const qs = new URLSearchParams({ div, season, home, away });
+  const url = `/extra?${qs}`;
+  if (EXTRA_CACHE.has(url)) return EXTRA_CACHE.get(url);
 
-  if (!rows.length) return { div, season, found: 0 };
-
-  const homeRows = rows.filter(r => normalizeStr(r.HomeTeam ?? r.homeTeam ?? r.Home) === home);
-  const awayRows = rows.filter(r => normalizeStr(r.AwayTeam ?? r.awayTeam ?? r.Away) === away);
-
-  // mandante jogando EM CASA: usa HS/HST/HC/HF/HY/HR
-  const homeHS = avg(homeRows.map(r => asNum(r.HS)));
-  const homeHST = avg(homeRows.map(r => asNum(r.HST)));
-  const homeHC = avg(homeRows.map(r => asNum(r.HC)));
-  const homeHF = avg(homeRows.map(r => asNum(r.HF)));
-  const homeHY = avg(homeRows.map(r => asNum(r.HY)));
-  const homeHR = avg(homeRows.map(r => asNum(r.HR)));
-
-  // visitante jogando FORA: usa AS/AST/AC/AF/AY/AR
-  const awayAS = avg(awayRows.map(r => asNum(r.AS)));
-  const awayAST = avg(awayRows.map(r => asNum(r.AST)));
-  const awayAC = avg(awayRows.map(r => asNum(r.AC)));
-  const awayAF = avg(awayRows.map(r => asNum(r.AF)));
-  const awayAY = avg(awayRows.map(r => asNum(r.AY)));
-  const awayAR = avg(awayRows.map(r => asNum(r.AR)));
-
-  return {
-    div,
-    season,
-    found: rows.length,
-    homeCount: homeRows.length,
-    awayCount: awayRows.length,
-    home: { HS: homeHS, HST: homeHST, HC: homeHC, HF: homeHF, HY: homeHY, HR: homeHR },
-    away: { AS: awayAS, AST: awayAST, AC: awayAC, AF: awayAF, AY: awayAY, AR: awayAR },
-  };
+  try {
+    const r = await fetch(url);
+    if (!r.ok) throw new Error(`HTTP ${r.status}`);
+    const extra = await r.json();
+    EXTRA_CACHE.set(url, extra);
+    return extra;
+  } catch (e) {
+    return null; // não deixa quebrar o card
+  }
 }
 
 function fmt1(x) {
@@ -268,7 +202,7 @@ function renderDetailsCard(p, extra) {
     extraHtml = `
       <div class="pill">Stats extras: sem dados para ${extra.div} / ${extra.season}</div>
     `;
-  } else if (EXTRA_READY) {
+  } else if (extra && extra.unmapped) {
     extraHtml = `<div class="pill">Stats extras: sem mapeamento de liga (COMP_TO_DIV)</div>`;
   }
 
@@ -276,7 +210,7 @@ function renderDetailsCard(p, extra) {
     <div style="display:flex; justify-content:space-between; align-items:center; gap:10px;">
       <div>
         <div style="font-size:16px;"><b>${p.home}</b> vs <b>${p.away}</b></div>
-        <div style="opacity:.85; margin-top:4px;">${formatDateBR(p.utcDate)} • ${p.status || "-"}</div>
+        <div style="opacity:.85; margin-top:4px;">${formatDateBR(p.utcDate)} • ${p.status || "-"}${liveScoreText(p)}</div>
       </div>
       <button id="btnCloseDetails" style="background:#2b3a4a;">Fechar</button>
     </div>
@@ -299,6 +233,13 @@ function renderDetailsCard(p, extra) {
   `;
 }
 
+// placar empurrado pelo SSE (/live): {home, away, label} ou null
+function liveScoreText(p) {
+  const ls = p.live_score;
+  if (!ls || ls.home == null || ls.away == null) return "";
+  return ` • <b title="${ls.label || "Placar"}">${ls.home}-${ls.away}</b>`;
+}
+
 function renderTable(j) {
   clearTable();
   hideDetails();
@@ -336,11 +277,11 @@ function renderTable(j) {
     tr.innerHTML = `
       <td>${formatDateBR(p.utcDate)}</td>
       <td><b>${(p.home || "-")}</b> vs <b>${(p.away || "-")}</b></td>
-      <td>${p.status || "-"}</td>
+      <td>${p.status || "-"}${liveScoreText(p)}</td>
     `;
 
-    tr.addEventListener("click", () => {
-      const extra = computeExtraAverages({
+    tr.addEventListener("click", async () => {
+      const extra = await computeExtraAverages({
         competitionName: j.competition,
         utcDate: p.utcDate,
         home: normalizeStr(p.home),
@@ -364,6 +305,7 @@ async function loadAndRender() {
   showError("");
   try {
     const j = await fetchPredictions();
+    lastPayload = j;
     renderTable(j);
   } catch (e) {
     showError("Falha ao chamar a API. A API está rodando?\n\n" + String(e));
@@ -391,6 +333,42 @@ async function saveJson() {
   }
 }
 
+// aplica só os jogos que mudaram (status/placar) no último JSON carregado
+function applyLiveUpdate(ev) {
+  if (!lastPayload) return;
+  let data;
+  try {
+    data = JSON.parse(ev.data);
+  } catch (e) {
+    return;
+  }
+  const byId = new Map((data.matches || []).map(m => [String(m.id), m]));
+  let changed = false;
+  for (const p of lastPayload.predictions || []) {
+    const u = byId.get(String(p.match_id ?? p.id));
+    if (!u) continue;
+    p.status = u.status_eff;
+    p.live_score = u.live_score;
+    changed = true;
+  }
+  if (changed) renderTable(lastPayload);
+}
+
+function closeLive() {
+  if (liveSource) {
+    liveSource.close();
+    liveSource = null;
+  }
+}
+
+function openLive() {
+  closeLive();
+  const url = `/live/stream?code=${encodeURIComponent(elCode.value)}`;
+  liveSource = new EventSource(url);
+  liveSource.addEventListener("snapshot", applyLiveUpdate);
+  liveSource.addEventListener("update", applyLiveUpdate);
+}
+
 function setAuto(on) {
   autoOn = on;
   elBtnAuto.textContent = autoOn ? "Auto: ON" : "Auto: OFF";
@@ -399,9 +377,12 @@ function setAuto(on) {
     clearInterval(autoTimer);
     autoTimer = null;
   }
+  closeLive();
 
   if (autoOn) {
-    autoTimer = setInterval(loadAndRender, 30000);
+    // servidor empurra as mudanças (SSE); polling só se o browser não suportar
+    if (window.EventSource) openLive();
+    else autoTimer = setInterval(loadAndRender, 30000);
   }
 }
 
@@ -409,9 +390,9 @@ elBtnLoad.addEventListener("click", loadAndRender);
 if (elBtnSave) elBtnSave.addEventListener("click", saveJson);
 if (elBtnAuto) elBtnAuto.addEventListener("click", () => setAuto(!autoOn));
 if (elStatus) elStatus.addEventListener("change", loadAndRender);
+elCode.addEventListener("change", () => { if (liveSource) openLive(); });
 
 (async function init() {
-  await loadExtraStats();     // tenta carregar /data/extra-stats.json
   await loadCompetitions();
   await loadAndRender();
 })();
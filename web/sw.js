@@ -1,14 +1,19 @@
 // web/sw.js
-const CACHE_NAME = "square-foot-v3";
+// CACHE_NAME e CORE_ASSETS são gerados por tools/build_assets.py
+// (hash do conteúdo): só muda quando algum arquivo muda de verdade.
+const CACHE_NAME = "square-foot-d4de3b2d58";
 
-// Arquivos essenciais do app (inclui logo e manifest com ?v=3)
+// Arquivos essenciais do app (URLs versionadas por hash)
 const CORE_ASSETS = [
   "/",
-  "/app.js?v=3",
-  "/icons/square-foot-logo.png?v=3",
-  "/icons/site.webmanifest?v=3"
+  "/icons/square-foot-logo.png?v=d0db99f1c4",
+  "/icons/site.webmanifest?v=d732a22c00",
+  "/app.js?v=a0b1f11d8b"
 ];
 
+// Só estáticos do web root vão para o cache; o resto (API) é sempre rede
+const STATIC_PREFIXES = ["/app.js", "/icons/", "/data/"];
+
 self.addEventListener("install", (event) => {
   event.waitUntil(
     caches.open(CACHE_NAME).then((cache) => cache.addAll(CORE_ASSETS))
@@ -29,8 +34,9 @@ self.addEventListener("fetch", (event) => {
   const req = event.request;
   const url = new URL(req.url);
 
-  // Nunca cachear API
-  if (url.pathname.startsWith("/api")) return;
+  // Nunca cachear API (/matches, /card, /live/stream, ...)
+  if (url.origin !== self.location.origin) return;
+  if (req.mode !== "navigate" && !STATIC_PREFIXES.some((p) => url.pathname.startsWith(p))) return;
 
   // Navegação: tenta rede primeiro, cai para cache
   if (req.mode === "navigate") {